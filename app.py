@@ -1,23 +1,302 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-import oracledb
+from flask import (Flask, render_template, request, redirect, url_for, flash, session, jsonify, g,
+                   Response, abort, make_response, stream_with_context)
 from datetime import datetime, date
 import os
 import calendar
+import csv
+import hashlib
+import hmac
+import io
 import json
+import time
+
+import numpy as np
+
+from importers import READERS, import_statement, open_text
+from provisioning import provision, read_users_csv
+from report_cache import DataVersions, ReportCache
+from sessions import STORES as SESSION_STORES, ServerSideSessionInterface
+from storage import create_engine
+from storage.base import (COMPARISON_PERIODS, SYNC_ALERT, SYNC_CATEGORY, SYNC_EXPENSE, SYNC_LIMIT, SYNC_START,
+                          comparison_periods, search_terms)
+from storage.instrumentation import InstrumentedConnection, Metrics, RequestStats
+import assets
+import trends
 
 # Configuration
-SECRET_KEY = os.urandom(24)
+# Session signing key, from SECRET_KEY or the file named by SECRET_KEY_FILE. Every
+# worker process must use the same key; the random fallback only suits a single
+# development process, and sessions don't survive its restart
+if os.environ.get('SECRET_KEY_FILE'):
+    with open(os.environ['SECRET_KEY_FILE'], 'rb') as f:
+        SECRET_KEY = f.read().strip()
+else:
+    SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(24)
+
+# Where sessions are kept: 'cookie' (signed cookie, the default), or on the server
+# in one file per session ('file', SESSION_STORE_PATH is a directory) or in a
+# SQLite database ('sqlite', SESSION_STORE_PATH is the database file)
+SESSION_STORE = os.environ.get('SESSION_STORE', 'cookie')
+SESSION_STORE_PATH = os.environ.get('SESSION_STORE_PATH',
+                                    'sessions.db' if SESSION_STORE == 'sqlite' else 'sessions')
 DB_USER = "expense_app"
 DB_PASSWORD = "test123"
 DB_DSN = "localhost:1521/ORCLPDB1"
 
-app = Flask(__name__)
+# Storage backend: 'oracle' in production, 'sqlite' for local runs and load tests
+DB_BACKEND = os.environ.get('DB_BACKEND', 'oracle')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', 'expense_tracker.db')
+
+# Session pool sizing (override through the environment when tuning under load)
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+DB_POOL_INCREMENT = int(os.environ.get('DB_POOL_INCREMENT', 1))
+DB_POOL_WAIT_TIMEOUT = int(os.environ.get('DB_POOL_WAIT_TIMEOUT', 5000))  # milliseconds
+
+# Rows per executemany batch (and per commit) when importing bank statements
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+
+# Rows fetched per round-trip (and written per chunk) when streaming exports
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', 1000))
+
+# Per-route, per-statement SQL metrics served at /metrics; statements slower
+# than SLOW_QUERY_MS are logged with the shapes (never values) of their binds
+SQL_METRICS = os.environ.get('SQL_METRICS', '1') == '1'
+SLOW_QUERY_MS = float(os.environ['SLOW_QUERY_MS']) if os.environ.get('SLOW_QUERY_MS') else None
+
+# Computed reports kept in this process's cache: at most REPORT_CACHE_SIZE
+# entries, and neither an entry nor a 304 for it outlives REPORT_CACHE_TTL
+# seconds, since writes through another worker don't reach this process
+REPORT_CACHE_SIZE = int(os.environ.get('REPORT_CACHE_SIZE', 1024))
+REPORT_CACHE_TTL = max(int(os.environ.get('REPORT_CACHE_TTL', 60)), 1)
+
+# Cached categories and budget limits per process: at most REFERENCE_CACHE_SIZE
+# entries, each reused for up to REFERENCE_CACHE_TTL seconds
+REFERENCE_CACHE_SIZE = int(os.environ.get('REFERENCE_CACHE_SIZE', 4096))
+REFERENCE_CACHE_TTL = int(os.environ.get('REFERENCE_CACHE_TTL', 300))
+
+# HTML and JSON responses smaller than this many bytes are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+# Most points per category on the trends chart; longer ranges fall back to a
+# coarser granularity (a year of daily points fits in the default)
+TREND_MAX_BUCKETS = int(os.environ.get('TREND_MAX_BUCKETS', 400))
+
+# Bearer token for the bulk provisioning API (disabled unless set)
+PROVISION_TOKEN = os.environ.get('PROVISION_TOKEN')
+PROVISION_BATCH_SIZE = int(os.environ.get('PROVISION_BATCH_SIZE', 1000))
+
+# Bearer token for /metrics and the pool statistics API (both disabled unless set)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Categories every new user starts with
+DEFAULT_CATEGORIES = ['Food', 'Housing', 'Transportation', 'Entertainment',
+                      'Healthcare', 'Personal', 'Education', 'Other']
+
+# Expense listing page sizes
+DASHBOARD_PAGE_SIZE = 10
+ALERTS_PAGE_SIZE = 25
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 5000
+
+# Static files are only served under their fingerprinted names (see static_asset)
+app = Flask(__name__, static_folder=None)
 app.secret_key = SECRET_KEY
+if SESSION_STORE not in ('cookie', *SESSION_STORES):
+    raise ValueError(f"Unknown SESSION_STORE '{SESSION_STORE}', expected cookie, file or sqlite")
+if SESSION_STORE != 'cookie':
+    app.session_interface = ServerSideSessionInterface(SESSION_STORES[SESSION_STORE](SESSION_STORE_PATH))
+
+if DB_BACKEND == 'sqlite':
+    db_engine = create_engine('sqlite', path=SQLITE_PATH)
+else:
+    db_engine = create_engine(DB_BACKEND, user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN,
+                              pool_min=DB_POOL_MIN, pool_max=DB_POOL_MAX,
+                              pool_increment=DB_POOL_INCREMENT,
+                              wait_timeout=DB_POOL_WAIT_TIMEOUT)
+
+report_cache = ReportCache(REPORT_CACHE_SIZE, ttl=REPORT_CACHE_TTL)
+reference_cache = ReportCache(REFERENCE_CACHE_SIZE, ttl=REFERENCE_CACHE_TTL)
+sql_metrics = Metrics(slow_query_seconds=SLOW_QUERY_MS / 1000 if SLOW_QUERY_MS is not None else None)
+data_versions = DataVersions()
+reference_versions = DataVersions()
+static_assets = assets.AssetManifest(os.path.join(app.root_path, 'static'))
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a file under static/ with its content hash in the name, so it can be cached forever"""
+    return url_for('static_asset', filename=static_assets.hashed_name(filename))
+
+def get_repository():
+    """Return the repository for the current request, acquiring a connection on first use"""
+    if 'repo' not in g:
+        conn = db_engine.acquire()
+        if SQL_METRICS:
+            g.db_stats = RequestStats(request.endpoint)
+            conn = InstrumentedConnection(conn, g.db_stats, db_engine.repository_class.SQL)
+        g.repo = db_engine.repository(conn)
+    return g.repo
+
+@app.after_request
+def add_db_time_header(response):
+    """In debug mode, report the time the request spent in the database"""
+    if app.debug and 'db_stats' in g:
+        response.headers['X-DB-Time'] = f"{g.db_stats.db_seconds * 1000:.3f}ms"
+    return response
 
-def get_db_connection():
-    """Create and return a database connection"""
-    conn = oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN)
-    return conn
+@app.after_request
+def compress_response(response):
+    """Compress HTML, JSON and other text responses for clients that accept brotli or gzip"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype not in assets.COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = assets.accepted_encoding(request.accept_encodings)
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_SIZE:
+        return response
+    
+    assets.set_compressed_body(response, body, encoding)
+    return response
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    """Release the request's connection (uncommitted work is rolled back) and record its SQL metrics"""
+    repo = g.pop('repo', None)
+    if repo is not None:
+        conn = repo.conn
+        if isinstance(conn, InstrumentedConnection):
+            conn = conn.detach()
+        db_engine.release(conn)
+    db_stats = g.pop('db_stats', None)
+    if db_stats is not None:
+        sql_metrics.record_request(db_stats)
+
+def encode_expense_cursor(row):
+    """Build the keyset cursor for an expense row: '<expense_date>_<expense_id>'"""
+    return f"{row[1].strftime('%Y-%m-%d')}_{row[0]}"
+
+def decode_expense_cursor(cursor):
+    """Parse a cursor from encode_expense_cursor into (expense_date, expense_id), or raise ValueError"""
+    expense_date, expense_id = cursor.split('_')
+    return datetime.strptime(expense_date, '%Y-%m-%d').date(), int(expense_id)
+
+def encode_search_cursor(row):
+    """Build the keyset cursor for a search result row: '<score>_<expense_id>'"""
+    return f"{row[5]!r}_{row[0]}"
+
+def decode_search_cursor(cursor):
+    """Parse a cursor from encode_search_cursor into (score, expense_id), or raise ValueError"""
+    score, expense_id = cursor.rsplit('_', 1)
+    return float(score), int(expense_id)
+
+def encode_alert_cursor(row):
+    """Build the keyset cursor for an alert row: '<alert_date>_<alert_id>'"""
+    return f"{row[1].strftime('%Y-%m-%dT%H:%M:%S')}_{row[0]}"
+
+def decode_alert_cursor(cursor):
+    """Parse a cursor from encode_alert_cursor into (alert_date, alert_id), or raise ValueError"""
+    alert_date, alert_id = cursor.split('_')
+    return datetime.strptime(alert_date, '%Y-%m-%dT%H:%M:%S'), int(alert_id)
+
+def encode_sync_token(cursor):
+    """Build the delta sync token for a (row_version, kind, id) cursor: '<row_version>.<kind>.<id>'"""
+    return '.'.join(str(part) for part in cursor)
+
+def decode_sync_token(token):
+    """Parse a cursor from encode_sync_token into (row_version, kind, id), or raise ValueError"""
+    row_version, kind, row_id = token.split('.')
+    return int(row_version), int(kind), int(row_id)
+
+def data_version():
+    """Return the logged-in user's data version (the session copy covers writes served by other processes)"""
+    return data_versions.get(session['user_id'], session.get('data_version', 0))
+
+def data_changed():
+    """Record a write to the logged-in user's data, invalidating their cached reports"""
+    session['data_version'] = data_versions.bump(session['user_id'], session.get('data_version', 0))
+
+def validator_window():
+    """Start of the current REPORT_CACHE_TTL window; validators from earlier windows are never fresh"""
+    now = int(time.time())
+    return now - now % REPORT_CACHE_TTL
+
+def report_etag(report_key, version):
+    key = (data_versions.started, session['user_id'], report_key, version, validator_window())
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+def report_not_modified(report_key):
+    """Return a 304 response if the client's copy of the report is current, else None"""
+    if request.method != 'GET' or session.get('_flashes'):
+        # Pending flash messages must be rendered into a fresh page
+        return None
+    version = data_version()
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(report_etag(report_key, version))
+    else:
+        fresh = (request.if_modified_since is not None
+                 and request.if_modified_since.timestamp() >= max(version, validator_window()))
+    if not fresh:
+        return None
+    return with_report_validators(Response(status=304), report_key, version)
+
+def with_report_validators(response, report_key, version):
+    """Add ETag and Last-Modified headers so browsers revalidate instead of refetching"""
+    response.set_etag(report_etag(report_key, version))
+    response.last_modified = max(version, validator_window())
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def cached_report(report_key, version, build):
+    """Return the report from the cache, building and caching it on a miss"""
+    report = report_cache.get(session['user_id'], report_key, version)
+    if report is None:
+        report = build()
+        report_cache.put(session['user_id'], report_key, version, report)
+    return report
+
+def reference_data(kind):
+    """
+    Return the logged-in user's 'categories', 'category_details' or
+    'budget_limits' rows, from the reference cache when they haven't changed
+    """
+    version = reference_versions.get(session['user_id'], session.get('reference_version', 0))
+    rows = reference_cache.get(session['user_id'], kind, version)
+    if rows is None:
+        rows = getattr(get_repository(), kind)(session['user_id'])
+        reference_cache.put(session['user_id'], kind, version, rows)
+    return rows
+
+def reference_data_changed():
+    """Record a write to the logged-in user's categories or budget limits"""
+    session['reference_version'] = reference_versions.bump(session['user_id'],
+                                                           session.get('reference_version', 0))
+
+def chart_start_month(today):
+    """First day of the earliest month shown on the dashboard chart (the last 6 months)"""
+    return date(today.year - 1 if today.month <= 6 else today.year, 
+                (today.month - 6) % 12 + 1, 1)
+
+def monthly_chart(monthly_totals):
+    """Build the dashboard's Chart.js data from ('YYYY-MM', total) rows"""
+    months = []
+    totals = []
+    
+    for row in monthly_totals:
+        months.append(row[0])
+        totals.append(float(row[1]))
+    
+    return {
+        'labels': months,
+        'datasets': [{
+            'label': 'Monthly Expenses',
+            'data': totals
+        }]
+    }
 
 # Home/Login Page
 @app.route('/', methods=['GET', 'POST'])
@@ -26,15 +305,11 @@ def login():
         email = request.form['email']
         password = request.form['password']
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT user_id, name FROM Users WHERE email = :email AND password = :password', 
-                       {'email': email, 'password': password})
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        user = get_repository().authenticate(email, password)
         
         if user:
+            # Start a fresh session for the user
+            session.clear()
             session['user_id'] = user[0]
             session['name'] = user[1]
             return redirect(url_for('dashboard'))
@@ -48,69 +323,28 @@ def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get recent expenses
-    cursor.execute('''
-        SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description 
-        FROM Expenses e 
-        JOIN Categories c ON e.category_id = c.category_id 
-        WHERE e.user_id = :user_id
-        ORDER BY e.expense_date DESC
-    ''', {'user_id': session['user_id']})
-    expenses = cursor.fetchall()
-    
-    # Get current month total
+    # Current month summary, category breakdown, unread alerts, chart data and the
+    # first page of recent expenses (one extra row tells us whether there are more),
+    # all fetched in a single round-trip
     today = date.today()
     first_day = date(today.year, today.month, 1)
-    last_day = date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
-    
-    cursor.execute('''
-        SELECT NVL(SUM(amount), 0) 
-        FROM Expenses 
-        WHERE user_id = :user_id 
-        AND expense_date BETWEEN :first_day AND :last_day
-    ''', {'user_id': session['user_id'], 'first_day': first_day, 'last_day': last_day})
-    monthly_total = cursor.fetchone()[0]
-    
-    # Get category breakdown for current month
-    cursor.execute('''
-        SELECT c.category_name, NVL(SUM(e.amount), 0) as total
-        FROM Categories c
-        LEFT JOIN Expenses e ON c.category_id = e.category_id 
-                           AND e.expense_date BETWEEN :first_day AND :last_day
-        WHERE c.user_id = :user_id
-        GROUP BY c.category_name
-        ORDER BY total DESC
-    ''', {'user_id': session['user_id'], 'first_day': first_day, 'last_day': last_day})
-    category_totals = cursor.fetchall()
-    
-    # Check for unread alerts
-    alert_count = 0
-    try:
-        cursor.execute('''
-            SELECT COUNT(*) 
-            FROM Expense_Alerts 
-            WHERE user_id = :user_id AND is_read = 0
-        ''', {'user_id': session['user_id']})
-        alert_count = cursor.fetchone()[0]
-    except oracledb.DatabaseError as e:
-        # Table likely doesn't exist yet
-        if 'ORA-00942' in str(e):  # Table or view does not exist
-            pass
-        else:
-            # If it's some other error, re-raise it
-            raise
     
-    cursor.close()
-    conn.close()
+    data = get_repository().dashboard(session['user_id'], DASHBOARD_PAGE_SIZE + 1, first_day,
+                                      chart_start_month(today))
+    
+    expenses = data['expenses']
+    next_cursor = None
+    if len(expenses) > DASHBOARD_PAGE_SIZE:
+        expenses = expenses[:DASHBOARD_PAGE_SIZE]
+        next_cursor = encode_expense_cursor(expenses[-1])
     
     return render_template('dashboard.html', 
                           expenses=expenses, 
-                          monthly_total=monthly_total,
-                          category_totals=category_totals,
-                          alert_count=alert_count)
+                          next_cursor=next_cursor,
+                          monthly_total=data['month_total'],
+                          category_totals=data['category_totals'],
+                          alert_count=data['alert_count'],
+                          chart_data=monthly_chart(data['monthly_totals']))
 
 # Add a new expense
 @app.route('/add-expense', methods=['GET', 'POST'])
@@ -118,48 +352,69 @@ def add_expense():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Fetch categories for this user
-    cursor.execute('SELECT category_id, category_name FROM Categories WHERE user_id = :user_id', 
-                  {'user_id': session['user_id']})
-    categories = cursor.fetchall()
-    
     if request.method == 'POST':
+        repo = get_repository()
         category_id = request.form['category_id']
         amount = float(request.form['amount'])
         expense_date = request.form['expense_date']
         description = request.form.get('description', '')
         
-        # Use PL/SQL procedure to add expense and check limits
-        limit_exceeded = cursor.var(oracledb.NUMBER)
-        limit_amount = cursor.var(oracledb.NUMBER)
-        expense_id = cursor.var(oracledb.NUMBER)
-        
-        cursor.callproc('add_expense_with_limit_check', 
-                       [session['user_id'], category_id, amount, 
-                        datetime.strptime(expense_date, '%Y-%m-%d').date(),
-                        description, limit_exceeded, limit_amount, expense_id])
+        # Add the expense and check it against the user's budget limits
+        expense_id, limit_exceeded, limit_amount = repo.add_expense(
+            session['user_id'], category_id, amount,
+            datetime.strptime(expense_date, '%Y-%m-%d').date(), description)
         
         # If limit exceeded, create alert
-        if limit_exceeded.getvalue() == 1:
-            cursor.callproc('create_limit_alert', 
-                           [session['user_id'], expense_id.getvalue(), limit_amount.getvalue()])
-            flash(f'Expense added, but it exceeds your budget limit of ${limit_amount.getvalue():.2f}!')
+        if limit_exceeded:
+            repo.create_limit_alert(session['user_id'], expense_id, limit_amount)
+            flash(f'Expense added, but it exceeds your budget limit of ${limit_amount:.2f}!')
         else:
             flash('Expense added successfully!')
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+        repo.commit()
+        data_changed()
         return redirect(url_for('dashboard'))
     
-    cursor.close()
-    conn.close()
-    
     # Pass current date as default for the form
-    return render_template('add_expense.html', categories=categories, now=date.today().strftime('%Y-%m-%d'))
+    return render_template('add_expense.html', categories=reference_data('categories'),
+                           now=date.today().strftime('%Y-%m-%d'))
+
+# Import expenses from a bank statement (CSV or OFX)
+@app.route('/import', methods=['GET', 'POST'])
+def import_expenses():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    categories = reference_data('categories')
+    
+    if request.method == 'POST':
+        statement = request.files.get('statement')
+        extension = os.path.splitext(statement.filename)[1].lstrip('.').lower() if statement else ''
+        if extension not in READERS:
+            flash('Please upload a .csv, .ofx or .qfx statement')
+            return redirect(url_for('import_expenses'))
+        
+        default_category_id = request.form['default_category_id']
+        batch_size = request.form.get('batch_size', IMPORT_BATCH_SIZE, type=int)
+        category_ids = {name.lower(): category_id for category_id, name in categories}
+        
+        stats = import_statement(get_repository(), session['user_id'], READERS[extension](open_text(statement.stream)),
+                                 category_ids, default_category_id, max(batch_size, 1))
+        if stats['imported']:
+            data_changed()
+        
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(stats)
+        
+        flash(f"Imported {stats['imported']} expenses in {stats['seconds']}s "
+              f"({stats['rows_per_second']} rows/sec), skipped {stats['skipped']} rows")
+        if stats['alerts']:
+            flash(f"{stats['alerts']} budget limit alert{'s' if stats['alerts'] > 1 else ''} raised by this import")
+        return render_template('import_expenses.html', categories=categories, stats=stats,
+                               batch_size=IMPORT_BATCH_SIZE)
+    
+    return render_template('import_expenses.html', categories=categories, stats=None,
+                           batch_size=IMPORT_BATCH_SIZE)
 
 # Budget Management
 @app.route('/budgets', methods=['GET', 'POST'])
@@ -167,53 +422,30 @@ def manage_budgets():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Fetch categories for this user
-    cursor.execute('SELECT category_id, category_name FROM Categories WHERE user_id = :user_id', 
-                  {'user_id': session['user_id']})
-    categories = cursor.fetchall()
-    
-    # Fetch existing budget limits
-    cursor.execute('''
-        SELECT l.limit_id, l.category_id, c.category_name, l.limit_amount, l.period 
-        FROM Expense_Limits l
-        LEFT JOIN Categories c ON l.category_id = c.category_id
-        WHERE l.user_id = :user_id
-    ''', {'user_id': session['user_id']})
-    limits = cursor.fetchall()
-    
     if request.method == 'POST':
+        repo = get_repository()
         category_id = request.form.get('category_id')
         if category_id == "overall":
             category_id = None
         limit_amount = float(request.form['limit_amount'])
         period = request.form.get('period', 'monthly')
         
-        # Get the next sequence value for limit_id
-        cursor.execute('SELECT seq_limits.NEXTVAL FROM dual')
-        next_limit_id = cursor.fetchone()[0]
-        
-        cursor.execute('''
-            INSERT INTO Expense_Limits (limit_id, user_id, category_id, limit_amount, period)
-            VALUES (:limit_id, :user_id, :category_id, :limit_amount, :period)
-        ''', {
-            'limit_id': next_limit_id,
-            'user_id': session['user_id'], 
-            'category_id': category_id, 
-            'limit_amount': limit_amount, 
-            'period': period
-        })
-        
-        conn.commit()
+        repo.add_budget_limit(session['user_id'], category_id, limit_amount, period)
+        repo.commit()
+        data_changed()
+        reference_data_changed()
         flash('Budget limit added successfully!')
         return redirect(url_for('manage_budgets'))
     
-    cursor.close()
-    conn.close()
-    
-    return render_template('budgets.html', categories=categories, limits=limits)
+    # Categories and existing budget limits for this user, usually from the cache
+    return render_template('budgets.html', categories=reference_data('categories'),
+                           limits=reference_data('budget_limits'), status=budget_status())
+
+def budget_status():
+    """Usage of each of the logged-in user's budget limits in its current period (see Repository.budget_status)"""
+    today = date.today()
+    return cached_report(('budget_status', today), data_version(),
+                         lambda: get_repository().budget_status(session['user_id'], today))
 
 # Delete a budget limit
 @app.route('/delete-budget/<int:limit_id>', methods=['POST'])
@@ -221,17 +453,11 @@ def delete_budget(limit_id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        DELETE FROM Expense_Limits
-        WHERE limit_id = :limit_id AND user_id = :user_id
-    ''', {'limit_id': limit_id, 'user_id': session['user_id']})
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
+    repo = get_repository()
+    repo.delete_budget_limit(session['user_id'], limit_id)
+    repo.commit()
+    data_changed()
+    reference_data_changed()
     
     flash('Budget limit deleted')
     return redirect(url_for('manage_budgets'))
@@ -242,65 +468,104 @@ def monthly_report():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    # Default to current month
-    today = date.today()
-    selected_month = request.form.get('month', today.month)
-    selected_year = request.form.get('year', today.year)
+    try:
+        first_day = selected_month(request.values)
+    except ValueError:
+        return redirect(url_for('monthly_report'))
+    
+    report_key = ('monthly_report', first_day)
+    not_modified = report_not_modified(report_key)
+    if not_modified:
+        return not_modified
+    
+    version = data_version()
+    report = cached_report(report_key, version, lambda: build_comparison(first_day))
+    
+    response = make_response(render_template('monthly_report.html', 
+                          report=report, 
+                          month=first_day.month,
+                          year=first_day.year,
+                          month_name=calendar.month_name[first_day.month]))
+    return with_report_validators(response, report_key, version)
+
+# The monthly report as JSON: the month's per-category statistics with the
+# previous month and the same month last year
+@app.route('/api/reports/monthly')
+def monthly_report_data():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
     
-    if request.method == 'POST':
-        selected_month = int(request.form.get('month'))
-        selected_year = int(request.form.get('year'))
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get monthly summary using direct SQL query instead of PL/SQL function
-    # to avoid potential issues with cursor passing
-    first_day = date(int(selected_year), int(selected_month), 1)
-    last_day = date(int(selected_year), int(selected_month), 
-                   calendar.monthrange(int(selected_year), int(selected_month))[1])
-    
-    cursor.execute('''
-        SELECT 
-            c.category_name,
-            NVL(SUM(e.amount), 0) as total_amount,
-            COUNT(e.expense_id) as transaction_count,
-            MIN(e.amount) as min_expense,
-            MAX(e.amount) as max_expense,
-            NVL(AVG(e.amount), 0) as avg_expense
-        FROM 
-            Categories c
-        LEFT JOIN 
-            Expenses e ON c.category_id = e.category_id 
-                    AND e.user_id = :user_id 
-                    AND e.expense_date BETWEEN :first_day AND :last_day
-        WHERE 
-            c.user_id = :user_id
-        GROUP BY 
-            c.category_name
-        ORDER BY 
-            total_amount DESC
-    ''', {'user_id': session['user_id'], 'first_day': first_day, 'last_day': last_day})
-    
-    summary = []
-    for row in cursor:
-        summary.append({
-            'category': row[0],
-            'total': row[1],
-            'count': row[2],
-            'min': row[3],
-            'max': row[4],
-            'avg': row[5]
-        })
-    
-    cursor.close()
-    conn.close()
-    
-    return render_template('monthly_report.html', 
-                          summary=summary, 
-                          month=selected_month,
-                          year=selected_year,
-                          month_name=calendar.month_name[int(selected_month)])
+    try:
+        first_day = selected_month(request.args)
+    except ValueError:
+        return jsonify({'error': 'Invalid month'}), 400
+    
+    report_key = ('monthly_report', first_day)
+    not_modified = report_not_modified(report_key)
+    if not_modified:
+        return not_modified
+    
+    version = data_version()
+    report = cached_report(report_key, version, lambda: build_comparison(first_day))
+    return with_report_validators(jsonify(report), report_key, version)
+
+def selected_month(values):
+    """
+    First day of the month given by the 'month' and 'year' values (default: the
+    current month); raises ValueError if they are not numbers or the month has
+    no previous month or year to compare with
+    """
+    today = date.today()
+    first_day = date(int(values.get('year', today.year)), int(values.get('month', today.month)), 1)
+    comparison_periods(first_day)
+    return first_day
+
+# Statistics of each period of the comparison report, in the order of the query's columns
+COMPARISON_STATS = ('total', 'count', 'min', 'max', 'avg', 'median')
+
+def build_comparison(first_day):
+    """Build the monthly report for the logged-in user"""
+    return comparison_report(get_repository().period_comparison(session['user_id'], first_day), first_day)
+
+def comparison_report(columns, first_day):
+    """
+    Turn the period_comparison columns into the monthly report: every
+    category's total, count, min, max, avg and median in the month, the
+    previous month and the same month last year, and the percentage change of
+    the month's total against each (None from zero)
+    """
+    def values(name):
+        # Whole columns are converted at once; NaN (no expenses) becomes None
+        column = columns[name].astype(float)
+        return np.where(np.isnan(column), None, column.round(2)).tolist()
+    
+    def change(current, earlier):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = np.round((current - earlier) / earlier * 100, 1)
+        return np.where(earlier > 0, percent, None).tolist()
+    
+    stats = {}
+    for period in COMPARISON_PERIODS:
+        stat_columns = [columns[f'{period}_count'].astype(int).tolist() if stat == 'count'
+                        else values(f'{period}_{stat}') for stat in COMPARISON_STATS]
+        stats[period] = [dict(zip(COMPARISON_STATS, entry)) for entry in zip(*stat_columns)]
+    totals = {period: columns[f'{period}_total'].astype(float) for period in COMPARISON_PERIODS}
+    changes = {period: change(totals['current'], totals[period]) for period in COMPARISON_PERIODS[1:]}
+    overall = {period: float(total.sum()) for period, total in totals.items()}
+    
+    return {
+        'month': first_day.strftime('%Y-%m'),
+        'periods': {period: {'start': start.strftime('%Y-%m-%d'), 'end': end.strftime('%Y-%m-%d')}
+                    for period, (start, end) in comparison_periods(first_day).items()},
+        'categories': [{'category': category,
+                        **{period: stats[period][i] for period in COMPARISON_PERIODS},
+                        'change': {period: changes[period][i] for period in changes}}
+                       for i, category in enumerate(columns['category_name'].tolist())],
+        'totals': {period: {'total': round(overall[period], 2),
+                            'count': int(columns[f'{period}_count'].sum())} for period in COMPARISON_PERIODS},
+        'change': {period: round((overall['current'] - overall[period]) / overall[period] * 100, 1)
+                   if overall[period] > 0 else None for period in COMPARISON_PERIODS[1:]}
+    }
 
 # Expense Trends
 @app.route('/reports/trends')
@@ -308,95 +573,52 @@ def expense_trends():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    months = request.args.get('months', 6, type=int)
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    requested = request.args.get('granularity', 'month')
+    if requested not in trends.GRANULARITIES:
+        requested = 'month'
     
-    # Get the current date for reference
+    # An explicit start/end range, or the last N months including the current one
     today = date.today()
-    start_date = date(today.year - (1 if today.month <= months else 0), 
-                     (today.month - months) % 12 + 1, 1)
-    end_date = date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
-    
-    # Use direct SQL query instead of PL/SQL function to avoid potential issues
-    cursor.execute('''
-        SELECT 
-            TO_CHAR(TRUNC(e.expense_date, 'MM'), 'YYYY-MM') as month,
-            c.category_name,
-            SUM(e.amount) as total_amount
-        FROM 
-            Expenses e
-        JOIN 
-            Categories c ON e.category_id = c.category_id
-        WHERE 
-            e.user_id = :user_id
-            AND e.expense_date BETWEEN :start_date AND :end_date
-        GROUP BY 
-            TO_CHAR(TRUNC(e.expense_date, 'MM'), 'YYYY-MM'),
-            c.category_name
-        ORDER BY 
-            month, c.category_name
-    ''', {'user_id': session['user_id'], 'start_date': start_date, 'end_date': end_date})
-    
-    trends_data = []
-    for row in cursor:
-        trends_data.append({
-            'month': row[0],
-            'category': row[1],
-            'amount': float(row[2])
-        })
-    
-    # Process data to make it suitable for charts
-    months = []
-    categories = set()
-    data_map = {}
-    
-    for item in trends_data:
-        if item['month'] not in months:
-            months.append(item['month'])
-        categories.add(item['category'])
-        
-        key = (item['month'], item['category'])
-        data_map[key] = item['amount']
-    
-    # Sort months chronologically
-    months.sort()
-    categories = sorted(list(categories))
-    
-    # If we have no data, create some placeholder months based on the selected range
-    if not months:
-        current_date = start_date
-        while current_date <= end_date:
-            month_str = current_date.strftime('%Y-%m')
-            if month_str not in months:
-                months.append(month_str)
-            current_date = date(
-                current_date.year + (1 if current_date.month == 12 else 0),
-                (current_date.month % 12) + 1,
-                1
-            )
-        months.sort()
-    
-    # Create data for the chart
-    chart_data = {
-        'labels': months,
-        'datasets': []
-    }
-    
-    for category in categories:
-        dataset = {
-            'label': category,
-            'data': [data_map.get((month, category), 0) for month in months]
-        }
-        chart_data['datasets'].append(dataset)
-    
-    cursor.close()
-    conn.close()
-    
-    return render_template('expense_trends.html', 
+    try:
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        months = min(max(request.args.get('months', 6, type=int), 1), 1200)
+        first_month = today.year * 12 + today.month - months
+        start_date = date(first_month // 12, first_month % 12 + 1, 1)
+        end_date = date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+    
+    granularity = trends.choose_granularity(start_date, end_date, requested, TREND_MAX_BUCKETS)
+    if trends.bucket_count(start_date, end_date, granularity) > TREND_MAX_BUCKETS:
+        start_date = date(max(end_date.year - TREND_MAX_BUCKETS + 1, 1), 1, 1)
+    
+    report_key = ('expense_trends', start_date, end_date, granularity)
+    not_modified = report_not_modified(report_key)
+    if not_modified:
+        return not_modified
+    
+    version = data_version()
+    chart_data = cached_report(report_key, version,
+                               lambda: build_trends_chart(start_date, end_date, granularity))
+    
+    response = make_response(render_template('expense_trends.html', 
                           chart_data=json.dumps(chart_data),
-                          months=months)
+                          labels=chart_data['labels'],
+                          granularity=granularity,
+                          requested_granularity=requested,
+                          start_date=start_date,
+                          end_date=end_date,
+                          max_buckets=TREND_MAX_BUCKETS))
+    return with_report_validators(response, report_key, version)
+
+def build_trends_chart(start_date, end_date, granularity):
+    """Build the Chart.js data for the trends report: one dataset per category, one point per bucket"""
+    edges = trends.bucket_edges(start_date, end_date, granularity)
+    columns = get_repository().category_trends(session['user_id'], granularity,
+                                               edges[0].item(), edges[-1].item())
+    return trends.trend_chart(columns, edges, granularity)
 
 # Manage Categories
 @app.route('/categories', methods=['GET', 'POST'])
@@ -404,35 +626,20 @@ def manage_categories():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     if request.method == 'POST':
         category_name = request.form['category_name']
         description = request.form.get('description', '')
         
-        cursor.execute('''
-            INSERT INTO Categories (user_id, category_name, description)
-            VALUES (:user_id, :category_name, :description)
-        ''', {'user_id': session['user_id'], 'category_name': category_name, 'description': description})
-        
-        conn.commit()
+        repo = get_repository()
+        repo.add_category(session['user_id'], category_name, description)
+        repo.commit()
+        data_changed()
+        reference_data_changed()
         flash('Category added successfully!')
         return redirect(url_for('manage_categories'))
     
     # Fetch existing categories
-    cursor.execute('''
-        SELECT category_id, category_name, description
-        FROM Categories
-        WHERE user_id = :user_id
-        ORDER BY category_name
-    ''', {'user_id': session['user_id']})
-    
-    categories = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    
-    return render_template('categories.html', categories=categories)
+    return render_template('categories.html', categories=reference_data('category_details'))
 
 # View Alerts
 @app.route('/alerts')
@@ -440,32 +647,28 @@ def view_alerts():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT a.alert_id, a.alert_date, e.amount, c.category_name, a.limit_amount, a.is_read
-        FROM Expense_Alerts a
-        JOIN Expenses e ON a.expense_id = e.expense_id
-        JOIN Categories c ON e.category_id = c.category_id
-        WHERE a.user_id = :user_id
-        ORDER BY a.alert_date DESC, a.is_read
-    ''', {'user_id': session['user_id']})
-    
-    alerts = cursor.fetchall()
-    
-    # Mark all as read
-    cursor.execute('''
-        UPDATE Expense_Alerts
-        SET is_read = 1
-        WHERE user_id = :user_id AND is_read = 0
-    ''', {'user_id': session['user_id']})
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
-    
-    return render_template('alerts.html', alerts=alerts)
+    after = request.args.get('after')
+    if after:
+        try:
+            after = decode_alert_cursor(after)
+        except ValueError:
+            return redirect(url_for('view_alerts'))
+    
+    # One page of alerts, newest first (one extra row tells us whether there are more)
+    repo = get_repository()
+    alerts = repo.alerts_page(session['user_id'], ALERTS_PAGE_SIZE + 1, after or None)
+    next_cursor = None
+    if len(alerts) > ALERTS_PAGE_SIZE:
+        alerts = alerts[:ALERTS_PAGE_SIZE]
+        next_cursor = encode_alert_cursor(alerts[-1])
+    
+    # Only the alerts shown on this page have been seen
+    unread_ids = [alert[0] for alert in alerts if alert[5] == 0]
+    if unread_ids:
+        repo.mark_alerts_read(session['user_id'], unread_ids)
+        repo.commit()
+    
+    return render_template('alerts.html', alerts=alerts, next_cursor=next_cursor, first_page=not after)
 
 # User Registration
 @app.route('/register', methods=['GET', 'POST'])
@@ -475,39 +678,19 @@ def register():
         email = request.form['email']
         password = request.form['password']
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        repo = get_repository()
         
         # Check if email already exists
-        cursor.execute('SELECT COUNT(*) FROM Users WHERE email = :email', {'email': email})
-        if cursor.fetchone()[0] > 0:
+        if repo.email_exists(email):
             flash('Email already registered')
-            cursor.close()
-            conn.close()
             return render_template('register.html')
         
         # Register the user
-        cursor.execute('''
-            INSERT INTO Users (name, email, password)
-            VALUES (:name, :email, :password)
-        ''', {'name': name, 'email': email, 'password': password})
-        
-        # Get the new user_id
-        cursor.execute('SELECT user_id FROM Users WHERE email = :email', {'email': email})
-        user_id = cursor.fetchone()[0]
+        user_id = repo.create_user(name, email, password)
         
         # Create default categories for new user
-        default_categories = ['Food', 'Housing', 'Transportation', 'Entertainment', 
-                             'Healthcare', 'Personal', 'Education', 'Other']
-        for category in default_categories:
-            cursor.execute('''
-                INSERT INTO Categories (user_id, category_name)
-                VALUES (:user_id, :category_name)
-            ''', {'user_id': user_id, 'category_name': category})
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        repo.add_categories(user_id, DEFAULT_CATEGORIES)
+        repo.commit()
         
         flash('Registration successful! Please login.')
         return redirect(url_for('login'))
@@ -527,39 +710,251 @@ def dashboard_chart_data():
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    start_date = chart_start_month(date.today())
     
-    # Get data for last 6 months
-    today = date.today()
-    start_date = date(today.year - 1 if today.month <= 6 else today.year, 
-                     (today.month - 6) % 12 + 1, 1)
+    report_key = ('dashboard_chart', start_date)
+    not_modified = report_not_modified(report_key)
+    if not_modified:
+        return not_modified
     
-    cursor.execute('''
-        SELECT TO_CHAR(TRUNC(expense_date, 'MM'), 'YYYY-MM') as month, SUM(amount) as total
-        FROM Expenses
-        WHERE user_id = :user_id AND expense_date >= :start_date
-        GROUP BY TO_CHAR(TRUNC(expense_date, 'MM'), 'YYYY-MM')
-        ORDER BY month
-    ''', {'user_id': session['user_id'], 'start_date': start_date})
+    version = data_version()
+    chart_data = cached_report(report_key, version, lambda: monthly_chart(
+        get_repository().monthly_totals(session['user_id'], start_date)))
+    return with_report_validators(jsonify(chart_data), report_key, version)
+
+# Keyset-paginated expense listing for infinite scroll
+@app.route('/api/expenses')
+def list_expenses():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
     
-    months = []
-    totals = []
+    limit = min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+    after = request.args.get('after')
+    if after:
+        try:
+            after = decode_expense_cursor(after)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
     
-    for row in cursor:
-        months.append(row[0])
-        totals.append(float(row[1]))
+    rows = get_repository().expenses_page(session['user_id'], limit + 1, after or None)
     
-    cursor.close()
-    conn.close()
+    return jsonify({
+        'expenses': [{
+            'id': row[0],
+            'date': row[1].strftime('%Y-%m-%d'),
+            'category': row[2],
+            'amount': float(row[3]),
+            'description': row[4]
+        } for row in rows[:limit]],
+        'next': encode_expense_cursor(rows[limit - 1]) if len(rows) > limit else None
+    })
+
+# Expenses whose description matches every word of q (as a prefix), best match
+# first, optionally in one category and dated start to end inclusive
+@app.route('/api/expenses/search')
+def search_expenses():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    terms = search_terms(request.args.get('q', ''))
+    if not terms:
+        return jsonify({'error': 'Search query q must contain a word'}), 400
+    limit = min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+    try:
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else date.min
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else date.max
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    after = request.args.get('after')
+    if after:
+        try:
+            after = decode_search_cursor(after)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    rows = get_repository().search_expenses(session['user_id'], terms, limit + 1, after or None,
+                                            request.args.get('category_id', type=int), start_date, end_date)
     
     return jsonify({
-        'labels': months,
-        'datasets': [{
-            'label': 'Monthly Expenses',
-            'data': totals
-        }]
+        'expenses': [{
+            'id': row[0],
+            'date': row[1].strftime('%Y-%m-%d'),
+            'category': row[2],
+            'amount': float(row[3]),
+            'description': row[4],
+            'score': float(row[5])
+        } for row in rows[:limit]],
+        'next': encode_search_cursor(rows[limit - 1]) if len(rows) > limit else None
+    })
+
+# Spent, remaining and percent used of every budget limit in its current period
+@app.route('/api/budgets/status')
+def budgets_status():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    return jsonify({
+        'date': date.today().strftime('%Y-%m-%d'),
+        'limits': [dict(limit, period_start=limit['period_start'].strftime('%Y-%m-%d'),
+                        period_end=limit['period_end'].strftime('%Y-%m-%d'))
+                   for limit in budget_status()]
     })
 
+# Delta sync for mobile and offline clients: the user's rows inserted, updated
+# or deleted since the cursor the previous call returned (from the start without one)
+SYNC_ENTITIES = {SYNC_EXPENSE: 'expenses', SYNC_CATEGORY: 'categories',
+                 SYNC_LIMIT: 'budget_limits', SYNC_ALERT: 'alerts'}
+
+@app.route('/api/sync')
+def sync_changes():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    limit = min(max(request.args.get('limit', SYNC_PAGE_SIZE, type=int), 1), SYNC_MAX_PAGE_SIZE)
+    since = request.args.get('since')
+    try:
+        since = decode_sync_token(since) if since else SYNC_START
+    except ValueError:
+        return jsonify({'error': 'Invalid sync token'}), 400
+    
+    rows = get_repository().changes_since(session['user_id'], since, limit + 1)
+    if rows:
+        last = rows[min(len(rows), limit) - 1]
+        since = (last[2], last[0], last[1])
+    
+    changes = {entity: [] for entity in SYNC_ENTITIES.values()}
+    deleted = {entity: [] for entity in SYNC_ENTITIES.values()}
+    for kind, row_id, _, is_deleted, ref_id, amount, change_date, label, detail, flag in rows[:limit]:
+        if is_deleted:
+            deleted[SYNC_ENTITIES[kind]].append(row_id)
+        elif kind == SYNC_EXPENSE:
+            changes['expenses'].append({'id': row_id, 'category_id': ref_id, 'amount': float(amount),
+                                        'date': change_date, 'description': label})
+        elif kind == SYNC_CATEGORY:
+            changes['categories'].append({'id': row_id, 'name': label, 'description': detail})
+        elif kind == SYNC_LIMIT:
+            changes['budget_limits'].append({'id': row_id, 'category_id': ref_id, 'amount': float(amount),
+                                             'period': label or 'monthly'})
+        else:
+            changes['alerts'].append({'id': row_id, 'expense_id': ref_id, 'limit_amount': float(amount),
+                                      'date': change_date, 'is_read': bool(flag)})
+    
+    return jsonify({
+        'changes': changes,
+        'deleted': deleted,
+        'next': encode_sync_token(since),
+        'more': len(rows) > limit
+    })
+
+# Export expenses as CSV or newline-delimited JSON, streamed in batches
+@app.route('/export/expenses.<any(csv, ndjson):export_format>')
+def export_expenses(export_format):
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    try:
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else date.min
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else date.max
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    category_id = request.args.get('category_id', type=int)
+    user_id = session['user_id']
+    
+    def generate():
+        batches = get_repository().export_expenses(user_id, start_date, end_date, category_id,
+                                                   EXPORT_FETCH_SIZE)
+        buffer = io.StringIO()
+        if export_format == 'csv':
+            writer = csv.writer(buffer)
+            writer.writerow(['id', 'date', 'category', 'amount', 'description'])
+        for rows in batches:
+            if export_format == 'csv':
+                writer.writerows((row[0], row[1].strftime('%Y-%m-%d'), row[2], row[3], row[4])
+                                 for row in rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps({'id': row[0], 'date': row[1].strftime('%Y-%m-%d'),
+                                             'category': row[2], 'amount': float(row[3]),
+                                             'description': row[4]}))
+                    buffer.write('\n')
+            # Yield one chunk per fetched batch and reuse the buffer
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    # stream_with_context keeps the request (and its pooled connection) alive
+    # until the generator is exhausted
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=expenses.{export_format}',
+        'X-Accel-Buffering': 'no'
+    })
+
+def has_provision_token(authorization):
+    """True if the Authorization header value carries PROVISION_TOKEN as a Bearer token"""
+    return bool(PROVISION_TOKEN) and hmac.compare_digest(authorization or '', f'Bearer {PROVISION_TOKEN}')
+
+def has_metrics_token(authorization):
+    """True if the Authorization header value carries METRICS_TOKEN as a Bearer token"""
+    return bool(METRICS_TOKEN) and hmac.compare_digest(authorization or '', f'Bearer {METRICS_TOKEN}')
+
+# Connection pool statistics for sizing the pool under real traffic
+@app.route('/api/pool-stats')
+def pool_stats():
+    if not METRICS_TOKEN:
+        abort(404)
+    if not has_metrics_token(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify(db_engine.stats())
+
+# Bulk user provisioning for partner sign-ups: a JSON {"users": [{name, email, password}]}
+# body or a CSV with name,email,password columns
+@app.route('/api/provision', methods=['POST'])
+def provision_users():
+    if not PROVISION_TOKEN:
+        abort(404)
+    if not has_provision_token(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if request.mimetype == 'text/csv':
+        users = read_users_csv(open_text(request.stream))
+    else:
+        users = ((user.get('name'), user.get('email'), user.get('password'))
+                 for user in (request.get_json(silent=True) or {}).get('users', []))
+    
+    return jsonify(provision(get_repository(), users, DEFAULT_CATEGORIES, PROVISION_BATCH_SIZE))
+
+# SQL metrics in the Prometheus text format
+@app.route('/metrics')
+def metrics():
+    if not METRICS_TOKEN:
+        abort(404)
+    if not has_metrics_token(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    gauges = {f'pool_{key}': value for key, value in db_engine.stats().items()
+              if isinstance(value, (int, float))}
+    return Response(sql_metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+# Fingerprinted static files; the name changes whenever the content does
+@app.route('/static/<path:filename>')
+def static_asset(filename):
+    found = static_assets.get(filename, assets.accepted_encoding(request.accept_encodings))
+    if found is None:
+        abort(404)
+    
+    body, mimetype, encoding = found
+    response = Response(body, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+    return response
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
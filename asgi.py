@@ -0,0 +1,216 @@
+"""
+Expense Tracker ASGI server
+
+Serves the busiest read-only routes (the dashboard, the expense listing API and
+the budgets page) from async views running on python-oracledb's asyncio pool,
+so a worker can serve other requests while it waits on the database.
+Independent queries within a request are awaited together and run
+concurrently on separate pooled connections. Every other route, and every
+write, is passed through to the Flask app in app.py, which runs in a thread
+pool as before. Both halves share the session cookie and templates. See
+"Async serving mode" in the README for how this compares with gunicorn's
+threaded workers.
+
+Run with an ASGI server, e.g.: hypercorn asgi:application
+Requires: pip install quart asgiref
+"""
+
+import asyncio
+from datetime import date
+
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, abort, jsonify, redirect, render_template, request, session, url_for
+from quart.sessions import SessionInterface
+from quart.utils import run_sync
+from werkzeug.exceptions import HTTPException
+
+import assets
+from app import (app as flask_app, db_engine as threaded_engine, DB_BACKEND, DB_USER,
+                 DB_PASSWORD, DB_DSN, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_INCREMENT,
+                 DB_POOL_WAIT_TIMEOUT, DASHBOARD_PAGE_SIZE, API_PAGE_SIZE, API_MAX_PAGE_SIZE,
+                 COMPRESS_MIN_SIZE, METRICS_TOKEN, SESSION_STORE, chart_start_month, data_versions,
+                 decode_expense_cursor, encode_expense_cursor, has_metrics_token, monthly_chart,
+                 reference_cache, reference_versions, report_cache, static_assets)
+
+
+class ServerSideSessions(SessionInterface):
+    """Runs the Flask app's server-side session interface (see sessions.py) off the event loop"""
+
+    def __init__(self, interface):
+        self.interface = interface
+
+    async def open_session(self, app, request):
+        return await run_sync(self.interface.open_session)(app, request)
+
+    async def save_session(self, app, session, response):
+        await run_sync(self.interface.save_session)(app, session, response)
+
+
+# Static files are served by the Flask app
+quart_app = Quart(__name__, static_folder=None)
+# Same key and cookie format as Flask, so sessions work across both apps
+quart_app.secret_key = flask_app.secret_key
+if SESSION_STORE != 'cookie':
+    quart_app.session_interface = ServerSideSessions(flask_app.session_interface)
+
+@quart_app.template_global()
+def asset_url(filename):
+    """See app.asset_url"""
+    return url_for('static_asset', filename=static_assets.hashed_name(filename))
+
+@quart_app.after_request
+async def compress_response(response):
+    """See app.compress_response"""
+    if (response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype not in assets.COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = assets.accepted_encoding(request.accept_encodings)
+    body = await response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_SIZE:
+        return response
+    
+    assets.set_compressed_body(response, body, encoding)
+    return response
+
+db_engine = None
+
+@quart_app.before_serving
+async def open_pool():
+    # The asyncio pool must be created inside the server's event loop
+    global db_engine
+    if DB_BACKEND != 'oracle':
+        return
+    from storage.oracle_async import AsyncOracleEngine
+    db_engine = AsyncOracleEngine(DB_USER, DB_PASSWORD, DB_DSN, pool_min=DB_POOL_MIN,
+                                  pool_max=DB_POOL_MAX, pool_increment=DB_POOL_INCREMENT,
+                                  wait_timeout=DB_POOL_WAIT_TIMEOUT)
+
+@quart_app.after_serving
+async def close_pool():
+    if db_engine is not None:
+        await db_engine.close()
+
+# Dashboard: List expenses and summary (one round-trip, see app.dashboard)
+@quart_app.route('/dashboard')
+async def dashboard():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    today = date.today()
+    data = await db_engine.repository().dashboard(session['user_id'], DASHBOARD_PAGE_SIZE + 1,
+                                                  date(today.year, today.month, 1),
+                                                  chart_start_month(today))
+
+    expenses = data['expenses']
+    next_cursor = None
+    if len(expenses) > DASHBOARD_PAGE_SIZE:
+        expenses = expenses[:DASHBOARD_PAGE_SIZE]
+        next_cursor = encode_expense_cursor(expenses[-1])
+
+    return await render_template('dashboard.html',
+                                 expenses=expenses,
+                                 next_cursor=next_cursor,
+                                 monthly_total=data['month_total'],
+                                 category_totals=data['category_totals'],
+                                 alert_count=data['alert_count'],
+                                 chart_data=monthly_chart(data['monthly_totals']))
+
+# Budget Management (the form POST is handled by the Flask app)
+@quart_app.route('/budgets', methods=['GET'])
+async def manage_budgets():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    # Same caches as app.reference_data and app.budget_status; whatever
+    # misses is fetched concurrently
+    user_id = session['user_id']
+    today = date.today()
+    version = reference_versions.get(user_id, session.get('reference_version', 0))
+    categories = reference_cache.get(user_id, 'categories', version)
+    limits = reference_cache.get(user_id, 'budget_limits', version)
+    status_version = data_versions.get(user_id, session.get('data_version', 0))
+    status = report_cache.get(user_id, ('budget_status', today), status_version)
+
+    repo = db_engine.repository()
+    queries = {}
+    if categories is None or limits is None:
+        queries['reference'] = repo.budgets_page(user_id)
+    if status is None:
+        queries['status'] = repo.budget_status(user_id, today)
+    results = dict(zip(queries, await asyncio.gather(*queries.values())))
+    if 'reference' in results:
+        categories, limits = results['reference']
+        reference_cache.put(user_id, 'categories', version, categories)
+        reference_cache.put(user_id, 'budget_limits', version, limits)
+    if 'status' in results:
+        status = results['status']
+        report_cache.put(user_id, ('budget_status', today), status_version, status)
+
+    return await render_template('budgets.html', categories=categories, limits=limits, status=status)
+
+# Keyset-paginated expense listing for infinite scroll
+@quart_app.route('/api/expenses')
+async def list_expenses():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    limit = min(max(request.args.get('limit', API_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+    after = request.args.get('after')
+    if after:
+        try:
+            after = decode_expense_cursor(after)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    rows = await db_engine.repository().expenses_page(session['user_id'], limit + 1, after or None)
+
+    return jsonify({
+        'expenses': [{
+            'id': row[0],
+            'date': row[1].strftime('%Y-%m-%d'),
+            'category': row[2],
+            'amount': float(row[3]),
+            'description': row[4]
+        } for row in rows[:limit]],
+        'next': encode_expense_cursor(rows[limit - 1]) if len(rows) > limit else None
+    })
+
+# Connection pool statistics for both halves of the server
+@quart_app.route('/api/pool-stats')
+async def pool_stats():
+    if not METRICS_TOKEN:
+        abort(404)
+    if not has_metrics_token(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    return jsonify({'async': db_engine.stats(), 'threaded': threaded_engine.stats()})
+
+ASYNC_ENDPOINTS = set(quart_app.view_functions)
+
+# Register the Flask app's remaining routes without a view, so url_for in the
+# shared templates can build their URLs; requests for them never reach Quart
+for rule in flask_app.url_map.iter_rules():
+    if rule.endpoint not in quart_app.view_functions:
+        quart_app.add_url_rule(rule.rule, rule.endpoint, methods=rule.methods, defaults=rule.defaults)
+
+wsgi_application = WsgiToAsgi(flask_app)
+async_routes = quart_app.url_map.bind('')
+
+def serves_async(scope):
+    """True if the request matches one of the async views above"""
+    try:
+        endpoint, _ = async_routes.match(scope['path'], method=scope['method'])
+    except HTTPException:
+        return False
+    return endpoint in ASYNC_ENDPOINTS
+
+async def application(scope, receive, send):
+    """ASGI entry point: dispatch each request to the async views or the Flask app"""
+    if scope['type'] == 'http' and (DB_BACKEND != 'oracle' or not serves_async(scope)):
+        # The async views need python-oracledb's asyncio pool; other backends
+        # are served entirely by the Flask app
+        await wsgi_application(scope, receive, send)
+    else:
+        # Async routes and lifespan events (which open and close the pool)
+        await quart_app(scope, receive, send)
@@ -0,0 +1,117 @@
+"""
+Static assets and response compression.
+
+Everything under static/ (including the vendored Bootstrap, Popper and
+Chart.js builds in static/vendor) is served under a content-hashed name, e.g.
+vendor/chart.js-4.4.0/chart.umd.min.3f2a9c81d0e4.js. The name changes
+whenever the file does, so assets can be cached by browsers and proxies
+forever. Templates link to them with asset_url('vendor/...').
+
+Compressible assets are compressed once, at the highest gzip/brotli level,
+and kept in memory. HTML, JSON and other text responses are compressed on the
+fly at a faster level. Brotli is used when the brotli package is installed and
+the client accepts it, gzip otherwise.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/csv', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+}
+
+# Hex digits of the SHA-256 content hash kept in fingerprinted names
+HASH_LENGTH = 12
+
+
+def accepted_encoding(accept_encodings):
+    """Pick 'br' or 'gzip' from the request's Accept-Encoding, or None for identity"""
+    if brotli is not None and accept_encodings['br'] > 0:
+        return 'br'
+    if accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, best=False):
+    """Compress data; best trades speed for size, for content compressed only once"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+
+
+def set_compressed_body(response, body, encoding):
+    """Replace a Flask or Quart response's body with body compressed on the fly"""
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed body is a different representation of the same content
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+class AssetManifest:
+    """Fingerprinted names of the files under a static directory, with their (compressed) contents"""
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self._hashed_names = {}
+        self._paths = {}
+        self._bodies = {}
+
+        for root, _, files in os.walk(static_dir):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, static_dir).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+                stem, extension = os.path.splitext(name)
+                hashed_name = f'{stem}.{digest}{extension}'
+                self._hashed_names[name] = hashed_name
+                self._paths[hashed_name] = path
+
+    def hashed_name(self, name):
+        """Return the fingerprinted name of a file, given its path relative to the static directory"""
+        return self._hashed_names[name]
+
+    def get(self, hashed_name, encoding):
+        """
+        Return (body, mimetype, content encoding or None) for a fingerprinted
+        name, compressed with encoding if that makes it smaller, or None if
+        there is no such asset.
+        """
+        path = self._paths.get(hashed_name)
+        if path is None:
+            return None
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mimetype not in COMPRESSIBLE_TYPES:
+            encoding = None
+
+        # Bodies are built on first use; two threads racing to build the same
+        # one just do the work twice
+        body = self._bodies.get((hashed_name, None))
+        if body is None:
+            with open(path, 'rb') as f:
+                body = self._bodies[(hashed_name, None)] = f.read()
+        if encoding is None:
+            return body, mimetype, None
+
+        compressed = self._bodies.get((hashed_name, encoding))
+        if compressed is None:
+            compressed = compress(body, encoding, best=True)
+            # An empty entry records that compression doesn't make this one smaller
+            if len(compressed) >= len(body):
+                compressed = b''
+            self._bodies[(hashed_name, encoding)] = compressed
+        if not compressed:
+            return body, mimetype, None
+        return compressed, mimetype, encoding
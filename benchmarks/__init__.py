@@ -0,0 +1,11 @@
+"""
+Load and latency benchmarks for the Expense Tracker.
+
+- benchmarks.generate bulk-loads a deterministic synthetic data set through
+  the storage layer, for whichever backend app.py is configured to use.
+- benchmarks.driver replays a login-then-browse workload against a running
+  server (or the app in-process) and writes per-route latency percentiles
+  and throughput as JSON, so results can be diffed between releases.
+- benchmarks.inserts measures batched and single-row insert throughput in a
+  rolled-back transaction.
+"""
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Load driver
+
+Each virtual user logs in as one of the generated users (see
+benchmarks.generate) and then browses: it picks routes at random with the
+weights in WORKLOAD and records every response time. At the end, per-route
+and overall count, errors, throughput and p50/p95/p99 latency are written as
+JSON.
+
+Against a running server:
+    python -m benchmarks.driver --url http://localhost:5000 --concurrency 16 --duration 60
+
+Without --url the app is driven in-process through Flask's test client,
+using the backend app.py is configured for.
+"""
+
+import argparse
+import http.cookiejar
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, datetime, timedelta
+
+from benchmarks.generate import EMAIL_PATTERN, PASSWORD
+
+# (route name, weight, method, path)
+WORKLOAD = [
+    ('dashboard', 30, 'GET', '/dashboard'),
+    ('chart_data', 10, 'GET', '/api/dashboard/chart-data'),
+    ('expenses_api', 10, 'GET', '/api/expenses'),
+    ('monthly_report', 20, 'GET', '/reports/monthly'),
+    ('trends', 15, 'GET', '/reports/trends?months=12'),
+    ('add_expense', 15, 'POST', '/add-expense'),
+]
+
+CATEGORY_OPTION_PATTERN = re.compile(r'<option value="(\d+)"')
+
+
+class HttpClient:
+    """One browser session against a running server; redirects are not followed"""
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), self._NoRedirect)
+
+    def request(self, method, path, data=None):
+        """Return (status, body)"""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(urllib.request.Request(self.base_url + path, data=body,
+                                                         method=method)) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class InProcessClient:
+    """One browser session driving the Flask app directly"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.get_data()
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0
+    return sorted_values[max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)]
+
+
+def summarize(samples, errors, elapsed):
+    """Latency statistics in milliseconds for a list of response times in seconds"""
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed > 0 else 0,
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3) if samples else 0,
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+        'max_ms': round(samples[-1] * 1000, 3) if samples else 0
+    }
+
+
+def virtual_user(number, client, args, deadline, results, lock):
+    """Log in, then request weighted random routes until the deadline or the request budget"""
+    rng = random.Random(args.seed * 1000 + number)
+    email = EMAIL_PATTERN.format(number % args.users)
+    status, _ = client.request('POST', '/', {'email': email, 'password': PASSWORD})
+    if status != 302:
+        raise RuntimeError(f'Login failed for {email} (HTTP {status}); run benchmarks.generate first')
+
+    _, form = client.request('GET', '/add-expense')
+    category_ids = CATEGORY_OPTION_PATTERN.findall(form.decode())
+
+    names = [route[0] for route in WORKLOAD]
+    weights = [route[1] for route in WORKLOAD]
+    routes = {route[0]: route for route in WORKLOAD}
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+
+    sent = 0
+    while time.monotonic() < deadline and (not args.requests or sent < args.requests):
+        name = rng.choices(names, weights)[0]
+        _, _, method, path = routes[name]
+        data = None
+        if name == 'add_expense':
+            data = {'category_id': rng.choice(category_ids),
+                    'amount': f'{rng.lognormvariate(3, 0.8):.2f}',
+                    'expense_date': (date.today() - timedelta(days=rng.randrange(30))).isoformat(),
+                    'description': 'Benchmark expense'}
+
+        start = time.perf_counter()
+        status, _ = client.request(method, path, data)
+        elapsed = time.perf_counter() - start
+        sent += 1
+
+        if status >= 400:
+            errors[name] += 1
+        else:
+            samples[name].append(elapsed)
+        if args.think_time:
+            time.sleep(rng.expovariate(1 / args.think_time))
+
+    with lock:
+        for name in names:
+            results['samples'][name].extend(samples[name])
+            results['errors'][name] += errors[name]
+
+
+def run(args):
+    if args.url:
+        make_client = lambda: HttpClient(args.url)
+    else:
+        from app import app
+        make_client = lambda: InProcessClient(app)
+
+    results = {'samples': {route[0]: [] for route in WORKLOAD},
+               'errors': {route[0]: 0 for route in WORKLOAD}}
+    lock = threading.Lock()
+    failures = []
+
+    def worker(number):
+        try:
+            virtual_user(number, make_client(), args, deadline, results, lock)
+        except Exception as e:
+            failures.append(str(e))
+
+    started_at = datetime.now().isoformat(timespec='seconds')
+    start = time.perf_counter()
+    deadline = time.monotonic() + args.duration
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if failures:
+        raise SystemExit(failures[0])
+
+    all_samples = [s for samples in results['samples'].values() for s in samples]
+    return {
+        'config': {
+            'url': args.url or 'in-process',
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'requests_per_user': args.requests,
+            'users': args.users,
+            'think_time': args.think_time,
+            'seed': args.seed
+        },
+        'started_at': started_at,
+        'elapsed_seconds': round(elapsed, 3),
+        'routes': {name: summarize(samples, results['errors'][name], elapsed)
+                   for name, samples in results['samples'].items()},
+        'total': summarize(all_samples, sum(results['errors'].values()), elapsed)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a login-then-browse workload and report latency')
+    parser.add_argument('--url', help='base URL of a running server (default: drive the app in-process)')
+    parser.add_argument('--concurrency', type=int, default=8, help='number of concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run for')
+    parser.add_argument('--requests', type=int, default=0,
+                        help='stop each virtual user after this many requests (0: run for --duration)')
+    parser.add_argument('--users', type=int, default=10, help='number of generated users to log in as')
+    parser.add_argument('--think-time', type=float, default=0,
+                        help='mean pause between requests of a virtual user, in seconds')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for the route mix')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        sys.stdout.write(report + '\n')
+
+
+if __name__ == "__main__":
+    main()
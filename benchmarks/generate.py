@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator
+
+Creates N users, each with the default categories, a couple of budget limits
+and M expenses spread over the last --days days. The same seed always
+produces the same data set. Data is loaded through the storage layer of the
+backend app.py is configured for (DB_BACKEND / SQLITE_PATH), using the batched
+import path.
+
+Usage: python -m benchmarks.generate --users 100 --expenses 5000 [--seed 42]
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from app import DEFAULT_CATEGORIES, db_engine
+
+EMAIL_PATTERN = 'bench-user-{}@example.com'
+PASSWORD = 'bench'
+
+# Share of day-to-day transactions, median amount and spread (sigma of the
+# log-normal distribution) per category; Housing is paid as monthly rent
+CATEGORY_PROFILES = {
+    'Food': (0.35, 12, 0.6),
+    'Transportation': (0.15, 15, 0.7),
+    'Entertainment': (0.12, 25, 0.8),
+    'Personal': (0.10, 30, 0.9),
+    'Healthcare': (0.05, 60, 1.0),
+    'Education': (0.03, 80, 1.0),
+    'Other': (0.20, 20, 1.0),
+}
+
+MERCHANTS = {
+    'Food': ['Fresh Market', 'Corner Cafe', 'Daily Bakery', 'Pizza Palace', 'Green Grocer', 'Sushi Bar'],
+    'Transportation': ['City Metro', 'Fuel Stop', 'Ride Share', 'Parking Garage', 'Bike Rental'],
+    'Entertainment': ['Cinema Plus', 'Streaming Service', 'Concert Hall', 'Book Nook', 'Game Store'],
+    'Personal': ['Hair Studio', 'Clothing Co', 'Pharmacy', 'Gym Membership', 'Gift Shop'],
+    'Healthcare': ['Dental Clinic', 'Family Doctor', 'Eye Care', 'Physio Center'],
+    'Education': ['Online Course', 'Textbook Store', 'Language School', 'Workshop'],
+    'Other': ['Hardware Store', 'Post Office', 'Charity Donation', 'Pet Supplies', 'Bank Fee'],
+    'Housing': ['Monthly Rent'],
+}
+
+# Rows per import batch (and per commit)
+BATCH_SIZE = 1000
+
+
+def expense_rows(rng, category_ids, count, start_date, days):
+    """Return count (category_id, amount, expense_date, description) rows for one user, oldest first"""
+    rows = []
+
+    # Rent on the first of every month in the range
+    rent = round(rng.lognormvariate(7.0, 0.3), 2)
+    month = date(start_date.year, start_date.month, 1)
+    end_date = start_date + timedelta(days=days)
+    while month <= end_date and len(rows) < count:
+        if month >= start_date:
+            rows.append((category_ids['Housing'], rent, month, MERCHANTS['Housing'][0]))
+        month = date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+    names = list(CATEGORY_PROFILES)
+    weights = [CATEGORY_PROFILES[name][0] for name in names]
+    for name in rng.choices(names, weights, k=count - len(rows)):
+        _, median, sigma = CATEGORY_PROFILES[name]
+        amount = round(max(rng.lognormvariate(0, sigma) * median, 0.5), 2)
+        expense_date = start_date + timedelta(days=rng.randrange(days + 1))
+        rows.append((category_ids[name], amount, expense_date,
+                     f'{rng.choice(MERCHANTS[name])} #{rng.randrange(1000)}'))
+
+    rows.sort(key=lambda row: row[2])
+    return rows
+
+
+def generate(users, expenses, days, seed, end_date):
+    """Load the data set and return load statistics"""
+    rng = random.Random(seed)
+    start_date = end_date - timedelta(days=days)
+    stats = {'users': 0, 'skipped_users': 0, 'expenses': 0}
+    started = time.perf_counter()
+
+    repo = db_engine.repository(db_engine.acquire())
+    try:
+        for n in range(users):
+            # Draw this user's data even if they exist, so the rest stays deterministic
+            user_rng = random.Random(rng.random())
+            email = EMAIL_PATTERN.format(n)
+            if repo.email_exists(email):
+                stats['skipped_users'] += 1
+                continue
+
+            user_id = repo.create_user(f'Bench User {n}', email, PASSWORD)
+            repo.add_categories(user_id, DEFAULT_CATEGORIES)
+            category_ids = {name: category_id for category_id, name in repo.categories(user_id)}
+            repo.commit()
+
+            rows = expense_rows(user_rng, category_ids, expenses, start_date, days)
+            for i in range(0, len(rows), BATCH_SIZE):
+                repo.import_expenses(user_id, rows[i:i + BATCH_SIZE])
+                repo.commit()
+
+            # Limits are added after the history, so loading doesn't raise alerts
+            monthly_budget = max(round(expenses / days * 30 * 40, -2), 100)
+            repo.add_budget_limit(user_id, None, monthly_budget, 'monthly')
+            repo.add_budget_limit(user_id, category_ids['Food'], 150, 'weekly')
+            repo.commit()
+
+            stats['users'] += 1
+            stats['expenses'] += len(rows)
+    finally:
+        db_engine.release(repo.conn)
+
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = round(elapsed, 3)
+    stats['expenses_per_second'] = round(stats['expenses'] / elapsed, 1) if elapsed > 0 else 0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-load a deterministic synthetic data set')
+    parser.add_argument('--users', type=int, default=10, help='number of users to create')
+    parser.add_argument('--expenses', type=int, default=1000, help='expenses per user')
+    parser.add_argument('--days', type=int, default=730, help='days of history to spread expenses over')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(),
+                        help='last day of the generated history (YYYY-MM-DD, default today)')
+    args = parser.parse_args()
+
+    stats = generate(args.users, args.expenses, args.days, args.seed, args.end_date)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
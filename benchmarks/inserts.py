@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Insert throughput benchmark
+
+Creates a scratch user and inserts synthetic expenses twice: through the
+batched import path (array DML returning the generated keys) and one at a
+time through add_expense, the path the Add Expense form takes. Everything
+runs in one transaction that is rolled back at the end, so the benchmark can
+be pointed at a loaded database and run before and after a schema change
+(e.g. migration V003) to compare rows per second.
+
+Usage: python -m benchmarks.inserts --rows 20000 [--batch-size 1000] [--single-rows 2000]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+from app import DEFAULT_CATEGORIES, db_engine
+from benchmarks.generate import expense_rows
+
+
+def timed(rows, insert):
+    """Run insert() and return its throughput statistics"""
+    start = time.perf_counter()
+    insert()
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else 0
+    }
+
+
+def run(rows, batch_size, single_rows, seed):
+    rng = random.Random(seed)
+    end_date = date.today()
+    start_date = end_date - timedelta(days=365)
+
+    repo = db_engine.repository(db_engine.acquire())
+    try:
+        user_id = repo.create_user('Insert Benchmark', f'bench-inserts-{uuid.uuid4().hex}@example.com',
+                                   'bench')
+        repo.add_categories(user_id, DEFAULT_CATEGORIES)
+        category_ids = {name: category_id for category_id, name in repo.categories(user_id)}
+
+        batched = expense_rows(rng, category_ids, rows, start_date, 365)
+        single = expense_rows(rng, category_ids, single_rows, start_date, 365)
+
+        def insert_batched():
+            for i in range(0, len(batched), batch_size):
+                repo.import_expenses(user_id, batched[i:i + batch_size])
+
+        def insert_single():
+            for category_id, amount, expense_date, description in single:
+                repo.add_expense(user_id, category_id, amount, expense_date, description)
+
+        results = {
+            'batched': dict(timed(len(batched), insert_batched), batch_size=batch_size),
+            'single': timed(len(single), insert_single)
+        }
+    finally:
+        repo.rollback()
+        db_engine.release(repo.conn)
+
+    return {
+        'config': {'backend': type(repo).__name__, 'rows': rows, 'batch_size': batch_size,
+                   'single_rows': single_rows, 'seed': seed},
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure expense insert throughput in a rolled-back transaction')
+    parser.add_argument('--rows', type=int, default=20000, help='expenses to insert through the batched import')
+    parser.add_argument('--batch-size', type=int, default=1000, help='rows per import batch')
+    parser.add_argument('--single-rows', type=int, default=2000,
+                        help='expenses to insert one at a time through add_expense')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = json.dumps(run(args.rows, max(args.batch_size, 1), args.single_rows, args.seed), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        sys.stdout.write(report + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Report fetch benchmark
+
+Creates a scratch user with synthetic expenses and builds the trends chart
+and the monthly comparison report repeatedly, two ways: from rows fetched as
+Python tuples (converted value by value for the trends, or transposed into
+columns in Python for the comparison), and from the columns returned by the
+repository, which the Oracle backend fetches into Arrow buffers when pyarrow
+is installed. Both must produce the same report. Everything runs in one
+transaction that is rolled back at the end.
+
+Usage: python -m benchmarks.reports --expenses 200000 [--days 3650] [--repeat 20]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+import trends
+from app import COMPARISON_STATS, DEFAULT_CATEGORIES, comparison_report, db_engine
+from benchmarks.generate import expense_rows
+from storage.base import COMPARISON_PERIODS, column_array, comparison_binds
+
+
+def columns_from_rows(rows, names):
+    """Columns transposed from rows fetched as tuples"""
+    columns = zip(*rows) if rows else [()] * len(names)
+    return {name: column_array(values) for name, values in zip(names, columns)}
+
+
+def chart_from_rows(rows, edges, granularity):
+    """The trends chart built from rows transposed in Python"""
+    starts, names, totals = zip(*rows) if rows else ((), (), ())
+    return trends.trend_chart({'bucket_start': starts, 'category_name': names, 'total_amount': totals},
+                              edges, granularity)
+
+
+def timed(repeat, build):
+    """Run build() repeat times and return its timings in milliseconds"""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        seconds.append(time.perf_counter() - start)
+    return {'median_ms': round(statistics.median(seconds) * 1000, 3), 'min_ms': round(min(seconds) * 1000, 3)}
+
+
+def compare(repeat, from_rows, from_columns):
+    """Time both paths, after checking that they build the same report"""
+    if from_rows() != from_columns():
+        raise AssertionError('The row and column paths built different reports')
+    rows, columns = timed(repeat, from_rows), timed(repeat, from_columns)
+    return {'rows': rows, 'columns': columns,
+            'speedup': round(rows['median_ms'] / columns['median_ms'], 2) if columns['median_ms'] else None}
+
+
+def run(expenses, days, repeat, seed):
+    rng = random.Random(seed)
+    end_date = date.today()
+    start_date = end_date - timedelta(days=days)
+
+    repo = db_engine.repository(db_engine.acquire())
+    try:
+        user_id = repo.create_user('Report Benchmark', f'bench-reports-{uuid.uuid4().hex}@example.com',
+                                   'bench')
+        repo.add_categories(user_id, DEFAULT_CATEGORIES)
+        category_ids = {name: category_id for category_id, name in repo.categories(user_id)}
+        rows = expense_rows(rng, category_ids, expenses, start_date, days)
+        for i in range(0, len(rows), 1000):
+            repo.import_expenses(user_id, rows[i:i + 1000])
+
+        results = {}
+        for granularity in ('day', 'week', 'month'):
+            edges = trends.bucket_edges(start_date, end_date, granularity)
+            params = {'user_id': user_id, 'start_date': edges[0].item(), 'end_date': edges[-1].item()}
+            results[f'trends_{granularity}'] = dict(
+                compare(repeat,
+                        lambda: chart_from_rows(repo._fetchall(f'category_trends_{granularity}', params),
+                                                edges, granularity),
+                        lambda: trends.trend_chart(repo.category_trends(user_id, granularity, params['start_date'],
+                                                                        params['end_date']),
+                                                   edges, granularity)),
+                result_rows=len(repo._fetchall(f'category_trends_{granularity}', params)))
+
+        month_start = end_date.replace(day=1)
+        params = comparison_binds(user_id, month_start)
+        names = ['category_name'] + [f'{period}_{stat}' for period in COMPARISON_PERIODS
+                                     for stat in COMPARISON_STATS]
+        results['period_comparison'] = compare(
+            repeat,
+            lambda: comparison_report(columns_from_rows(repo._fetchall('period_comparison', params), names),
+                                      month_start),
+            lambda: comparison_report(repo.period_comparison(user_id, month_start), month_start))
+    finally:
+        repo.rollback()
+        db_engine.release(repo.conn)
+
+    return {
+        'config': {'backend': type(repo).__name__, 'expenses': expenses, 'days': days, 'repeat': repeat,
+                   'seed': seed},
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare row-by-row and columnar fetching for the reports')
+    parser.add_argument('--expenses', type=int, default=200000, help='expenses for the scratch user')
+    parser.add_argument('--days', type=int, default=3650, help='days the expenses are spread over')
+    parser.add_argument('--repeat', type=int, default=20, help='times each report is built per path')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = json.dumps(run(args.expenses, max(args.days, 1), max(args.repeat, 1), args.seed), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        sys.stdout.write(report + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Expense Tracker Query Plan Check
+
+Runs EXPLAIN PLAN for every statement the application issues (the SQL in
+storage/oracle.py plus the hot queries inside the PL/SQL procedures) and
+fails if any plan contains a full table scan.
+
+Run it against a database holding representative data with up-to-date
+optimizer statistics: on a nearly empty schema the optimizer will rightly
+prefer full scans of tiny tables.
+
+Usage: python check_plans.py [--allow statement_name ...]
+"""
+
+import argparse
+import re
+import sys
+from datetime import date
+
+import oracledb
+
+from setup_database import DB_USER, DB_PASSWORD, DB_DSN, print_header
+from storage.oracle import OracleRepository
+
+# Queries run inside database.sql's PL/SQL, written with bind variables in
+# place of the procedure parameters
+PLSQL_STATEMENTS = {
+    # The whole seeding INSERT, so that the plan covers overall limits
+    # (category_id IS NULL), whose seed sums every category
+    'apply_expense_to_ledger:seed': '''
+        INSERT INTO Budget_Ledger (limit_id, period_start, period_end, user_id, spent)
+        SELECT p.limit_id, p.period_start, p.period_end, :user_id,
+               (SELECT NVL(SUM(e.amount), 0)
+                FROM Expenses e
+                WHERE e.user_id = :user_id
+                AND (p.category_id IS NULL OR e.category_id = p.category_id)
+                AND e.expense_date >= p.period_start
+                AND e.expense_date < p.period_end)
+        FROM (
+            SELECT limit_id, category_id, period_start,
+                   CASE period
+                       WHEN 'daily' THEN period_start + 1
+                       WHEN 'weekly' THEN period_start + 7
+                       ELSE ADD_MONTHS(period_start, 1)
+                   END AS period_end
+            FROM (
+                SELECT limit_id, category_id, NVL(period, 'monthly') AS period,
+                       CASE NVL(period, 'monthly')
+                           WHEN 'daily' THEN TRUNC(:expense_date)
+                           WHEN 'weekly' THEN TRUNC(:expense_date, 'IW')
+                           ELSE TRUNC(:expense_date, 'MM')
+                       END AS period_start
+                FROM Expense_Limits
+                WHERE user_id = :user_id
+                AND (category_id = :category_id OR category_id IS NULL)
+            )
+        ) p
+        WHERE NOT EXISTS (
+            SELECT 1 FROM Budget_Ledger b
+            WHERE b.limit_id = p.limit_id AND b.period_start = p.period_start
+        )
+    ''',
+    'apply_expense_to_ledger:update': '''
+        UPDATE Budget_Ledger
+        SET spent = spent + :amount
+        WHERE user_id = :user_id
+        AND period_start <= :expense_date
+        AND period_end > :expense_date
+        AND limit_id IN (
+            SELECT limit_id FROM Expense_Limits
+            WHERE user_id = :user_id
+            AND (category_id = :category_id OR category_id IS NULL)
+        )
+    ''',
+    'check_expense_limit': '''
+        SELECT 1, l.limit_amount
+        FROM Budget_Ledger b
+        JOIN Expense_Limits l ON l.limit_id = b.limit_id
+        WHERE b.user_id = :user_id
+        AND b.period_start <= :expense_date
+        AND b.period_end > :expense_date
+        AND (l.category_id = :category_id OR l.category_id IS NULL)
+        AND l.limit_amount > 0
+        AND b.spent > l.limit_amount
+        ORDER BY CASE WHEN l.category_id IS NULL THEN 1 ELSE 0 END, l.limit_amount
+        FETCH FIRST 1 ROW ONLY
+    ''',
+}
+
+BIND_PATTERN = re.compile(r'(?<!:):(\w+)')
+# String literals and quoted identifiers, which may contain colons that aren't
+# binds (e.g. the HH24:MI:SS of a date format)
+QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'|\"[^\"]*\"")
+RETURNING_PATTERN = re.compile(r'\s+RETURNING\s.*$', re.IGNORECASE | re.DOTALL)
+
+
+def sample_value(name):
+    """Return a representative value for a bind variable, chosen by its name"""
+    if any(part in name for part in ('date', 'day', 'week', 'month', 'period_', 'scan_')):
+        return date.today()
+    if name in ('email', 'password', 'name', 'category_name', 'description', 'period', 'query'):
+        return 'sample'
+    if name == 'emails':
+        return '["sample"]'
+    if name == 'alert_ids':
+        return '[1]'
+    return 1
+
+
+def explain(cursor, name, sql):
+    """Return the (operation, options, object_name) rows of the statement's plan"""
+    # EXPLAIN PLAN does not accept a RETURNING INTO clause
+    sql = RETURNING_PATTERN.sub('', sql)
+    names = BIND_PATTERN.findall(QUOTED_PATTERN.sub('', sql))
+    binds = {bind: sample_value(bind) for bind in dict.fromkeys(names)}
+    statement_id = name[:30]
+    cursor.execute('DELETE FROM plan_table WHERE statement_id = :statement_id',
+                   {'statement_id': statement_id})
+    cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {sql}", binds)
+    cursor.execute('''
+        SELECT operation, options, object_name
+        FROM plan_table
+        WHERE statement_id = :statement_id
+        ORDER BY id
+    ''', {'statement_id': statement_id})
+    return cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if any application query plan does a full table scan')
+    parser.add_argument('--allow', nargs='*', default=[], help='statement names allowed to full scan')
+    args = parser.parse_args()
+
+    print_header("Checking query plans")
+
+    statements = dict(OracleRepository.SQL, **PLSQL_STATEMENTS)
+    conn = oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN)
+    cursor = conn.cursor()
+
+    failures = []
+    for name, sql in statements.items():
+        if sql.strip().upper().startswith('BEGIN'):
+            # Anonymous PL/SQL blocks have no plan; their queries are listed above
+            continue
+        plan = explain(cursor, name, sql.strip())
+        full_scans = [object_name for operation, options, object_name in plan
+                      if operation == 'TABLE ACCESS' and options == 'FULL']
+        if full_scans and name not in args.allow:
+            failures.append(name)
+            print(f"❌ {name}: full table scan of {', '.join(full_scans)}")
+        else:
+            print(f"✅ {name}")
+
+    conn.rollback()
+    cursor.close()
+    conn.close()
+
+    if failures:
+        print(f"\n❌ {len(failures)} of {len(statements)} statements do a full table scan")
+        sys.exit(1)
+    print(f"\n✅ No full table scans in {len(statements)} statements")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,232 +6,464 @@
 -- PART 1: DATABASE SCHEMA (TABLES, SEQUENCES, TRIGGERS)
 -- =============================================================================
 
+-- Primary keys come from cached sequences used as column defaults rather than
+-- BEFORE INSERT triggers: no PL/SQL call per row, and the data dictionary is
+-- only updated once per CACHE values, so bulk inserts are not serialised
+-- Create sequence for Users
+CREATE SEQUENCE seq_users START WITH 1 INCREMENT BY 1 CACHE 100;
+
 -- Create Users table
 CREATE TABLE Users (
-    user_id NUMBER PRIMARY KEY,
+    user_id NUMBER DEFAULT seq_users.NEXTVAL PRIMARY KEY,
     name VARCHAR2(100) NOT NULL,
     email VARCHAR2(100) NOT NULL UNIQUE,
-    password VARCHAR2(255) NOT NULL
+    password VARCHAR2(255) NOT NULL,
+    unread_alerts NUMBER DEFAULT 0 NOT NULL,
+    change_version NUMBER DEFAULT 0 NOT NULL
 );
 
--- Create sequence for Users
-CREATE SEQUENCE seq_users START WITH 1 INCREMENT BY 1;
-
--- Create trigger for Users
-CREATE OR REPLACE TRIGGER trg_users
-BEFORE INSERT ON Users
-FOR EACH ROW
-WHEN (NEW.user_id IS NULL)
-BEGIN
-    SELECT seq_users.NEXTVAL INTO :NEW.user_id FROM dual;
-END;
-/
+-- Create sequence for Categories
+CREATE SEQUENCE seq_categories START WITH 1 INCREMENT BY 1 CACHE 100;
 
 -- Create Categories table
 CREATE TABLE Categories (
-    category_id NUMBER PRIMARY KEY,
+    category_id NUMBER DEFAULT seq_categories.NEXTVAL PRIMARY KEY,
     user_id NUMBER NOT NULL,
     category_name VARCHAR2(100) NOT NULL,
     description VARCHAR2(255),
+    row_version NUMBER DEFAULT 0 NOT NULL,
     CONSTRAINT fk_user_category FOREIGN KEY (user_id) REFERENCES Users(user_id)
 );
 
--- Create sequence for Categories
-CREATE SEQUENCE seq_categories START WITH 1 INCREMENT BY 1;
-
--- Create trigger for Categories
-CREATE OR REPLACE TRIGGER trg_categories
-BEFORE INSERT ON Categories
-FOR EACH ROW
-WHEN (NEW.category_id IS NULL)
-BEGIN
-    SELECT seq_categories.NEXTVAL INTO :NEW.category_id FROM dual;
-END;
-/
+-- Create sequence for Expenses
+CREATE SEQUENCE seq_expenses START WITH 1 INCREMENT BY 1 CACHE 1000;
 
 -- Create Expenses table
 CREATE TABLE Expenses (
-    expense_id NUMBER PRIMARY KEY,
+    expense_id NUMBER DEFAULT seq_expenses.NEXTVAL PRIMARY KEY,
     user_id NUMBER NOT NULL,
     category_id NUMBER NOT NULL,
     amount NUMBER(10,2) NOT NULL,
     expense_date DATE NOT NULL,
     description VARCHAR2(4000),
+    row_version NUMBER DEFAULT 0 NOT NULL,
     CONSTRAINT fk_user_expense FOREIGN KEY (user_id) REFERENCES Users(user_id),
     CONSTRAINT fk_category_expense FOREIGN KEY (category_id) REFERENCES Categories(category_id)
 );
 
--- Create sequence for Expenses
-CREATE SEQUENCE seq_expenses START WITH 1 INCREMENT BY 1;
-
--- Create trigger for Expenses
-CREATE OR REPLACE TRIGGER trg_expenses
-BEFORE INSERT ON Expenses
-FOR EACH ROW
-WHEN (NEW.expense_id IS NULL)
-BEGIN
-    SELECT seq_expenses.NEXTVAL INTO :NEW.expense_id FROM dual;
-END;
-/
+-- Create sequence for Expense_Limits
+CREATE SEQUENCE seq_limits START WITH 1 INCREMENT BY 1 CACHE 100;
 
 -- Create Expense_Limits table
 CREATE TABLE Expense_Limits (
-    limit_id NUMBER PRIMARY KEY,
+    limit_id NUMBER DEFAULT seq_limits.NEXTVAL PRIMARY KEY,
     user_id NUMBER NOT NULL,
     category_id NUMBER,
     limit_amount NUMBER(10,2) NOT NULL,
     period VARCHAR2(20) DEFAULT 'monthly',
+    row_version NUMBER DEFAULT 0 NOT NULL,
     CONSTRAINT fk_user_limit FOREIGN KEY (user_id) REFERENCES Users(user_id),
     CONSTRAINT fk_category_limit FOREIGN KEY (category_id) REFERENCES Categories(category_id)
 );
 
--- Create sequence for Expense_Limits
-CREATE SEQUENCE seq_limits START WITH 1 INCREMENT BY 1;
-
--- Create trigger for Expense_Limits
-CREATE OR REPLACE TRIGGER trg_limits
-BEFORE INSERT ON Expense_Limits
-FOR EACH ROW
-WHEN (NEW.limit_id IS NULL)
-BEGIN
-    SELECT seq_limits.NEXTVAL INTO :NEW.limit_id FROM dual;
-END;
-/
+-- Create sequence for Expense_Alerts
+CREATE SEQUENCE seq_alerts START WITH 1 INCREMENT BY 1 CACHE 1000;
 
 -- Create Expense_Alerts table
 CREATE TABLE Expense_Alerts (
-    alert_id NUMBER PRIMARY KEY,
+    alert_id NUMBER DEFAULT seq_alerts.NEXTVAL PRIMARY KEY,
     user_id NUMBER NOT NULL,
     expense_id NUMBER NOT NULL,
     alert_date DATE DEFAULT SYSDATE,
     limit_amount NUMBER(10,2) NOT NULL,
     is_read NUMBER(1) DEFAULT 0,
+    row_version NUMBER DEFAULT 0 NOT NULL,
     CONSTRAINT fk_user_alert FOREIGN KEY (user_id) REFERENCES Users(user_id),
     CONSTRAINT fk_expense_alert FOREIGN KEY (expense_id) REFERENCES Expenses(expense_id)
 );
 
--- Create sequence for Expense_Alerts
-CREATE SEQUENCE seq_alerts START WITH 1 INCREMENT BY 1;
+-- Create Expense_Monthly_Rollup table
+-- Per-user, per-category monthly aggregates read by the dashboard and reports,
+-- so report cost depends on the number of months shown rather than on the
+-- number of expenses recorded. Maintained by trg_expenses_rollup.
+CREATE TABLE Expense_Monthly_Rollup (
+    user_id NUMBER NOT NULL,
+    category_id NUMBER NOT NULL,
+    month_start DATE NOT NULL,
+    total_amount NUMBER(14,2) DEFAULT 0 NOT NULL,
+    expense_count NUMBER DEFAULT 0 NOT NULL,
+    min_amount NUMBER(10,2),
+    max_amount NUMBER(10,2),
+    CONSTRAINT pk_expense_rollup PRIMARY KEY (user_id, category_id, month_start)
+) ORGANIZATION INDEX;
+
+-- Keep the rollup in step with Expenses. Inserts are applied incrementally;
+-- an update or delete may remove a month's MIN/MAX, so the affected months
+-- are recomputed once the statement has finished (Expenses cannot be queried
+-- from the row-level section while it is mutating).
+CREATE OR REPLACE TRIGGER trg_expenses_rollup
+FOR INSERT OR UPDATE OR DELETE ON Expenses
+COMPOUND TRIGGER
+    TYPE t_rollup_key IS RECORD (
+        user_id NUMBER,
+        category_id NUMBER,
+        month_start DATE
+    );
+    TYPE t_rollup_keys IS TABLE OF t_rollup_key INDEX BY PLS_INTEGER;
+    g_keys t_rollup_keys;
+
+    PROCEDURE remember_key(p_user_id NUMBER, p_category_id NUMBER, p_expense_date DATE) IS
+        v_index PLS_INTEGER := g_keys.COUNT + 1;
+    BEGIN
+        g_keys(v_index).user_id := p_user_id;
+        g_keys(v_index).category_id := p_category_id;
+        g_keys(v_index).month_start := TRUNC(p_expense_date, 'MM');
+    END remember_key;
+
+    AFTER EACH ROW IS
+    BEGIN
+        IF INSERTING THEN
+            MERGE INTO Expense_Monthly_Rollup r
+            USING (
+                SELECT :NEW.user_id AS user_id,
+                       :NEW.category_id AS category_id,
+                       TRUNC(:NEW.expense_date, 'MM') AS month_start,
+                       :NEW.amount AS amount
+                FROM dual
+            ) s
+            ON (r.user_id = s.user_id AND r.category_id = s.category_id AND r.month_start = s.month_start)
+            WHEN MATCHED THEN UPDATE SET
+                r.total_amount = r.total_amount + s.amount,
+                r.expense_count = r.expense_count + 1,
+                r.min_amount = LEAST(r.min_amount, s.amount),
+                r.max_amount = GREATEST(r.max_amount, s.amount)
+            WHEN NOT MATCHED THEN INSERT (user_id, category_id, month_start, total_amount,
+                                          expense_count, min_amount, max_amount)
+                VALUES (s.user_id, s.category_id, s.month_start, s.amount, 1, s.amount, s.amount);
+        ELSE
+            remember_key(:OLD.user_id, :OLD.category_id, :OLD.expense_date);
+            IF UPDATING THEN
+                remember_key(:NEW.user_id, :NEW.category_id, :NEW.expense_date);
+            END IF;
+        END IF;
+    END AFTER EACH ROW;
+
+    AFTER STATEMENT IS
+    BEGIN
+        FOR i IN 1 .. g_keys.COUNT LOOP
+            DELETE FROM Expense_Monthly_Rollup
+            WHERE user_id = g_keys(i).user_id
+            AND category_id = g_keys(i).category_id
+            AND month_start = g_keys(i).month_start;
+
+            INSERT INTO Expense_Monthly_Rollup (user_id, category_id, month_start, total_amount,
+                                                expense_count, min_amount, max_amount)
+            SELECT g_keys(i).user_id, g_keys(i).category_id, g_keys(i).month_start,
+                   SUM(amount), COUNT(*), MIN(amount), MAX(amount)
+            FROM Expenses
+            WHERE user_id = g_keys(i).user_id
+            AND category_id = g_keys(i).category_id
+            AND expense_date >= g_keys(i).month_start
+            AND expense_date < ADD_MONTHS(g_keys(i).month_start, 1)
+            HAVING COUNT(*) > 0;
+        END LOOP;
+        g_keys.DELETE;
+    END AFTER STATEMENT;
+END trg_expenses_rollup;
+/
+
+-- Populate the rollup for expenses recorded before it existed
+INSERT INTO Expense_Monthly_Rollup (user_id, category_id, month_start, total_amount,
+                                    expense_count, min_amount, max_amount)
+SELECT e.user_id, e.category_id, TRUNC(e.expense_date, 'MM'),
+       SUM(e.amount), COUNT(*), MIN(e.amount), MAX(e.amount)
+FROM Expenses e
+WHERE NOT EXISTS (
+    SELECT 1 FROM Expense_Monthly_Rollup r
+    WHERE r.user_id = e.user_id
+    AND r.category_id = e.category_id
+    AND r.month_start = TRUNC(e.expense_date, 'MM')
+)
+GROUP BY e.user_id, e.category_id, TRUNC(e.expense_date, 'MM');
 
--- Create trigger for Expense_Alerts
-CREATE OR REPLACE TRIGGER trg_alerts
-BEFORE INSERT ON Expense_Alerts
+-- Create Budget_Ledger table
+-- Running total spent against each budget limit in each of its periods
+-- (a day, an ISO week or a month, from period_start up to but excluding
+-- period_end). Rows are opened on first use by apply_expense_to_ledger,
+-- seeded from Expenses, and then updated in the same transaction as each
+-- expense insert, so limit checks never re-aggregate expense history.
+CREATE TABLE Budget_Ledger (
+    limit_id NUMBER NOT NULL,
+    period_start DATE NOT NULL,
+    period_end DATE NOT NULL,
+    user_id NUMBER NOT NULL,
+    spent NUMBER(14,2) DEFAULT 0 NOT NULL,
+    CONSTRAINT pk_budget_ledger PRIMARY KEY (limit_id, period_start),
+    CONSTRAINT fk_limit_ledger FOREIGN KEY (limit_id) REFERENCES Expense_Limits(limit_id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_ledger_user_period ON Budget_Ledger (user_id, period_start, period_end);
+
+-- Changing or removing an expense invalidates the ledger periods it counted
+-- towards; they are re-seeded from Expenses the next time they are used
+CREATE OR REPLACE TRIGGER trg_expenses_ledger
+AFTER UPDATE OF user_id, category_id, amount, expense_date OR DELETE ON Expenses
 FOR EACH ROW
-WHEN (NEW.alert_id IS NULL)
 BEGIN
-    SELECT seq_alerts.NEXTVAL INTO :NEW.alert_id FROM dual;
+    DELETE FROM Budget_Ledger
+    WHERE user_id = :OLD.user_id
+    AND period_start <= :OLD.expense_date
+    AND period_end > :OLD.expense_date;
+
+    IF UPDATING THEN
+        DELETE FROM Budget_Ledger
+        WHERE user_id = :NEW.user_id
+        AND period_start <= :NEW.expense_date
+        AND period_end > :NEW.expense_date;
+    END IF;
 END;
 /
 
+-- Change tracking for the delta sync API (/api/sync). Every insert or update
+-- of a user's expenses, categories, budget limits and alerts stamps the rows
+-- with the user's next change version, taken from Users.change_version once
+-- per statement. The Users row stays locked until commit, so a user's
+-- versions become visible in increasing order and a client that has seen
+-- everything up to version N only needs rows with a higher one. Deleted rows
+-- leave a tombstone in Sync_Deletions with the version of the delete. The
+-- (user_id, row_version) indexes the sync query reads are added by migration V005.
+CREATE TABLE Sync_Deletions (
+    user_id NUMBER NOT NULL,
+    row_version NUMBER NOT NULL,
+    entity_kind NUMBER(1) NOT NULL,
+    entity_id NUMBER NOT NULL,
+    CONSTRAINT pk_sync_deletions PRIMARY KEY (user_id, row_version, entity_kind, entity_id)
+) ORGANIZATION INDEX;
+
+-- Entity kinds match the SYNC_* constants in storage/base.py
+CREATE OR REPLACE PACKAGE sync_versions AS
+    KIND_EXPENSE CONSTANT NUMBER := 1;
+    KIND_CATEGORY CONSTANT NUMBER := 2;
+    KIND_LIMIT CONSTANT NUMBER := 3;
+    KIND_ALERT CONSTANT NUMBER := 4;
+
+    PROCEDURE new_statement;
+    FUNCTION next_version(p_user_id NUMBER) RETURN NUMBER;
+    PROCEDURE record_deletion(p_user_id NUMBER, p_kind NUMBER, p_id NUMBER);
+END sync_versions;
+/
+
+CREATE OR REPLACE PACKAGE BODY sync_versions AS
+    -- Version allocated to each user by the current statement
+    TYPE t_versions IS TABLE OF NUMBER INDEX BY PLS_INTEGER;
+    g_versions t_versions;
+
+    PROCEDURE new_statement IS
+    BEGIN
+        g_versions.DELETE;
+    END new_statement;
+
+    FUNCTION next_version(p_user_id NUMBER) RETURN NUMBER IS
+        v_version NUMBER;
+    BEGIN
+        IF NOT g_versions.EXISTS(p_user_id) THEN
+            UPDATE Users
+            SET change_version = change_version + 1
+            WHERE user_id = p_user_id
+            RETURNING change_version INTO v_version;
+            g_versions(p_user_id) := v_version;
+        END IF;
+        RETURN g_versions(p_user_id);
+    END next_version;
+
+    PROCEDURE record_deletion(p_user_id NUMBER, p_kind NUMBER, p_id NUMBER) IS
+    BEGIN
+        INSERT INTO Sync_Deletions (user_id, row_version, entity_kind, entity_id)
+        VALUES (p_user_id, next_version(p_user_id), p_kind, p_id);
+    END record_deletion;
+END sync_versions;
+/
+
+CREATE OR REPLACE TRIGGER trg_expenses_sync
+FOR INSERT OR UPDATE OR DELETE ON Expenses
+COMPOUND TRIGGER
+    BEFORE STATEMENT IS
+    BEGIN
+        sync_versions.new_statement;
+    END BEFORE STATEMENT;
+
+    BEFORE EACH ROW IS
+    BEGIN
+        IF DELETING THEN
+            sync_versions.record_deletion(:OLD.user_id, sync_versions.KIND_EXPENSE, :OLD.expense_id);
+        ELSE
+            :NEW.row_version := sync_versions.next_version(:NEW.user_id);
+        END IF;
+    END BEFORE EACH ROW;
+END trg_expenses_sync;
+/
+
+CREATE OR REPLACE TRIGGER trg_categories_sync
+FOR INSERT OR UPDATE OR DELETE ON Categories
+COMPOUND TRIGGER
+    BEFORE STATEMENT IS
+    BEGIN
+        sync_versions.new_statement;
+    END BEFORE STATEMENT;
+
+    BEFORE EACH ROW IS
+    BEGIN
+        IF DELETING THEN
+            sync_versions.record_deletion(:OLD.user_id, sync_versions.KIND_CATEGORY, :OLD.category_id);
+        ELSE
+            :NEW.row_version := sync_versions.next_version(:NEW.user_id);
+        END IF;
+    END BEFORE EACH ROW;
+END trg_categories_sync;
+/
+
+CREATE OR REPLACE TRIGGER trg_limits_sync
+FOR INSERT OR UPDATE OR DELETE ON Expense_Limits
+COMPOUND TRIGGER
+    BEFORE STATEMENT IS
+    BEGIN
+        sync_versions.new_statement;
+    END BEFORE STATEMENT;
+
+    BEFORE EACH ROW IS
+    BEGIN
+        IF DELETING THEN
+            sync_versions.record_deletion(:OLD.user_id, sync_versions.KIND_LIMIT, :OLD.limit_id);
+        ELSE
+            :NEW.row_version := sync_versions.next_version(:NEW.user_id);
+        END IF;
+    END BEFORE EACH ROW;
+END trg_limits_sync;
+/
+
+CREATE OR REPLACE TRIGGER trg_alerts_sync
+FOR INSERT OR UPDATE OR DELETE ON Expense_Alerts
+COMPOUND TRIGGER
+    BEFORE STATEMENT IS
+    BEGIN
+        sync_versions.new_statement;
+    END BEFORE STATEMENT;
+
+    BEFORE EACH ROW IS
+    BEGIN
+        IF DELETING THEN
+            sync_versions.record_deletion(:OLD.user_id, sync_versions.KIND_ALERT, :OLD.alert_id);
+        ELSE
+            :NEW.row_version := sync_versions.next_version(:NEW.user_id);
+        END IF;
+    END BEFORE EACH ROW;
+END trg_alerts_sync;
+/
+
 -- =============================================================================
 -- PART 2: PL/SQL PROCEDURES AND FUNCTIONS
 -- =============================================================================
 
--- Procedure to check if an expense exceeds a defined limit
-CREATE OR REPLACE PROCEDURE check_expense_limit(
+-- Procedure to add an expense to the ledger of every budget limit it counts towards
+CREATE OR REPLACE PROCEDURE apply_expense_to_ledger(
     p_user_id IN NUMBER,
     p_category_id IN NUMBER,
     p_amount IN NUMBER,
+    p_expense_date IN DATE
+) AS
+    v_attempts NUMBER := 0;
+BEGIN
+    -- Open ledger rows for any applicable limit period not seen yet, seeded with
+    -- what had already been spent in that period. If another session opens the
+    -- same period concurrently the whole statement is retried.
+    LOOP
+        BEGIN
+            INSERT INTO Budget_Ledger (limit_id, period_start, period_end, user_id, spent)
+            SELECT p.limit_id, p.period_start, p.period_end, p_user_id,
+                   (SELECT NVL(SUM(e.amount), 0)
+                    FROM Expenses e
+                    WHERE e.user_id = p_user_id
+                    AND (p.category_id IS NULL OR e.category_id = p.category_id)
+                    AND e.expense_date >= p.period_start
+                    AND e.expense_date < p.period_end)
+            FROM (
+                SELECT limit_id, category_id, period_start,
+                       CASE period
+                           WHEN 'daily' THEN period_start + 1
+                           WHEN 'weekly' THEN period_start + 7
+                           ELSE ADD_MONTHS(period_start, 1)
+                       END AS period_end
+                FROM (
+                    SELECT limit_id, category_id, NVL(period, 'monthly') AS period,
+                           CASE NVL(period, 'monthly')
+                               WHEN 'daily' THEN TRUNC(p_expense_date)
+                               WHEN 'weekly' THEN TRUNC(p_expense_date, 'IW')
+                               ELSE TRUNC(p_expense_date, 'MM')
+                           END AS period_start
+                    FROM Expense_Limits
+                    WHERE user_id = p_user_id
+                    AND (category_id = p_category_id OR category_id IS NULL)
+                )
+            ) p
+            WHERE NOT EXISTS (
+                SELECT 1 FROM Budget_Ledger b
+                WHERE b.limit_id = p.limit_id AND b.period_start = p.period_start
+            );
+            EXIT;
+        EXCEPTION
+            WHEN DUP_VAL_ON_INDEX THEN
+                v_attempts := v_attempts + 1;
+                IF v_attempts >= 3 THEN
+                    RAISE;
+                END IF;
+        END;
+    END LOOP;
+
+    -- Add the expense to every open period it falls in. The row locks taken
+    -- here serialise concurrent inserts against the same limits.
+    UPDATE Budget_Ledger
+    SET spent = spent + p_amount
+    WHERE user_id = p_user_id
+    AND period_start <= p_expense_date
+    AND period_end > p_expense_date
+    AND limit_id IN (
+        SELECT limit_id FROM Expense_Limits
+        WHERE user_id = p_user_id
+        AND (category_id = p_category_id OR category_id IS NULL)
+    );
+END;
+/
+
+-- Procedure to check whether spending in the periods containing an expense
+-- exceeds any applicable limit. Every daily, weekly and monthly limit, per
+-- category and overall, is evaluated by one query over the ledger; a
+-- category limit is reported in preference to the overall limit.
+CREATE OR REPLACE PROCEDURE check_expense_limit(
+    p_user_id IN NUMBER,
+    p_category_id IN NUMBER,
     p_expense_date IN DATE,
     p_limit_exceeded OUT NUMBER,
     p_limit_amount OUT NUMBER
 ) AS
-    v_month_expenses NUMBER := 0;
-    v_limit_amount NUMBER := 0;
-    v_period VARCHAR2(20) := 'monthly';
-    v_start_date DATE;
-    v_end_date DATE;
-    v_limit_exists NUMBER := 0;
 BEGIN
-    -- Initialize output parameters
     p_limit_exceeded := 0;
     p_limit_amount := 0;
     
-    -- First check if category-specific limit exists
-    SELECT COUNT(*) INTO v_limit_exists
-    FROM Expense_Limits
-    WHERE user_id = p_user_id 
-    AND category_id = p_category_id;
-    
-    -- Only proceed if a limit exists for this category
-    IF v_limit_exists > 0 THEN
-        SELECT NVL(limit_amount, 0), NVL(period, 'monthly')
-        INTO v_limit_amount, v_period
-        FROM Expense_Limits
-        WHERE user_id = p_user_id 
-        AND category_id = p_category_id
-        AND ROWNUM = 1;
-        
-        IF v_limit_amount > 0 THEN
-            -- Determine period dates based on expense date
-            IF v_period = 'monthly' THEN
-                v_start_date := TRUNC(p_expense_date, 'MM');
-                v_end_date := LAST_DAY(p_expense_date);
-            ELSIF v_period = 'weekly' THEN
-                v_start_date := TRUNC(p_expense_date, 'IW');
-                v_end_date := v_start_date + 6;
-            ELSIF v_period = 'daily' THEN
-                v_start_date := TRUNC(p_expense_date);
-                v_end_date := v_start_date;
-            END IF;
-            
-            -- Get total expenses for this category in the period
-            SELECT NVL(SUM(amount), 0) INTO v_month_expenses
-            FROM Expenses
-            WHERE user_id = p_user_id
-            AND category_id = p_category_id
-            AND expense_date BETWEEN v_start_date AND v_end_date;
-            
-            -- Check if this new expense will exceed the limit
-            IF (v_month_expenses + p_amount) > v_limit_amount THEN
-                p_limit_exceeded := 1;
-                p_limit_amount := v_limit_amount;
-                RETURN;
-            END IF;
-        END IF;
-    END IF;
-    
-    -- Check if overall limit exists
-    SELECT COUNT(*) INTO v_limit_exists
-    FROM Expense_Limits
-    WHERE user_id = p_user_id 
-    AND category_id IS NULL;
-    
-    -- Then check overall limit if no category-specific limit was exceeded
-    IF v_limit_exists > 0 THEN
-        SELECT NVL(limit_amount, 0), NVL(period, 'monthly')
-        INTO v_limit_amount, v_period
-        FROM Expense_Limits
-        WHERE user_id = p_user_id 
-        AND category_id IS NULL
-        AND ROWNUM = 1;
-        
-        IF v_limit_amount > 0 THEN
-            -- Determine period dates
-            IF v_period = 'monthly' THEN
-                v_start_date := TRUNC(p_expense_date, 'MM');
-                v_end_date := LAST_DAY(p_expense_date);
-            ELSIF v_period = 'weekly' THEN
-                v_start_date := TRUNC(p_expense_date, 'IW');
-                v_end_date := v_start_date + 6;
-            ELSIF v_period = 'daily' THEN
-                v_start_date := TRUNC(p_expense_date);
-                v_end_date := v_start_date;
-            END IF;
-            
-            -- Get total expenses for all categories in the period
-            SELECT NVL(SUM(amount), 0) INTO v_month_expenses
-            FROM Expenses
-            WHERE user_id = p_user_id
-            AND expense_date BETWEEN v_start_date AND v_end_date;
-            
-            -- Check if this new expense will exceed the overall limit
-            IF (v_month_expenses + p_amount) > v_limit_amount THEN
-                p_limit_exceeded := 1;
-                p_limit_amount := v_limit_amount;
-            END IF;
-        END IF;
-    END IF;
+    SELECT 1, l.limit_amount
+    INTO p_limit_exceeded, p_limit_amount
+    FROM Budget_Ledger b
+    JOIN Expense_Limits l ON l.limit_id = b.limit_id
+    WHERE b.user_id = p_user_id
+    AND b.period_start <= p_expense_date
+    AND b.period_end > p_expense_date
+    AND (l.category_id = p_category_id OR l.category_id IS NULL)
+    AND l.limit_amount > 0
+    AND b.spent > l.limit_amount
+    ORDER BY CASE WHEN l.category_id IS NULL THEN 1 ELSE 0 END, l.limit_amount
+    FETCH FIRST 1 ROW ONLY;
+EXCEPTION
+    WHEN NO_DATA_FOUND THEN
+        NULL;
 END;
 /
 
@@ -247,35 +479,32 @@ CREATE OR REPLACE PROCEDURE add_expense_with_limit_check(
     p_expense_id OUT NUMBER
 ) AS
 BEGIN
-    -- First check if expense would exceed any limits
+    -- Record the expense against its budget periods, then check the limits
+    apply_expense_to_ledger(p_user_id, p_category_id, p_amount, p_expense_date);
+    
     check_expense_limit(
         p_user_id, 
         p_category_id, 
-        p_amount, 
         p_expense_date, 
         p_limit_exceeded, 
         p_limit_amount
     );
     
-    -- Generate a new expense_id
-    SELECT seq_expenses.NEXTVAL INTO p_expense_id FROM dual;
-    
-    -- Insert the expense
+    -- Insert the expense; its expense_id comes from the column default
     INSERT INTO Expenses (
-        expense_id,
         user_id,
         category_id,
         amount,
         expense_date,
         description
     ) VALUES (
-        p_expense_id,
         p_user_id,
         p_category_id,
         p_amount,
         p_expense_date,
         p_description
-    );
+    )
+    RETURNING expense_id INTO p_expense_id;
 END;
 /
 
@@ -295,6 +524,11 @@ BEGIN
         p_expense_id,
         p_limit_amount
     );
+
+    -- Keep the user's unread alert counter in the same transaction
+    UPDATE Users
+    SET unread_alerts = unread_alerts + 1
+    WHERE user_id = p_user_id;
 END;
 /
 
@@ -315,17 +549,17 @@ BEGIN
     OPEN v_cursor FOR
         SELECT 
             c.category_name,
-            NVL(SUM(e.amount), 0) as total_amount,
-            COUNT(e.expense_id) as transaction_count,
-            MIN(e.amount) as min_expense,
-            MAX(e.amount) as max_expense,
-            NVL(AVG(e.amount), 0) as avg_expense
+            NVL(SUM(r.total_amount), 0) as total_amount,
+            NVL(SUM(r.expense_count), 0) as transaction_count,
+            MIN(r.min_amount) as min_expense,
+            MAX(r.max_amount) as max_expense,
+            NVL(SUM(r.total_amount) / NULLIF(SUM(r.expense_count), 0), 0) as avg_expense
         FROM 
             Categories c
         LEFT JOIN 
-            Expenses e ON c.category_id = e.category_id 
-                      AND e.user_id = p_user_id 
-                      AND e.expense_date BETWEEN v_start_date AND v_end_date
+            Expense_Monthly_Rollup r ON c.category_id = r.category_id 
+                                    AND r.user_id = p_user_id 
+                                    AND r.month_start = v_start_date
         WHERE 
             c.user_id = p_user_id
         GROUP BY 
@@ -343,23 +577,23 @@ CREATE OR REPLACE FUNCTION get_expense_trends(
     p_months IN NUMBER
 ) RETURN SYS_REFCURSOR AS
     v_cursor SYS_REFCURSOR;
-    v_end_date DATE := LAST_DAY(TRUNC(SYSDATE));
-    v_start_date DATE := ADD_MONTHS(TRUNC(v_end_date, 'MM'), -p_months+1);
+    v_end_date DATE := TRUNC(SYSDATE, 'MM');
+    v_start_date DATE := ADD_MONTHS(v_end_date, -p_months+1);
 BEGIN
     OPEN v_cursor FOR
         SELECT 
-            TO_CHAR(TRUNC(e.expense_date, 'MM'), 'YYYY-MM') as month,
+            TO_CHAR(r.month_start, 'YYYY-MM') as month,
             c.category_name,
-            SUM(e.amount) as total_amount
+            SUM(r.total_amount) as total_amount
         FROM 
-            Expenses e
+            Expense_Monthly_Rollup r
         JOIN 
-            Categories c ON e.category_id = c.category_id
+            Categories c ON r.category_id = c.category_id
         WHERE 
-            e.user_id = p_user_id
-            AND e.expense_date BETWEEN v_start_date AND v_end_date
+            r.user_id = p_user_id
+            AND r.month_start BETWEEN v_start_date AND v_end_date
         GROUP BY 
-            TO_CHAR(TRUNC(e.expense_date, 'MM'), 'YYYY-MM'),
+            TO_CHAR(r.month_start, 'YYYY-MM'),
             c.category_name
         ORDER BY 
             month, c.category_name;
@@ -0,0 +1,50 @@
+"""
+Gunicorn configuration for running the Flask app on several worker processes
+
+Usage: SECRET_KEY_FILE=/etc/expense-tracker/secret_key SESSION_STORE=sqlite gunicorn app:app
+
+SECRET_KEY or SECRET_KEY_FILE should be set, so that sessions are signed with
+the same key by every worker and outlive a restart or deploy. The app is
+imported once in the master and forked, and each worker then opens its own
+database pool, since pooled connections can't be shared across processes.
+Sessions are either kept in the signed cookie (the default) or, with
+SESSION_STORE=file or sqlite, in a store on local disk shared by all workers
+on the host.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Threads per worker; requests spend most of their time waiting on the database
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', 4))
+timeout = int(os.environ.get('TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.environ.get('ACCESS_LOG', '-')
+
+# Import the app once in the master, so workers start quickly and share the
+# fingerprinted asset manifest and cache start time
+preload_app = True
+
+
+def on_starting(server):
+    if not (os.environ.get('SECRET_KEY') or os.environ.get('SECRET_KEY_FILE')):
+        server.log.warning('Neither SECRET_KEY nor SECRET_KEY_FILE is set: sessions are signed with a '
+                           'random key, so they will not survive a restart')
+    if (os.environ.get('DB_BACKEND') == 'sqlite' and os.environ.get('SQLITE_PATH') == ':memory:'
+            and workers > 1):
+        raise RuntimeError('SQLITE_PATH=:memory: gives each worker its own database; use a database file '
+                           'or WEB_CONCURRENCY=1')
+
+
+def post_fork(server, worker):
+    from app import db_engine
+    db_engine.open()
+
+
+def worker_exit(server, worker):
+    from app import db_engine
+    db_engine.close()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Expense Tracker Schema Migrations
+
+Applies the versioned scripts in migrations/ to an existing database. Scripts
+are named V<version>__<description>.sql and use the same format as
+database.sql. Each applied version is recorded in the Schema_Migrations table,
+so running this script again only applies new migrations.
+"""
+
+import oracledb
+import os
+import re
+import sys
+
+from setup_database import DB_USER, DB_PASSWORD, DB_DSN, SCRIPT_DIR, extract_sql_statements, print_header
+
+MIGRATIONS_DIR = os.path.join(SCRIPT_DIR, "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r'^V(\d+)__(\w+)\.sql$')
+
+# Errors that mean a statement from a partly applied migration already ran
+ALREADY_APPLIED_ERRORS = (
+    "ORA-00955",  # Name is already used by an existing object
+    "ORA-01408",  # Such column list already indexed
+    "ORA-14427",  # Table is already partitioned
+    "ORA-04080",  # Trigger does not exist (already dropped)
+    "ORA-01430",  # Column being added already exists
+    "ORA-01418",  # Index does not exist (already dropped)
+    "DRG-10701",  # Oracle Text preference already exists
+)
+
+def find_migrations():
+    """Return (version, description, path) for every migration script, oldest first"""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2).replace('_', ' '),
+                               os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(migrations)
+
+def ensure_migrations_table(cursor):
+    """Create the Schema_Migrations table if it doesn't exist"""
+    try:
+        cursor.execute('''
+            CREATE TABLE Schema_Migrations (
+                version NUMBER PRIMARY KEY,
+                description VARCHAR2(200) NOT NULL,
+                applied_at DATE DEFAULT SYSDATE NOT NULL
+            )
+        ''')
+    except oracledb.DatabaseError as e:
+        if "ORA-00955" not in str(e):
+            raise
+
+def apply_migrations():
+    """Apply every migration that has not been recorded yet; returns True on success"""
+    print_header("Applying schema migrations")
+
+    try:
+        conn = oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN)
+        cursor = conn.cursor()
+        ensure_migrations_table(cursor)
+
+        cursor.execute('SELECT version FROM Schema_Migrations')
+        applied = {row[0] for row in cursor}
+
+        pending = [m for m in find_migrations() if m[0] not in applied]
+        if not pending:
+            print("✅ Schema is up to date")
+
+        for version, description, path in pending:
+            print(f"Applying V{version:03d}: {description}")
+            with open(path, 'r') as f:
+                statements = extract_sql_statements(f.read())
+
+            for i, statement in enumerate(statements):
+                try:
+                    cursor.execute(statement)
+                except oracledb.DatabaseError as e:
+                    if any(code in str(e) for code in ALREADY_APPLIED_ERRORS):
+                        print(f"⚠️ Already applied (this is okay): {e}")
+                    else:
+                        print(f"❌ V{version:03d} failed at statement {i+1}: {e}")
+                        print(f"Statement: {statement[:100]}...")
+                        conn.rollback()
+                        cursor.close()
+                        conn.close()
+                        return False
+
+            cursor.execute('''
+                INSERT INTO Schema_Migrations (version, description)
+                VALUES (:version, :description)
+            ''', {'version': version, 'description': description})
+            conn.commit()
+            print(f"✅ Applied V{version:03d}")
+
+        cursor.close()
+        conn.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error applying migrations: {e}")
+        return False
+
+def main():
+    """Main function to run the migrations"""
+    if not apply_migrations():
+        print("\n❌ Migration failed. Fix the error above and run this script again.")
+        sys.exit(1)
+
+    print("\n✅ Migrations completed successfully!")
+
+if __name__ == "__main__":
+    main()
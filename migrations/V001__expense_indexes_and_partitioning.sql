@@ -0,0 +1,39 @@
+-- Migration V001: composite indexes for the hot queries and monthly interval
+-- partitioning of Expenses.
+--
+-- Every Expenses query in storage/oracle.py and the PL/SQL procedures filters
+-- on user_id plus an expense_date range (optionally with category_id), and
+-- the alert queries filter on user_id plus is_read. Partitioning Expenses by
+-- month lets date-range queries prune to the months they touch; the indexes
+-- below are LOCAL so each partition carries its own index segment.
+--
+-- Requires Oracle 12.2 or later for the online ALTER TABLE ... MODIFY PARTITION.
+
+-- Convert Expenses to monthly interval partitions (new months are created automatically)
+ALTER TABLE Expenses MODIFY
+    PARTITION BY RANGE (expense_date) INTERVAL (NUMTOYMINTERVAL(1, 'MONTH'))
+    (PARTITION p_expenses_initial VALUES LESS THAN (DATE '2020-01-01'))
+    ONLINE;
+
+-- Dashboard listing: keyset pagination on (expense_date, expense_id) per user
+-- Overall budget checks and monthly rollup recomputation: user_id + date range
+CREATE INDEX idx_expenses_user_date ON Expenses (user_id, expense_date, expense_id) LOCAL;
+
+-- Category budget checks and rollup recomputation: user_id + category_id + date range,
+-- with amount included so the SUM is answered from the index alone
+CREATE INDEX idx_expenses_user_cat_date ON Expenses (user_id, category_id, expense_date, amount) LOCAL;
+
+-- Category lists and joins on the forms, ordered by name
+CREATE INDEX idx_categories_user ON Categories (user_id, category_name);
+
+-- Budget limit lookups by user and category (category_id IS NULL for overall limits)
+CREATE INDEX idx_limits_user_category ON Expense_Limits (user_id, category_id);
+
+-- Unread alert count on the dashboard
+CREATE INDEX idx_alerts_user_read ON Expense_Alerts (user_id, is_read);
+
+-- Alert history ordered by date
+CREATE INDEX idx_alerts_user_date ON Expense_Alerts (user_id, alert_date);
+
+-- Foreign key join from alerts to expenses
+CREATE INDEX idx_alerts_expense ON Expense_Alerts (expense_id);
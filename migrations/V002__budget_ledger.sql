@@ -0,0 +1,35 @@
+-- Migration V002: budget ledger holding running period totals per limit.
+--
+-- apply_expense_to_ledger and check_expense_limit in database.sql use this
+-- table; re-run setup_database.py to install the new procedures. Ledger rows
+-- are opened and seeded from Expenses on first use, so no backfill is needed.
+
+CREATE TABLE Budget_Ledger (
+    limit_id NUMBER NOT NULL,
+    period_start DATE NOT NULL,
+    period_end DATE NOT NULL,
+    user_id NUMBER NOT NULL,
+    spent NUMBER(14,2) DEFAULT 0 NOT NULL,
+    CONSTRAINT pk_budget_ledger PRIMARY KEY (limit_id, period_start),
+    CONSTRAINT fk_limit_ledger FOREIGN KEY (limit_id) REFERENCES Expense_Limits(limit_id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_ledger_user_period ON Budget_Ledger (user_id, period_start, period_end);
+
+CREATE OR REPLACE TRIGGER trg_expenses_ledger
+AFTER UPDATE OF user_id, category_id, amount, expense_date OR DELETE ON Expenses
+FOR EACH ROW
+BEGIN
+    DELETE FROM Budget_Ledger
+    WHERE user_id = :OLD.user_id
+    AND period_start <= :OLD.expense_date
+    AND period_end > :OLD.expense_date;
+
+    IF UPDATING THEN
+        DELETE FROM Budget_Ledger
+        WHERE user_id = :NEW.user_id
+        AND period_start <= :NEW.expense_date
+        AND period_end > :NEW.expense_date;
+    END IF;
+END;
+/
@@ -0,0 +1,30 @@
+-- Migration V003: primary keys from cached sequences used as column defaults
+-- instead of per-row BEFORE INSERT triggers.
+--
+-- The triggers ran SELECT seq_x.NEXTVAL INTO :NEW.x_id FROM dual for every
+-- row, a switch into PL/SQL per inserted row, and the sequences were created
+-- with the default cache of 20, so bulk inserts kept waiting on the data
+-- dictionary. Existing columns cannot be converted to identity columns, so
+-- the sequences become the column defaults instead; the app reads generated
+-- keys back with RETURNING ... INTO.
+--
+-- add_expense_with_limit_check in database.sql relies on the expense_id
+-- default; re-run setup_database.py to install the new procedure.
+
+ALTER SEQUENCE seq_users CACHE 100;
+ALTER SEQUENCE seq_categories CACHE 100;
+ALTER SEQUENCE seq_expenses CACHE 1000;
+ALTER SEQUENCE seq_limits CACHE 100;
+ALTER SEQUENCE seq_alerts CACHE 1000;
+
+ALTER TABLE Users MODIFY (user_id DEFAULT seq_users.NEXTVAL);
+ALTER TABLE Categories MODIFY (category_id DEFAULT seq_categories.NEXTVAL);
+ALTER TABLE Expenses MODIFY (expense_id DEFAULT seq_expenses.NEXTVAL);
+ALTER TABLE Expense_Limits MODIFY (limit_id DEFAULT seq_limits.NEXTVAL);
+ALTER TABLE Expense_Alerts MODIFY (alert_id DEFAULT seq_alerts.NEXTVAL);
+
+DROP TRIGGER trg_users;
+DROP TRIGGER trg_categories;
+DROP TRIGGER trg_expenses;
+DROP TRIGGER trg_limits;
+DROP TRIGGER trg_alerts;
@@ -0,0 +1,23 @@
+-- Migration V004: denormalized unread alert counter and keyset-paginated alerts.
+--
+-- The dashboard read the unread count with a COUNT(*) over Expense_Alerts on
+-- every load. Users.unread_alerts is now incremented in the transaction that
+-- raises an alert (create_limit_alert in database.sql, the batched import in
+-- the app) and decremented by the number of alerts actually marked read, so
+-- the dashboard reads one row. Re-run setup_database.py to install the new
+-- create_limit_alert.
+--
+-- The alerts page is paginated on (alert_date, alert_id), newest first.
+
+ALTER TABLE Users ADD (unread_alerts NUMBER DEFAULT 0 NOT NULL);
+
+-- Backfill the counter from the existing alerts
+UPDATE Users u
+SET unread_alerts = (
+    SELECT COUNT(*) FROM Expense_Alerts a
+    WHERE a.user_id = u.user_id AND a.is_read = 0
+);
+
+-- Replace the alert history index with one covering the pagination key
+DROP INDEX idx_alerts_user_date;
+CREATE INDEX idx_alerts_user_date_id ON Expense_Alerts (user_id, alert_date, alert_id);
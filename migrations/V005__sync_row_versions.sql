@@ -0,0 +1,29 @@
+-- Migration V005: per-user row versions and deletion tombstones for the delta
+-- sync API (/api/sync).
+--
+-- Users.change_version is a per-user counter. The sync_versions package and
+-- the trg_*_sync triggers in database.sql stamp every inserted or updated
+-- expense, category, budget limit and alert with the user's next version and
+-- record deletes in Sync_Deletions. Re-run setup_database.py to install them.
+--
+-- Existing rows start at version 0, so a client's first sync returns them all.
+-- The indexes let a sync read only the rows changed since the client's cursor.
+
+ALTER TABLE Users ADD (change_version NUMBER DEFAULT 0 NOT NULL);
+ALTER TABLE Expenses ADD (row_version NUMBER DEFAULT 0 NOT NULL);
+ALTER TABLE Categories ADD (row_version NUMBER DEFAULT 0 NOT NULL);
+ALTER TABLE Expense_Limits ADD (row_version NUMBER DEFAULT 0 NOT NULL);
+ALTER TABLE Expense_Alerts ADD (row_version NUMBER DEFAULT 0 NOT NULL);
+
+CREATE TABLE Sync_Deletions (
+    user_id NUMBER NOT NULL,
+    row_version NUMBER NOT NULL,
+    entity_kind NUMBER(1) NOT NULL,
+    entity_id NUMBER NOT NULL,
+    CONSTRAINT pk_sync_deletions PRIMARY KEY (user_id, row_version, entity_kind, entity_id)
+) ORGANIZATION INDEX;
+
+CREATE INDEX idx_expenses_user_version ON Expenses (user_id, row_version, expense_id) LOCAL;
+CREATE INDEX idx_categories_user_version ON Categories (user_id, row_version, category_id);
+CREATE INDEX idx_limits_user_version ON Expense_Limits (user_id, row_version, limit_id);
+CREATE INDEX idx_alerts_user_version ON Expense_Alerts (user_id, row_version, alert_id);
@@ -0,0 +1,24 @@
+-- Migration V006: Oracle Text index for searching expense descriptions.
+--
+-- A LIKE '%term%' filter can't use an index, so /api/expenses/search runs
+-- CONTAINS queries against this CONTEXT index instead. user_id, category_id
+-- and expense_date are FILTER BY columns, so the per-user, category and date
+-- filters are answered inside the text index rather than by visiting every
+-- matching row. The word list keeps a prefix index for search-as-you-type
+-- prefixes (star%), and the empty stop list keeps words such as "the" in
+-- merchant names searchable. The index is synchronised on commit.
+--
+-- Requires the CTXAPP role (granted by setup_database.py to new users).
+
+BEGIN
+    CTX_DDL.CREATE_PREFERENCE('expense_search_wordlist', 'BASIC_WORDLIST');
+    CTX_DDL.SET_ATTRIBUTE('expense_search_wordlist', 'PREFIX_INDEX', 'TRUE');
+    CTX_DDL.SET_ATTRIBUTE('expense_search_wordlist', 'PREFIX_MIN_LENGTH', '2');
+    CTX_DDL.SET_ATTRIBUTE('expense_search_wordlist', 'PREFIX_MAX_LENGTH', '6');
+END;
+/
+
+CREATE INDEX idx_expenses_description ON Expenses (description)
+    INDEXTYPE IS CTXSYS.CONTEXT LOCAL
+    FILTER BY user_id, category_id, expense_date
+    PARAMETERS ('WORDLIST expense_search_wordlist STOPLIST CTXSYS.EMPTY_STOPLIST SYNC (ON COMMIT)');
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Expense Tracker Bulk User Provisioning
+
+Creates users, each with the default categories, from a CSV file with a
+name,email,password header (e.g. a partner sign-up export). Users are inserted
+in array-DML batches with one transaction per batch; already registered
+emails are skipped. The same batching backs the /api/provision endpoint.
+
+Usage: python provisioning.py users.csv [--batch-size 1000]
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+# Users per insert batch (and per commit)
+DEFAULT_BATCH_SIZE = 1000
+
+
+def read_users_csv(stream):
+    """Yield (name, email, password) from a CSV with name, email and password columns"""
+    for row in csv.DictReader(stream):
+        row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+        yield row.get('name'), row.get('email'), row.get('password')
+
+
+def provision(repo, users, category_names, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Create users from an iterable of (name, email, password), committing every
+    batch_size users. Rows missing a field are rejected. Returns statistics.
+    """
+    stats = {'created': 0, 'skipped': 0, 'rejected': 0, 'batches': 0}
+    start = time.perf_counter()
+    batch = []
+
+    def flush():
+        created = len(repo.provision_users(batch, category_names))
+        repo.commit()
+        stats['created'] += created
+        stats['skipped'] += len(batch) - created
+        stats['batches'] += 1
+        batch.clear()
+
+    for name, email, password in users:
+        if not (name and email and password):
+            stats['rejected'] += 1
+            continue
+        batch.append((name, email, password))
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - start
+    stats['seconds'] = round(elapsed, 3)
+    stats['users_per_second'] = round(stats['created'] / elapsed, 1) if elapsed > 0 else 0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create users in bulk from a CSV file')
+    parser.add_argument('csv_file', help="CSV with name, email and password columns ('-' for stdin)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='users per insert batch and transaction')
+    args = parser.parse_args()
+
+    # Use the backend app.py is configured for
+    from app import DEFAULT_CATEGORIES, db_engine
+
+    stream = sys.stdin if args.csv_file == '-' else open(args.csv_file, newline='')
+    repo = db_engine.repository(db_engine.acquire())
+    try:
+        stats = provision(repo, read_users_csv(stream), DEFAULT_CATEGORIES, max(args.batch_size, 1))
+    finally:
+        db_engine.release(repo.conn)
+        if stream is not sys.stdin:
+            stream.close()
+
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
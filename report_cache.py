@@ -0,0 +1,80 @@
+"""
+In-process cache for computed reports.
+
+Cached reports are tagged with the user's data version when they are built.
+Every write to a user's data bumps the version, so stale entries are never
+served and simply age out of the LRU. The version also drives the ETag and
+Last-Modified headers of report responses. Versions are kept per process, so
+report entries get a time to live as well: a write handled by another worker
+shows up once the entry expires.
+
+The same cache, with a time to live, holds each user's reference data
+(categories and budget limits), tagged with a version that only category and
+budget writes bump. The TTL bounds how long a change made by another process
+can go unseen.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReportCache:
+    """Size-bounded LRU cache of (user_id, key) -> (data version, value), with an optional time to live"""
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, key, version):
+        """Return the cached value if it was built at this data version, else None"""
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None or entry[0] != version or entry[2] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end((user_id, key))
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, key, version, value):
+        with self._lock:
+            expires = time.monotonic() + self.ttl if self.ttl is not None else float('inf')
+            self._entries[(user_id, key)] = (version, value, expires)
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'max_entries': self.max_entries, 'ttl': self.ttl,
+                'hits': self.hits, 'misses': self.misses}
+
+
+class DataVersions:
+    """
+    Per-user data versions: the Unix time, in whole seconds, of the user's last
+    write seen by this process. Versions only ever increase, by at least one per
+    write, so they can be sent as Last-Modified without two writes in the same
+    second sharing a version. Users with no write seen yet get the process start
+    time, which also invalidates clients' copies after a restart or deploy.
+    """
+
+    def __init__(self):
+        self.started = int(time.time())
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, floor=0):
+        """Return the user's version; floor is a version known from elsewhere (e.g. the session)"""
+        return max(self._versions.get(user_id, self.started), floor)
+
+    def bump(self, user_id, floor=0):
+        """Record a write to the user's data and return the new version"""
+        with self._lock:
+            version = max(int(time.time()), self.get(user_id, floor) + 1)
+            self._versions[user_id] = version
+            return version
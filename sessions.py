@@ -0,0 +1,194 @@
+"""
+Server-side session storage.
+
+By default Flask keeps the whole session in a signed cookie. With
+SESSION_STORE set to 'file' or 'sqlite', the cookie only carries a signed,
+random session id and the session data is kept on the server, in one file
+per session or in a single SQLite database. Every worker process on the host
+shares the store, a session is revoked by deleting it (logging out does), and
+the cookie stays the same size however much the session holds.
+
+Sessions expire PERMANENT_SESSION_LIFETIME after they were last written.
+"""
+
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+# Expired sessions are purged at most this often by each process, in seconds
+PURGE_INTERVAL = 600
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session data plus the id it is stored under"""
+
+    def __init__(self, initial=None, sid=None):
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.modified = False
+        self.replaced_sid = None
+
+    def clear(self):
+        # Whoever uses the session next gets a new id (e.g. after logging in),
+        # so an id handed out earlier can't be used to reach the new session
+        if self.sid is not None:
+            self.replaced_sid = self.sid
+            self.sid = None
+        super().clear()
+
+
+class FileSessionStore:
+    """One file per session; a session expires lifetime seconds after its file was written"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self, sid, lifetime):
+        path = os.path.join(self.directory, sid)
+        try:
+            if os.stat(path).st_mtime + lifetime < time.time():
+                return None
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def save(self, sid, data, lifetime):
+        # Write to a temporary file and rename it over the session, so
+        # concurrent readers never see a partly written session
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(temp_path, os.path.join(self.directory, sid))
+
+    def delete(self, sid):
+        try:
+            os.remove(os.path.join(self.directory, sid))
+        except FileNotFoundError:
+            pass
+
+    def purge(self, lifetime):
+        cutoff = time.time() - lifetime
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+class SqliteSessionStore:
+    """Sessions in a SQLite database, with one connection per thread"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # The store is usually created before the server forks its workers, so
+        # this connection is closed rather than kept for the thread to reuse
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS Sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires REAL NOT NULL
+            )
+        ''')
+        conn.close()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        return conn
+
+    def load(self, sid, lifetime):
+        row = self._connection().execute('SELECT data FROM Sessions WHERE sid = ? AND expires > ?',
+                                         (sid, time.time())).fetchone()
+        return row[0] if row else None
+
+    def save(self, sid, data, lifetime):
+        self._connection().execute('INSERT OR REPLACE INTO Sessions (sid, data, expires) VALUES (?, ?, ?)',
+                                   (sid, data, time.time() + lifetime))
+
+    def delete(self, sid):
+        self._connection().execute('DELETE FROM Sessions WHERE sid = ?', (sid,))
+
+    def purge(self, lifetime):
+        self._connection().execute('DELETE FROM Sessions WHERE expires <= ?', (time.time(),))
+
+
+STORES = {'file': FileSessionStore, 'sqlite': SqliteSessionStore}
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data in a store; the cookie holds the signed session id"""
+
+    def __init__(self, store):
+        self.store = store
+        self._next_purge = 0
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-side-session')
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.load(sid, app.permanent_session_lifetime.total_seconds())
+                if data is not None:
+                    return ServerSideSession(session_json_serializer.loads(data), sid)
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        lifetime = app.permanent_session_lifetime.total_seconds()
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.replaced_sid is not None:
+            self.store.delete(session.replaced_sid)
+
+        if not session:
+            if session.modified:
+                if session.sid is not None:
+                    self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+                response.vary.add('Cookie')
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        self.store.save(session.sid, session_json_serializer.dumps(dict(session)), lifetime)
+        response.set_cookie(name, self._signer(app).sign(session.sid).decode(),
+                            expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+        response.vary.add('Cookie')
+
+        now = time.time()
+        if now >= self._next_purge:
+            self._next_purge = now + PURGE_INTERVAL
+            self.store.purge(lifetime)
@@ -73,6 +73,8 @@ def create_user_if_needed():
                     cursor.execute(f"CREATE USER {DB_USER} IDENTIFIED BY {DB_PASSWORD}")
                     cursor.execute(f"GRANT CONNECT, RESOURCE TO {DB_USER}")
                     cursor.execute(f"GRANT UNLIMITED TABLESPACE TO {DB_USER}")
+                    # Oracle Text, for the expense search index
+                    cursor.execute(f"GRANT CTXAPP TO {DB_USER}")
                     
                     sys_conn.commit()
                     cursor.close()
@@ -87,6 +89,7 @@ def create_user_if_needed():
                     print(f"CREATE USER {DB_USER} IDENTIFIED BY {DB_PASSWORD};")
                     print(f"GRANT CONNECT, RESOURCE TO {DB_USER};")
                     print(f"GRANT UNLIMITED TABLESPACE TO {DB_USER};")
+                    print(f"GRANT CTXAPP TO {DB_USER};")
                     print("------------------------------------------------------")
                     return False
             else:
@@ -95,6 +98,7 @@ def create_user_if_needed():
                 print(f"CREATE USER {DB_USER} IDENTIFIED BY {DB_PASSWORD};")
                 print(f"GRANT CONNECT, RESOURCE TO {DB_USER};")
                 print(f"GRANT UNLIMITED TABLESPACE TO {DB_USER};")
+                print(f"GRANT CTXAPP TO {DB_USER};")
                 print("------------------------------------------------------")
                 print("Then run this script again.")
                 return False
@@ -120,8 +124,9 @@ def extract_sql_statements(sql_content):
         if not line or (line.startswith('--') and not line.startswith('-- PART') and not line.startswith('-- =====')):
             continue
             
-        # Check for PL/SQL block start
-        if re.match(r'CREATE\s+(OR\s+REPLACE\s+)?(PROCEDURE|FUNCTION|TRIGGER|PACKAGE|TYPE)', line, re.IGNORECASE):
+        # Check for PL/SQL block start (a stored unit or an anonymous block)
+        if re.match(r'(CREATE\s+(OR\s+REPLACE\s+)?(PROCEDURE|FUNCTION|TRIGGER|PACKAGE|TYPE)|BEGIN|DECLARE)\b',
+                    line, re.IGNORECASE):
             # If we were collecting a statement, finish it first
             if current_statement and not in_plsql_block:
                 statements.append('\n'.join(current_statement))
@@ -244,6 +249,12 @@ def main():
         print("Please check the error messages above.")
         sys.exit(1)
     
+    # Step 3: Apply versioned migrations (indexes, partitioning, ...)
+    from migrate import apply_migrations
+    if not apply_migrations():
+        print("\n❌ Setup failed: Could not apply schema migrations")
+        sys.exit(1)
+    
     print("\n✅ Database setup completed successfully!")
     print("\nYou can now run the application: python app.py")
 
@@ -0,0 +1,23 @@
+"""
+Pluggable storage for the Expense Tracker application.
+
+The Flask views talk to a repository rather than to a database driver. Two
+backends are available: 'oracle' (the production database, see database.sql)
+and 'sqlite' (an embedded engine for local development, load testing and
+profiling without an Oracle instance).
+"""
+
+from storage.base import Engine, Repository
+
+BACKENDS = ('oracle', 'sqlite')
+
+
+def create_engine(backend, **options):
+    """Create the engine for a backend; drivers are imported only when selected"""
+    if backend == 'oracle':
+        from storage.oracle import OracleEngine
+        return OracleEngine(**options)
+    if backend == 'sqlite':
+        from storage.sqlite import SqliteEngine
+        return SqliteEngine(**options)
+    raise ValueError(f"Unknown storage backend '{backend}', expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,565 @@
+"""
+Backend-independent parts of the storage layer.
+
+A repository wraps a single DB-API connection and exposes one method per
+operation the application performs. Each backend subclass supplies its SQL in
+the SQL dictionary, keyed by statement name, so the same statement can be
+looked up for profiling and plan checks.
+"""
+
+import json
+import re
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+# Rows fetched per round-trip for the combined dashboard query; large enough
+# that every dataset normally arrives with the execute call itself
+DASHBOARD_FETCH_SIZE = 500
+
+# Values of the first column of the dashboard query, naming the dataset of each row
+DASHBOARD_EXPENSE, DASHBOARD_SUMMARY, DASHBOARD_CATEGORY, DASHBOARD_MONTH = 1, 2, 3, 4
+
+# Rows fetched per round-trip by the columnar report queries (see Repository._fetch_columns)
+REPORT_FETCH_SIZE = 1000
+
+# Periods of the monthly comparison report: the selected month, the month
+# before it and the same month a year earlier (the column prefixes of period_comparison)
+COMPARISON_PERIODS = ('current', 'previous', 'year_ago')
+
+# Kinds of row in the delta sync feed (entity_kind in Sync_Deletions)
+SYNC_EXPENSE, SYNC_CATEGORY, SYNC_LIMIT, SYNC_ALERT = 1, 2, 3, 4
+
+# Sync cursor that precedes every change, including rows from before change tracking (version 0)
+SYNC_START = (-1, 0, 0)
+
+# Words of an expense search query beyond this many are ignored
+SEARCH_MAX_TERMS = 8
+
+
+def _as_date(value):
+    """Drivers return DATE columns as date or datetime; normalise to date"""
+    return value.date() if isinstance(value, datetime) else value
+
+
+def column_array(values):
+    """
+    Build the NumPy array for one fetched column. Numbers become int64 or
+    float64 (DECIMAL values and NULLs among numbers become floats and NaN);
+    text and other values are kept as fetched.
+    """
+    array = np.array(values)
+    if array.dtype == object:
+        try:
+            array = np.array(values, dtype=float)
+        except (TypeError, ValueError):
+            pass
+    return array
+
+
+def comparison_periods(month_start):
+    """
+    Return {period: (start, end)} for the COMPARISON_PERIODS of the month
+    starting month_start, or raise ValueError if one of them falls outside
+    the range of date (for any month of year 1, and for December 9999)
+    """
+    try:
+        previous_start = (month_start - timedelta(days=1)).replace(day=1)
+        year_ago_start = month_start.replace(year=month_start.year - 1)
+        return {period: (start, (start + timedelta(days=31)).replace(day=1))
+                for period, start in zip(COMPARISON_PERIODS, (month_start, previous_start, year_ago_start))}
+    except OverflowError:
+        raise ValueError(f'No comparison periods for the month starting {month_start}') from None
+
+
+def comparison_binds(user_id, month_start):
+    """Bind variables of the period_comparison query: the start and end of each compared month"""
+    periods = comparison_periods(month_start)
+    binds = {'user_id': user_id}
+    for period, prefix in zip(COMPARISON_PERIODS, ('month', 'previous_month', 'year_ago_month')):
+        binds[f'{prefix}_start'], binds[f'{prefix}_end'] = periods[period]
+    return binds
+
+
+def search_terms(text):
+    """
+    Split an expense search query into lowercase words, the way the text
+    indexes tokenize descriptions (letters and digits; punctuation separates)
+    """
+    return re.findall(r'[^\W_]+', text.lower())[:SEARCH_MAX_TERMS]
+
+
+def budget_periods(today):
+    """Return {period: (start, end)} for the daily, weekly (from Monday) and monthly periods containing today"""
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    return {
+        'daily': (today, today + timedelta(days=1)),
+        'weekly': (week_start, week_start + timedelta(days=7)),
+        'monthly': (month_start, (month_start + timedelta(days=31)).replace(day=1))
+    }
+
+
+def budget_status_binds(user_id, today):
+    """Bind variables of the budget_status query: the current periods and the date range covering them all"""
+    periods = budget_periods(today)
+    binds = {'user_id': user_id,
+             'scan_start': min(start for start, _ in periods.values()),
+             'scan_end': max(end for _, end in periods.values())}
+    for period, prefix in (('daily', 'day'), ('weekly', 'week'), ('monthly', 'month')):
+        binds[f'{prefix}_start'], binds[f'{prefix}_end'] = periods[period]
+    return binds
+
+
+def budget_status_rows(rows, today):
+    """Turn budget_status rows into the dicts returned by Repository.budget_status"""
+    periods = budget_periods(today)
+    status = []
+    for limit_id, category_id, category_name, limit_amount, period, spent in rows:
+        limit_amount, spent = float(limit_amount), round(float(spent), 2)
+        period_start, period_end = periods[period]
+        status.append({
+            'limit_id': limit_id,
+            'category_id': category_id,
+            'category': category_name,
+            'period': period,
+            'period_start': period_start,
+            'period_end': period_end,
+            'limit': limit_amount,
+            'spent': spent,
+            'remaining': round(limit_amount - spent, 2),
+            'percent': round(spent / limit_amount * 100, 1) if limit_amount > 0 else None
+        })
+    return status
+
+
+def dashboard_datasets(rows):
+    """Split the rows of the combined dashboard query into the dict returned by Repository.dashboard"""
+    data = {'expenses': [], 'month_total': 0, 'alert_count': 0,
+            'category_totals': [], 'monthly_totals': []}
+    for dataset, number, expense_date, label, amount, description in rows:
+        if dataset == DASHBOARD_EXPENSE:
+            data['expenses'].append((number, expense_date, label, amount, description))
+        elif dataset == DASHBOARD_SUMMARY:
+            data['alert_count'], data['month_total'] = number, amount
+        elif dataset == DASHBOARD_CATEGORY:
+            data['category_totals'].append((label, amount))
+        else:
+            data['monthly_totals'].append((label, amount))
+    # UNION ALL does not preserve the order of each part
+    data['expenses'].sort(key=lambda row: (row[1], row[0]), reverse=True)
+    data['category_totals'].sort(key=lambda row: row[1], reverse=True)
+    data['monthly_totals'].sort()
+    return data
+
+
+class Repository:
+    """Data access for one connection; subclasses provide the SQL and backend specifics"""
+
+    SQL = {}
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    # Statement helpers
+
+    def _execute(self, name, params=None):
+        """Run a named statement and return the open cursor"""
+        cursor = self.conn.cursor()
+        cursor.execute(self.SQL[name], params or {})
+        return cursor
+
+    def _fetchall(self, name, params=None):
+        cursor = self._execute(name, params)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def _fetchone(self, name, params=None):
+        cursor = self._execute(name, params)
+        row = cursor.fetchone()
+        cursor.close()
+        return row
+
+    def _run(self, name, params=None):
+        """Run a named DML statement and return the number of rows affected"""
+        cursor = self._execute(name, params)
+        rowcount = cursor.rowcount
+        cursor.close()
+        return rowcount
+
+    def _run_many(self, name, seq_of_params):
+        """Run a named statement once per parameter set in a single batch"""
+        cursor = self.conn.cursor()
+        cursor.executemany(self.SQL[name], seq_of_params)
+        cursor.close()
+
+    def _stream(self, name, params, batch_size):
+        """Run a named query and yield its rows in lists of batch_size, one fetch per list"""
+        cursor = self.conn.cursor()
+        self._set_fetch_size(cursor, batch_size)
+        try:
+            cursor.execute(self.SQL[name], params)
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def _set_fetch_size(self, cursor, batch_size):
+        cursor.arraysize = batch_size
+
+    def _fetch_columns(self, name, params=None, arraysize=REPORT_FETCH_SIZE):
+        """
+        Run a named query and return its result as {column name in lowercase:
+        NumPy array}, for reports that aggregate whole columns. This transposes
+        the fetched rows; backends that can fetch straight into columns
+        override it.
+        """
+        cursor = self.conn.cursor()
+        self._set_fetch_size(cursor, arraysize)
+        try:
+            cursor.execute(self.SQL[name], params or {})
+            names = [column[0].lower() for column in cursor.description]
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        columns = zip(*rows) if rows else [()] * len(names)
+        return {name: column_array(values) for name, values in zip(names, columns)}
+
+    # Transactions
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    # Users
+
+    def authenticate(self, email, password):
+        """Return (user_id, name) for matching credentials, or None"""
+        return self._fetchone('authenticate', {'email': email, 'password': password})
+
+    def email_exists(self, email):
+        return self._fetchone('count_email', {'email': email})[0] > 0
+
+    def create_user(self, name, email, password):
+        """Insert a user and return the new user_id"""
+        return self._insert_users([(name, email, password)])[0]
+
+    def add_categories(self, user_id, category_names):
+        self._run_many('insert_category', [{'user_id': user_id, 'category_name': category_name,
+                                            'description': None}
+                                           for category_name in category_names])
+
+    def provision_users(self, users, category_names):
+        """
+        Create a batch of (name, email, password) users, each with the given
+        categories, in one insert per table. Emails that are already registered
+        (or repeated in the batch) are skipped. Returns the new user_ids.
+        """
+        existing = {row[0] for row in self._fetchall('existing_emails', {
+            'emails': json.dumps([email for name, email, password in users])})}
+        new_users = []
+        for name, email, password in users:
+            if email not in existing:
+                existing.add(email)
+                new_users.append((name, email, password))
+        if not new_users:
+            return []
+
+        user_ids = self._insert_users(new_users)
+        self._run_many('insert_category', [{'user_id': user_id, 'category_name': category_name,
+                                            'description': None}
+                                           for user_id in user_ids
+                                           for category_name in category_names])
+        return user_ids
+
+    def _insert_users(self, users):
+        """Insert (name, email, password) rows and return their user_ids in the same order"""
+        raise NotImplementedError
+
+    # Categories
+
+    def categories(self, user_id):
+        """Return (category_id, category_name) rows for the user's forms"""
+        return self._fetchall('categories', {'user_id': user_id})
+
+    def category_details(self, user_id):
+        """Return (category_id, category_name, description) rows ordered by name"""
+        return self._fetchall('category_details', {'user_id': user_id})
+
+    def add_category(self, user_id, category_name, description):
+        self._run('insert_category', {'user_id': user_id, 'category_name': category_name,
+                                      'description': description})
+
+    # Expenses
+
+    def expenses_page(self, user_id, limit, after=None):
+        """
+        Return up to limit (expense_id, expense_date, category_name, amount, description)
+        rows, newest first. Pages are keyed on (expense_date, expense_id): pass the
+        date and id of the last row of the previous page as after.
+        """
+        if after is None:
+            return self._fetchall('expenses_first_page', {'user_id': user_id, 'limit': limit})
+        after_date, after_id = after
+        return self._fetchall('expenses_after', {'user_id': user_id, 'limit': limit,
+                                                 'after_date': after_date, 'after_id': after_id})
+
+    def search_expenses(self, user_id, terms, limit, after=None, category_id=None,
+                        start_date=date.min, end_date=date.max):
+        """
+        Return up to limit (expense_id, expense_date, category_name, amount,
+        description, score) rows for the expenses whose description contains
+        every term of search_terms() (the last characters of a word may be
+        missing, so 'star' finds 'Starbucks'), dated start_date to end_date
+        inclusive and optionally in one category. Rows come best match first
+        and are keyed on (score, expense_id): pass the score and id of the last
+        row of the previous page as after.
+        """
+        binds = {'user_id': user_id, 'query': self._search_query(user_id, terms), 'limit': limit,
+                 'category_id': category_id, 'start_date': start_date, 'end_date': end_date}
+        if after is None:
+            return self._fetchall('search_expenses_first_page', binds)
+        binds['after_score'], binds['after_id'] = after
+        return self._fetchall('search_expenses_after', binds)
+
+    def _search_query(self, user_id, terms):
+        """Build the text index query matching the user's expenses described by every term"""
+        raise NotImplementedError
+
+    def export_expenses(self, user_id, start_date, end_date, category_id=None, batch_size=1000):
+        """
+        Yield lists of (expense_id, expense_date, category_name, amount, description)
+        rows dated start_date to end_date inclusive, oldest first, optionally for a
+        single category. Rows are fetched batch_size at a time, so memory use does
+        not grow with the number of expenses exported.
+        """
+        return self._stream('export_expenses', {'user_id': user_id, 'start_date': start_date,
+                                                'end_date': end_date, 'category_id': category_id},
+                            batch_size)
+
+    def add_expense(self, user_id, category_id, amount, expense_date, description):
+        """
+        Insert an expense after checking it against the user's budget limits.
+        Returns (expense_id, limit_exceeded, limit_amount).
+        """
+        raise NotImplementedError
+
+    def import_expenses(self, user_id, rows):
+        """
+        Insert a batch of (category_id, amount, expense_date, description) rows.
+
+        The ledger is updated once per category and day in the batch, and the
+        budget limits are evaluated once for the whole batch: each limit period
+        the batch pushed over its limit raises one alert, attached to the last
+        imported expense in that period. A period that was already over its
+        limit before the batch raises no new alert. Returns the number of
+        alerts raised.
+        """
+        if not rows:
+            return 0
+
+        day_totals = {}
+        for category_id, amount, expense_date, description in rows:
+            key = (category_id, expense_date)
+            day_totals[key] = day_totals.get(key, 0) + amount
+        self._apply_to_ledger([{'user_id': user_id, 'category_id': category_id,
+                                'amount': amount, 'expense_date': expense_date}
+                               for (category_id, expense_date), amount in day_totals.items()])
+
+        expense_ids = self._insert_expenses(user_id, rows)
+
+        dates = [row[2] for row in rows]
+        exceeded = self._fetchall('exceeded_periods', {'user_id': user_id,
+                                                       'first_date': min(dates),
+                                                       'last_date': max(dates)})
+        alerts = []
+        for limit_category_id, period_start, period_end, limit_amount, spent in exceeded:
+            period_start, period_end = _as_date(period_start), _as_date(period_end)
+            batch_total = sum(amount for (category_id, expense_date), amount in day_totals.items()
+                              if period_start <= expense_date < period_end
+                              and (limit_category_id is None or int(limit_category_id) == int(category_id)))
+            if round(float(spent) - float(batch_total), 2) > float(limit_amount):
+                # Already over the limit before this batch, and alerted then
+                continue
+            for expense_id, (category_id, amount, expense_date, description) in zip(
+                    reversed(expense_ids), reversed(rows)):
+                if (period_start <= expense_date < period_end
+                        and (limit_category_id is None or int(limit_category_id) == int(category_id))):
+                    alerts.append({'user_id': user_id, 'expense_id': expense_id,
+                                   'limit_amount': limit_amount})
+                    break
+        if alerts:
+            self._run_many('insert_alert', alerts)
+            self._run('add_unread_alerts', {'user_id': user_id, 'delta': len(alerts)})
+        return len(alerts)
+
+    def _apply_to_ledger(self, seq_of_params):
+        """Add (user_id, category_id, amount, expense_date) totals to the budget ledger"""
+        raise NotImplementedError
+
+    def _insert_expenses(self, user_id, rows):
+        """Insert expense rows and return their expense_ids in the same order"""
+        raise NotImplementedError
+
+    # Dashboard
+
+    def dashboard(self, user_id, page_size, month_start, chart_start_month):
+        """
+        Fetch every dataset the dashboard shows with a single query (one round-trip).
+
+        Returns a dict of expenses (the first page_size expense rows, newest first),
+        month_total and alert_count, category_totals ((category_name, total) rows
+        for month_start, largest first) and monthly_totals (('YYYY-MM', total) rows
+        from chart_start_month onwards).
+        """
+        cursor = self.conn.cursor()
+        self._set_fetch_size(cursor, DASHBOARD_FETCH_SIZE)
+        cursor.execute(self.SQL['dashboard'], {'user_id': user_id, 'page_size': page_size,
+                                               'month_start': month_start,
+                                               'chart_start_month': chart_start_month})
+        rows = cursor.fetchall()
+        cursor.close()
+        return dashboard_datasets(rows)
+
+    # Budget limits
+
+    def budget_limits(self, user_id):
+        """Return (limit_id, category_id, category_name, limit_amount, period) rows"""
+        return self._fetchall('budget_limits', {'user_id': user_id})
+
+    def budget_status(self, user_id, today):
+        """
+        Return how much of every budget limit has been used in its period
+        containing today, as dicts of limit_id, category_id, category (None for
+        an overall limit), period, period_start, period_end (exclusive), limit,
+        spent, remaining and percent (None for a zero limit). One query covers
+        all limits: the user's expenses in the current periods are read once.
+        """
+        return budget_status_rows(self._fetchall('budget_status', budget_status_binds(user_id, today)), today)
+
+    def add_budget_limit(self, user_id, category_id, limit_amount, period):
+        self._run('insert_limit', {
+            'user_id': user_id,
+            'category_id': category_id,
+            'limit_amount': limit_amount,
+            'period': period
+        })
+
+    def delete_budget_limit(self, user_id, limit_id):
+        self._run('delete_limit', {'limit_id': limit_id, 'user_id': user_id})
+
+    # Alerts
+
+    # Users.unread_alerts is kept up to date in the same transaction as the
+    # alerts it counts, so reading it never needs to scan Expense_Alerts
+
+    def create_limit_alert(self, user_id, expense_id, limit_amount):
+        """Raise an alert and increment the user's unread alert counter"""
+        raise NotImplementedError
+
+    def unread_alert_count(self, user_id):
+        return self._fetchone('unread_alert_count', {'user_id': user_id})[0]
+
+    def alerts_page(self, user_id, limit, after=None):
+        """
+        Return up to limit (alert_id, alert_date, amount, category_name, limit_amount,
+        is_read) rows, newest first. Pages are keyed on (alert_date, alert_id): pass
+        the date and id of the last row of the previous page as after.
+        """
+        if after is None:
+            return self._fetchall('alerts_first_page', {'user_id': user_id, 'limit': limit})
+        after_date, after_id = after
+        return self._fetchall('alerts_after', {'user_id': user_id, 'limit': limit,
+                                               'after_date': after_date, 'after_id': after_id})
+
+    def mark_alerts_read(self, user_id, alert_ids):
+        """Mark the given alerts read and return how many were unread"""
+        if not alert_ids:
+            return 0
+        marked = self._run('mark_alerts_read', {'user_id': user_id,
+                                                'alert_ids': json.dumps([int(i) for i in alert_ids])})
+        if marked:
+            self._run('add_unread_alerts', {'user_id': user_id, 'delta': -marked})
+        return marked
+
+    # Delta sync
+
+    # Every insert or update stamps the row with the user's next change version
+    # and every delete leaves a tombstone (see Sync_Deletions in database.sql),
+    # so the changes after a cursor are read from the version indexes alone
+
+    def changes_since(self, user_id, since, limit):
+        """
+        Return up to limit (kind, id, row_version, deleted, ref_id, amount,
+        change_date, label, detail, flag) rows for the user's expenses,
+        categories, budget limits and alerts (kind is a SYNC_* value) changed or
+        deleted after the cursor since = (row_version, kind, id), in cursor
+        order. The rows written by one statement share a version; kind and id
+        order them within it.
+        """
+        since_version, since_kind, since_id = since
+        return self._fetchall('changes_since', {'user_id': user_id, 'since_version': since_version,
+                                                'since_kind': since_kind, 'since_id': since_id,
+                                                'limit': limit})
+
+    # Reports (read from the per-month rollup; months are identified by their first day)
+
+    def period_comparison(self, user_id, month_start):
+        """
+        Return every category's expenses in the month starting month_start, the
+        month before and the same month a year earlier, as columns (see
+        _fetch_columns): category_name, then <period>_total, _count, _min,
+        _max, _avg and _median for each of the COMPARISON_PERIODS (min to
+        median are NaN when the category has no expenses in the period).
+        Categories come largest current total first. One query reads the
+        user's expenses in the three months once; the medians need the
+        individual amounts, so the monthly rollup can't answer it.
+        """
+        return self._fetch_columns('period_comparison', comparison_binds(user_id, month_start))
+
+    def category_trends(self, user_id, granularity, start_date, end_date):
+        """
+        Return the totals per bucket and category for expenses from start_date
+        up to but excluding end_date, as bucket_start ('YYYY-MM-DD'),
+        category_name and total_amount columns (see _fetch_columns), one entry
+        per bucket and category. granularity is 'day' or 'week' (Monday to
+        Sunday), aggregated from Expenses, or 'month' or 'year', aggregated from
+        the rollup, in which case both dates must be the first of a month.
+        """
+        return self._fetch_columns(f'category_trends_{granularity}', {
+            'user_id': user_id, 'start_date': start_date, 'end_date': end_date})
+
+    def monthly_totals(self, user_id, start_month):
+        """Return ('YYYY-MM', total) rows from start_month onwards"""
+        return self._fetchall('monthly_totals', {'user_id': user_id, 'start_month': start_month})
+
+
+class Engine:
+    """Hands out connections for a backend and wraps them in repositories"""
+
+    repository_class = Repository
+
+    def acquire(self):
+        raise NotImplementedError
+
+    def release(self, conn):
+        conn.close()
+
+    def open(self):
+        """Set up connections ahead of the first request, e.g. in a newly forked worker"""
+        self.release(self.acquire())
+
+    def repository(self, conn):
+        return self.repository_class(conn)
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
@@ -0,0 +1,293 @@
+"""
+SQL instrumentation for the storage layer.
+
+InstrumentedConnection wraps a backend connection for the length of one
+request. Every statement run through its cursors is timed and its rows and
+database round-trips are counted, attributed to the statement's name in the
+repository's SQL dictionary (or the procedure name for callproc). At the end
+of the request the RequestStats are added to a Metrics registry, which renders
+them in the Prometheus text format.
+
+Round-trips are exact on python-oracledb thin mode connections, which report
+each one to round_trip_callback; elsewhere each execute, callproc and commit
+counts as one.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 1000, 10000)
+
+
+def bind_shape(params):
+    """Describe bind variables by name and type only, never by value"""
+    if isinstance(params, dict):
+        return {name: type(value).__name__ for name, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [type(value).__name__ for value in params]
+    return type(params).__name__
+
+
+class StatementCall:
+    """One execution of a statement, including the fetches of its results"""
+
+    __slots__ = ('statement', 'shape', 'seconds', 'rows', 'round_trips')
+
+    def __init__(self, statement, shape):
+        self.statement = statement
+        self.shape = shape
+        self.seconds = 0.0
+        self.rows = 0
+        self.round_trips = 0
+
+
+class RequestStats:
+    """Statement calls made on behalf of one request"""
+
+    def __init__(self, route):
+        self.route = route
+        self.calls = []
+        self.current = None
+
+    def begin(self, statement, shape):
+        self.current = StatementCall(statement, shape)
+        self.calls.append(self.current)
+        return self.current
+
+    def round_trip(self, *args):
+        if self.current is not None:
+            self.current.round_trips += 1
+
+    @property
+    def db_seconds(self):
+        return sum(call.seconds for call in self.calls)
+
+    @property
+    def round_trips(self):
+        return sum(call.round_trips for call in self.calls)
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times statements and counts fetched rows"""
+
+    def __init__(self, cursor, connection):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_connection', connection)
+        object.__setattr__(self, '_call', None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+    def _timed(self, call, method, *args):
+        stats = self._connection.stats
+        stats.current = call
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            call.seconds += time.perf_counter() - start
+
+    def _begin(self, statement, shape):
+        call = self._connection.stats.begin(statement, shape)
+        if not self._connection.counts_round_trips:
+            call.round_trips += 1
+        object.__setattr__(self, '_call', call)
+        return call
+
+    def execute(self, statement, parameters=None):
+        call = self._begin(self._connection.statement_name(statement), bind_shape(parameters))
+        if parameters is None:
+            return self._timed(call, self._cursor.execute, statement)
+        return self._timed(call, self._cursor.execute, statement, parameters)
+
+    def executemany(self, statement, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        shape = {'rows': len(seq_of_parameters),
+                 'each': bind_shape(seq_of_parameters[0]) if seq_of_parameters else None}
+        call = self._begin(self._connection.statement_name(statement), shape)
+        return self._timed(call, self._cursor.executemany, statement, seq_of_parameters)
+
+    def callproc(self, name, parameters=None):
+        call = self._begin(name, bind_shape(parameters or []))
+        return self._timed(call, self._cursor.callproc, name, parameters or [])
+
+    def _fetch(self, method, *args):
+        if self._call is None:
+            return method(*args)
+        result = self._timed(self._call, method, *args)
+        if isinstance(result, list):
+            self._call.rows += len(result)
+        elif result is not None:
+            self._call.rows += 1
+        return result
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._cursor.close()
+
+
+class InstrumentedConnection:
+    """Connection proxy handing out instrumented cursors; detach() returns the real connection"""
+
+    def __init__(self, conn, stats, sql):
+        self.conn = conn
+        self.stats = stats
+        self._names = {text: name for name, text in sql.items()}
+        # python-oracledb thin mode reports every network round-trip
+        self.counts_round_trips = hasattr(conn, 'round_trip_callback')
+        if self.counts_round_trips:
+            conn.round_trip_callback = stats.round_trip
+
+    def statement_name(self, statement):
+        return self._names.get(statement, 'other')
+
+    def cursor(self):
+        return InstrumentedCursor(self.conn.cursor(), self)
+
+    def fetch_df_all(self, statement, parameters=None, arraysize=None):
+        """Columnar fetch (python-oracledb data frames), timed and counted like a cursor's execute and fetches"""
+        call = self.stats.begin(self.statement_name(statement), bind_shape(parameters))
+        if not self.counts_round_trips:
+            call.round_trips += 1
+        start = time.perf_counter()
+        try:
+            frame = self.conn.fetch_df_all(statement, parameters, arraysize=arraysize)
+        finally:
+            call.seconds += time.perf_counter() - start
+        call.rows += frame.num_rows()
+        return frame
+
+    def _end_transaction(self, name, method):
+        call = self.stats.begin(name, None)
+        if not self.counts_round_trips:
+            call.round_trips += 1
+        start = time.perf_counter()
+        try:
+            method()
+        finally:
+            call.seconds += time.perf_counter() - start
+
+    def commit(self):
+        self._end_transaction('commit', self.conn.commit)
+
+    def rollback(self):
+        self._end_transaction('rollback', self.conn.rollback)
+
+    def detach(self):
+        if self.counts_round_trips:
+            self.conn.round_trip_callback = None
+        return self.conn
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Process-wide registry of per-route and per-statement histograms"""
+
+    HISTOGRAMS = {
+        'sql_duration_seconds': (SECONDS_BUCKETS, ('route', 'statement'),
+                                 'Time spent executing a statement and fetching its rows'),
+        'sql_rows_fetched': (COUNT_BUCKETS, ('route', 'statement'),
+                             'Rows fetched per statement execution'),
+        'sql_round_trips': (COUNT_BUCKETS, ('route', 'statement'),
+                            'Database round-trips per statement execution'),
+        'request_db_seconds': (SECONDS_BUCKETS, ('route',),
+                               'Time spent in the database per request'),
+        'request_round_trips': (COUNT_BUCKETS, ('route',),
+                                'Database round-trips per request'),
+    }
+
+    def __init__(self, prefix='expense_tracker', slow_query_seconds=None):
+        self.prefix = prefix
+        self.slow_query_seconds = slow_query_seconds
+        self._histograms = {name: {} for name in self.HISTOGRAMS}
+        self._lock = threading.Lock()
+
+    def _observe(self, name, labels, value):
+        series = self._histograms[name]
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(self.HISTOGRAMS[name][0])
+        histogram.observe(value)
+
+    def record_request(self, stats):
+        """Add one request's statement calls to the registry"""
+        route = stats.route or 'unknown'
+        with self._lock:
+            for call in stats.calls:
+                labels = (route, call.statement)
+                self._observe('sql_duration_seconds', labels, call.seconds)
+                self._observe('sql_rows_fetched', labels, call.rows)
+                self._observe('sql_round_trips', labels, call.round_trips)
+            self._observe('request_db_seconds', (route,), stats.db_seconds)
+            self._observe('request_round_trips', (route,), stats.round_trips)
+
+        if self.slow_query_seconds is not None:
+            for call in stats.calls:
+                if call.seconds >= self.slow_query_seconds:
+                    logger.warning('Slow statement %s on %s: %.1f ms, %d rows, %d round-trips, binds %s',
+                                   call.statement, route, call.seconds * 1000, call.rows,
+                                   call.round_trips, call.shape)
+
+    def render(self, gauges=None):
+        """Return the registry (and any extra gauges) in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, (buckets, label_names, help_text) in self.HISTOGRAMS.items():
+                metric = f'{self.prefix}_{name}'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    label_text = ','.join(f'{key}="{value}"' for key, value in zip(label_names, labels))
+                    cumulative = 0
+                    for bound, count in zip(buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{{label_text}}} {histogram.sum}')
+                    lines.append(f'{metric}_count{{{label_text}}} {histogram.count}')
+
+        for name, value in (gauges or {}).items():
+            metric = f'{self.prefix}_{name}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {value}')
+        return '\n'.join(lines) + '\n'
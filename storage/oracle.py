@@ -0,0 +1,552 @@
+"""
+Oracle backend: a python-oracledb session pool and the application's Oracle SQL.
+"""
+
+import os
+import threading
+import time
+
+import oracledb
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from storage.base import REPORT_FETCH_SIZE, Engine, Repository
+
+# Oracle Text operator words; a search term spelled like one is escaped with braces
+TEXT_RESERVED_WORDS = {
+    'about', 'accum', 'and', 'bt', 'btg', 'bti', 'btp', 'fuzzy', 'haspath', 'inpath', 'minus', 'near',
+    'not', 'nt', 'ntg', 'nti', 'ntp', 'or', 'pt', 'rt', 'sqe', 'syn', 'tr', 'trsyn', 'tt', 'within',
+}
+
+class OracleRepository(Repository):
+    """Repository backed by an Oracle connection and the PL/SQL in database.sql"""
+
+    SQL = {
+        'authenticate': '''
+            SELECT user_id, name FROM Users WHERE email = :email AND password = :password
+        ''',
+        'count_email': '''
+            SELECT COUNT(*) FROM Users WHERE email = :email
+        ''',
+        'insert_user': '''
+            INSERT INTO Users (name, email, password)
+            VALUES (:name, :email, :password)
+            RETURNING user_id INTO :user_id
+        ''',
+        'existing_emails': '''
+            SELECT email FROM Users
+            WHERE email IN (
+                SELECT j.email
+                FROM JSON_TABLE(:emails, '$[*]' COLUMNS (email VARCHAR2(100) PATH '$')) j
+            )
+        ''',
+        'categories': '''
+            SELECT category_id, category_name FROM Categories WHERE user_id = :user_id
+        ''',
+        'category_details': '''
+            SELECT category_id, category_name, description
+            FROM Categories
+            WHERE user_id = :user_id
+            ORDER BY category_name
+        ''',
+        'insert_category': '''
+            INSERT INTO Categories (user_id, category_name, description)
+            VALUES (:user_id, :category_name, :description)
+        ''',
+        'expenses_first_page': '''
+            SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description
+            FROM Expenses e
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            ORDER BY e.expense_date DESC, e.expense_id DESC
+            FETCH FIRST :limit ROWS ONLY
+        ''',
+        'expenses_after': '''
+            SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description
+            FROM Expenses e
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            AND e.expense_date <= :after_date
+            AND (e.expense_date < :after_date OR e.expense_id < :after_id)
+            ORDER BY e.expense_date DESC, e.expense_id DESC
+            FETCH FIRST :limit ROWS ONLY
+        ''',
+        'search_expenses_first_page': '''
+            SELECT expense_id, expense_date, category_name, amount, description, score
+            FROM (
+                SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description,
+                       SCORE(1) AS score
+                FROM Expenses e
+                JOIN Categories c ON e.category_id = c.category_id
+                WHERE CONTAINS(e.description, :query, 1) > 0
+                AND e.user_id = :user_id
+                AND e.expense_date >= :start_date
+                AND e.expense_date <= :end_date
+                AND (:category_id IS NULL OR e.category_id = :category_id)
+            )
+            ORDER BY score DESC, expense_id DESC
+            FETCH FIRST :limit ROWS ONLY
+        ''',
+        'search_expenses_after': '''
+            SELECT expense_id, expense_date, category_name, amount, description, score
+            FROM (
+                SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description,
+                       SCORE(1) AS score
+                FROM Expenses e
+                JOIN Categories c ON e.category_id = c.category_id
+                WHERE CONTAINS(e.description, :query, 1) > 0
+                AND e.user_id = :user_id
+                AND e.expense_date >= :start_date
+                AND e.expense_date <= :end_date
+                AND (:category_id IS NULL OR e.category_id = :category_id)
+            )
+            WHERE score <= :after_score
+            AND (score < :after_score OR expense_id < :after_id)
+            ORDER BY score DESC, expense_id DESC
+            FETCH FIRST :limit ROWS ONLY
+        ''',
+        'export_expenses': '''
+            SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description
+            FROM Expenses e
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            AND e.expense_date >= :start_date
+            AND e.expense_date <= :end_date
+            AND (:category_id IS NULL OR e.category_id = :category_id)
+            ORDER BY e.expense_date, e.expense_id
+        ''',
+        'insert_expense': '''
+            INSERT INTO Expenses (user_id, category_id, amount, expense_date, description)
+            VALUES (:user_id, :category_id, :amount, :expense_date, :description)
+            RETURNING expense_id INTO :expense_id
+        ''',
+        'apply_to_ledger': '''
+            BEGIN
+                apply_expense_to_ledger(:user_id, :category_id, :amount, :expense_date);
+            END;
+        ''',
+        'exceeded_periods': '''
+            SELECT l.category_id, b.period_start, b.period_end, l.limit_amount, b.spent
+            FROM Budget_Ledger b
+            JOIN Expense_Limits l ON l.limit_id = b.limit_id
+            WHERE b.user_id = :user_id
+            AND b.period_end > :first_date
+            AND b.period_start <= :last_date
+            AND l.limit_amount > 0
+            AND b.spent > l.limit_amount
+        ''',
+        'dashboard': '''
+            SELECT 1 AS dataset, p.expense_id AS id, p.expense_date, p.category_name AS label,
+                   p.amount, p.description
+            FROM (
+                SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description
+                FROM Expenses e
+                JOIN Categories c ON e.category_id = c.category_id
+                WHERE e.user_id = :user_id
+                ORDER BY e.expense_date DESC, e.expense_id DESC
+                FETCH FIRST :page_size ROWS ONLY
+            ) p
+            UNION ALL
+            SELECT 2,
+                   (SELECT unread_alerts FROM Users WHERE user_id = :user_id),
+                   NULL, NULL,
+                   (SELECT NVL(SUM(total_amount), 0) FROM Expense_Monthly_Rollup
+                    WHERE user_id = :user_id AND month_start = :month_start),
+                   NULL
+            FROM dual
+            UNION ALL
+            SELECT 3, NULL, NULL, c.category_name, NVL(SUM(r.total_amount), 0), NULL
+            FROM Categories c
+            LEFT JOIN Expense_Monthly_Rollup r ON c.category_id = r.category_id
+                                              AND r.user_id = :user_id
+                                              AND r.month_start = :month_start
+            WHERE c.user_id = :user_id
+            GROUP BY c.category_name
+            UNION ALL
+            SELECT 4, NULL, NULL, TO_CHAR(month_start, 'YYYY-MM'), SUM(total_amount), NULL
+            FROM Expense_Monthly_Rollup
+            WHERE user_id = :user_id AND month_start >= :chart_start_month
+            GROUP BY TO_CHAR(month_start, 'YYYY-MM')
+        ''',
+        'budget_limits': '''
+            SELECT l.limit_id, l.category_id, c.category_name, l.limit_amount, l.period
+            FROM Expense_Limits l
+            LEFT JOIN Categories c ON l.category_id = c.category_id
+            WHERE l.user_id = :user_id
+        ''',
+        'budget_status': '''
+            WITH spent AS (
+                SELECT category_id,
+                       SUM(CASE WHEN expense_date >= :day_start AND expense_date < :day_end
+                                THEN amount ELSE 0 END) AS daily,
+                       SUM(CASE WHEN expense_date >= :week_start AND expense_date < :week_end
+                                THEN amount ELSE 0 END) AS weekly,
+                       SUM(CASE WHEN expense_date >= :month_start AND expense_date < :month_end
+                                THEN amount ELSE 0 END) AS monthly
+                FROM Expenses
+                WHERE user_id = :user_id
+                AND expense_date >= :scan_start
+                AND expense_date < :scan_end
+                GROUP BY category_id
+            )
+            SELECT l.limit_id, l.category_id, c.category_name, l.limit_amount,
+                   NVL(l.period, 'monthly') AS period,
+                   NVL(SUM(CASE NVL(l.period, 'monthly')
+                               WHEN 'daily' THEN s.daily
+                               WHEN 'weekly' THEN s.weekly
+                               ELSE s.monthly
+                           END), 0) AS spent
+            FROM Expense_Limits l
+            LEFT JOIN Categories c ON c.category_id = l.category_id
+            LEFT JOIN spent s ON l.category_id IS NULL OR s.category_id = l.category_id
+            WHERE l.user_id = :user_id
+            GROUP BY l.limit_id, l.category_id, c.category_name, l.limit_amount, l.period
+            ORDER BY CASE WHEN l.category_id IS NULL THEN 0 ELSE 1 END, c.category_name, l.limit_id
+        ''',
+        'changes_since': '''
+            SELECT kind, id, row_version, deleted, ref_id, amount, change_date, label, detail, flag
+            FROM (
+                SELECT * FROM (
+                    SELECT 1 AS kind, expense_id AS id, row_version, 0 AS deleted,
+                           category_id AS ref_id, amount,
+                           TO_CHAR(expense_date, 'YYYY-MM-DD') AS change_date,
+                           description AS label, NULL AS detail, NULL AS flag
+                    FROM Expenses
+                    WHERE user_id = :user_id
+                    AND row_version >= :since_version
+                    AND (row_version > :since_version OR 1 > :since_kind
+                         OR (1 = :since_kind AND expense_id > :since_id))
+                    ORDER BY row_version, expense_id
+                    FETCH FIRST :limit ROWS ONLY
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 2, category_id, row_version, 0, NULL, NULL, NULL, category_name, description, NULL
+                    FROM Categories
+                    WHERE user_id = :user_id
+                    AND row_version >= :since_version
+                    AND (row_version > :since_version OR 2 > :since_kind
+                         OR (2 = :since_kind AND category_id > :since_id))
+                    ORDER BY row_version, category_id
+                    FETCH FIRST :limit ROWS ONLY
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 3, limit_id, row_version, 0, category_id, limit_amount, NULL, period, NULL, NULL
+                    FROM Expense_Limits
+                    WHERE user_id = :user_id
+                    AND row_version >= :since_version
+                    AND (row_version > :since_version OR 3 > :since_kind
+                         OR (3 = :since_kind AND limit_id > :since_id))
+                    ORDER BY row_version, limit_id
+                    FETCH FIRST :limit ROWS ONLY
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 4, alert_id, row_version, 0, expense_id, limit_amount,
+                           TO_CHAR(alert_date, 'YYYY-MM-DD"T"HH24:MI:SS'), NULL, NULL, is_read
+                    FROM Expense_Alerts
+                    WHERE user_id = :user_id
+                    AND row_version >= :since_version
+                    AND (row_version > :since_version OR 4 > :since_kind
+                         OR (4 = :since_kind AND alert_id > :since_id))
+                    ORDER BY row_version, alert_id
+                    FETCH FIRST :limit ROWS ONLY
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT entity_kind, entity_id, row_version, 1, NULL, NULL, NULL, NULL, NULL, NULL
+                    FROM Sync_Deletions
+                    WHERE user_id = :user_id
+                    AND row_version >= :since_version
+                    AND (row_version > :since_version OR entity_kind > :since_kind
+                         OR (entity_kind = :since_kind AND entity_id > :since_id))
+                    ORDER BY row_version, entity_kind, entity_id
+                    FETCH FIRST :limit ROWS ONLY
+                )
+            ) changes
+            ORDER BY row_version, kind, id
+            FETCH FIRST :limit ROWS ONLY
+        ''',
+        'insert_limit': '''
+            INSERT INTO Expense_Limits (user_id, category_id, limit_amount, period)
+            VALUES (:user_id, :category_id, :limit_amount, :period)
+        ''',
+        'delete_limit': '''
+            DELETE FROM Expense_Limits
+            WHERE limit_id = :limit_id AND user_id = :user_id
+        ''',
+        'insert_alert': '''
+            INSERT INTO Expense_Alerts (user_id, expense_id, limit_amount)
+            VALUES (:user_id, :expense_id, :limit_amount)
+        ''',
+        'add_unread_alerts': '''
+            UPDATE Users
+            SET unread_alerts = unread_alerts + :delta
+            WHERE user_id = :user_id
+        ''',
+        'unread_alert_count': '''
+            SELECT unread_alerts FROM Users WHERE user_id = :user_id
+        ''',
+        'alerts_first_page': '''
+            SELECT a.alert_id, a.alert_date, e.amount, c.category_name, a.limit_amount, a.is_read
+            FROM Expense_Alerts a
+            JOIN Expenses e ON a.expense_id = e.expense_id
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE a.user_id = :user_id
+            ORDER BY a.alert_date DESC, a.alert_id DESC
+            FETCH FIRST :limit ROWS ONLY
+        ''',
+        'alerts_after': '''
+            SELECT a.alert_id, a.alert_date, e.amount, c.category_name, a.limit_amount, a.is_read
+            FROM Expense_Alerts a
+            JOIN Expenses e ON a.expense_id = e.expense_id
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE a.user_id = :user_id
+            AND a.alert_date <= :after_date
+            AND (a.alert_date < :after_date OR a.alert_id < :after_id)
+            ORDER BY a.alert_date DESC, a.alert_id DESC
+            FETCH FIRST :limit ROWS ONLY
+        ''',
+        'mark_alerts_read': '''
+            UPDATE Expense_Alerts
+            SET is_read = 1
+            WHERE user_id = :user_id AND is_read = 0
+            AND alert_id IN (
+                SELECT j.alert_id
+                FROM JSON_TABLE(:alert_ids, '$[*]' COLUMNS (alert_id NUMBER PATH '$')) j
+            )
+        ''',
+        'period_comparison': '''
+            WITH scan AS (
+                SELECT category_id, amount,
+                       CASE WHEN expense_date >= :month_start THEN 0
+                            WHEN expense_date >= :previous_month_start THEN 1
+                            ELSE 2
+                       END AS period
+                FROM Expenses
+                WHERE user_id = :user_id
+                AND ((expense_date >= :month_start AND expense_date < :month_end)
+                     OR (expense_date >= :previous_month_start AND expense_date < :previous_month_end)
+                     OR (expense_date >= :year_ago_month_start AND expense_date < :year_ago_month_end))
+            )
+            SELECT c.category_name,
+                   NVL(SUM(CASE WHEN s.period = 0 THEN s.amount END), 0) AS current_total,
+                   COUNT(CASE WHEN s.period = 0 THEN s.amount END) AS current_count,
+                   MIN(CASE WHEN s.period = 0 THEN s.amount END) AS current_min,
+                   MAX(CASE WHEN s.period = 0 THEN s.amount END) AS current_max,
+                   AVG(CASE WHEN s.period = 0 THEN s.amount END) AS current_avg,
+                   MEDIAN(CASE WHEN s.period = 0 THEN s.amount END) AS current_median,
+                   NVL(SUM(CASE WHEN s.period = 1 THEN s.amount END), 0) AS previous_total,
+                   COUNT(CASE WHEN s.period = 1 THEN s.amount END) AS previous_count,
+                   MIN(CASE WHEN s.period = 1 THEN s.amount END) AS previous_min,
+                   MAX(CASE WHEN s.period = 1 THEN s.amount END) AS previous_max,
+                   AVG(CASE WHEN s.period = 1 THEN s.amount END) AS previous_avg,
+                   MEDIAN(CASE WHEN s.period = 1 THEN s.amount END) AS previous_median,
+                   NVL(SUM(CASE WHEN s.period = 2 THEN s.amount END), 0) AS year_ago_total,
+                   COUNT(CASE WHEN s.period = 2 THEN s.amount END) AS year_ago_count,
+                   MIN(CASE WHEN s.period = 2 THEN s.amount END) AS year_ago_min,
+                   MAX(CASE WHEN s.period = 2 THEN s.amount END) AS year_ago_max,
+                   AVG(CASE WHEN s.period = 2 THEN s.amount END) AS year_ago_avg,
+                   MEDIAN(CASE WHEN s.period = 2 THEN s.amount END) AS year_ago_median
+            FROM Categories c
+            LEFT JOIN scan s ON s.category_id = c.category_id
+            WHERE c.user_id = :user_id
+            GROUP BY c.category_id, c.category_name
+            ORDER BY current_total DESC, c.category_name
+        ''',
+        'category_trends_day': '''
+            SELECT TO_CHAR(e.expense_date, 'YYYY-MM-DD') AS bucket_start, c.category_name, SUM(e.amount) AS total_amount
+            FROM Expenses e
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            AND e.expense_date >= :start_date
+            AND e.expense_date < :end_date
+            GROUP BY TO_CHAR(e.expense_date, 'YYYY-MM-DD'), c.category_name
+        ''',
+        'category_trends_week': '''
+            SELECT TO_CHAR(TRUNC(e.expense_date, 'IW'), 'YYYY-MM-DD') AS bucket_start, c.category_name, SUM(e.amount) AS total_amount
+            FROM Expenses e
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            AND e.expense_date >= :start_date
+            AND e.expense_date < :end_date
+            GROUP BY TO_CHAR(TRUNC(e.expense_date, 'IW'), 'YYYY-MM-DD'), c.category_name
+        ''',
+        'category_trends_month': '''
+            SELECT TO_CHAR(r.month_start, 'YYYY-MM-DD') AS bucket_start, c.category_name, SUM(r.total_amount) AS total_amount
+            FROM Expense_Monthly_Rollup r
+            JOIN Categories c ON r.category_id = c.category_id
+            WHERE r.user_id = :user_id
+            AND r.month_start >= :start_date
+            AND r.month_start < :end_date
+            GROUP BY TO_CHAR(r.month_start, 'YYYY-MM-DD'), c.category_name
+        ''',
+        'category_trends_year': '''
+            SELECT TO_CHAR(TRUNC(r.month_start, 'YYYY'), 'YYYY-MM-DD') AS bucket_start, c.category_name, SUM(r.total_amount) AS total_amount
+            FROM Expense_Monthly_Rollup r
+            JOIN Categories c ON r.category_id = c.category_id
+            WHERE r.user_id = :user_id
+            AND r.month_start >= :start_date
+            AND r.month_start < :end_date
+            GROUP BY TO_CHAR(TRUNC(r.month_start, 'YYYY'), 'YYYY-MM-DD'), c.category_name
+        ''',
+        'monthly_totals': '''
+            SELECT TO_CHAR(month_start, 'YYYY-MM') as month, SUM(total_amount) as total
+            FROM Expense_Monthly_Rollup
+            WHERE user_id = :user_id AND month_start >= :start_month
+            GROUP BY TO_CHAR(month_start, 'YYYY-MM')
+            ORDER BY month
+        ''',
+    }
+
+    def _set_fetch_size(self, cursor, batch_size):
+        # Prefetch the first batch with the execute round-trip so the first
+        # rows arrive without waiting for a separate fetch
+        cursor.arraysize = batch_size
+        cursor.prefetchrows = batch_size + 1
+
+    def _fetch_columns(self, name, params=None, arraysize=REPORT_FETCH_SIZE):
+        # With pyarrow installed, python-oracledb decodes the result straight
+        # into Arrow column buffers (fetch_df_all), which convert to NumPy
+        # arrays without creating a Python object per value
+        if pyarrow is None:
+            return super()._fetch_columns(name, params, arraysize)
+        frame = self.conn.fetch_df_all(self.SQL[name], params or {}, arraysize=arraysize)
+        return {column.lower(): pyarrow.array(frame.get_column_by_name(column)).to_numpy(zero_copy_only=False)
+                for column in frame.column_names()}
+
+    def _search_query(self, user_id, terms):
+        # CONTAINS query on the CONTEXT index from migration V006: words of two
+        # or more characters are prefix matches (served by the prefix index),
+        # single characters and operator words must match a whole word. The
+        # user is filtered on the index's FILTER BY column by the SQL itself.
+        return ' AND '.join(f'{term}%' if len(term) > 1 and term not in TEXT_RESERVED_WORDS else f'{{{term}}}'
+                            for term in terms)
+
+    def add_expense(self, user_id, category_id, amount, expense_date, description):
+        cursor = self.conn.cursor()
+        limit_exceeded = cursor.var(oracledb.NUMBER)
+        limit_amount = cursor.var(oracledb.NUMBER)
+        expense_id = cursor.var(oracledb.NUMBER)
+
+        cursor.callproc('add_expense_with_limit_check',
+                        [user_id, category_id, amount, expense_date, description,
+                         limit_exceeded, limit_amount, expense_id])
+        cursor.close()
+        return int(expense_id.getvalue()), limit_exceeded.getvalue() == 1, limit_amount.getvalue()
+
+    def _apply_to_ledger(self, seq_of_params):
+        self._run_many('apply_to_ledger', seq_of_params)
+
+    def _insert_returning(self, name, seq_of_params, id_name):
+        """
+        Array DML: run an INSERT ... RETURNING id INTO :id_name statement for
+        every parameter set in one round-trip, collecting the generated ids
+        through an array bind variable. Returns the ids in the same order.
+        """
+        cursor = self.conn.cursor()
+        generated_id = cursor.var(oracledb.NUMBER, arraysize=len(seq_of_params))
+        cursor.setinputsizes(**{id_name: generated_id})
+        cursor.executemany(self.SQL[name], seq_of_params)
+        cursor.close()
+        return [int(generated_id.getvalue(i)[0]) for i in range(len(seq_of_params))]
+
+    def _insert_expenses(self, user_id, rows):
+        return self._insert_returning('insert_expense', [
+            {'user_id': user_id, 'category_id': category_id, 'amount': amount,
+             'expense_date': expense_date, 'description': description}
+            for category_id, amount, expense_date, description in rows
+        ], 'expense_id')
+
+    def _insert_users(self, users):
+        return self._insert_returning('insert_user', [
+            {'name': name, 'email': email, 'password': password}
+            for name, email, password in users
+        ], 'user_id')
+
+    def create_limit_alert(self, user_id, expense_id, limit_amount):
+        cursor = self.conn.cursor()
+        cursor.callproc('create_limit_alert', [user_id, expense_id, limit_amount])
+        cursor.close()
+
+
+class OracleEngine(Engine):
+    """Session pool created on first use, with acquire wait-time accounting"""
+
+    repository_class = OracleRepository
+
+    def __init__(self, user, password, dsn, pool_min=2, pool_max=10, pool_increment=1,
+                 wait_timeout=5000):
+        self.user = user
+        self.password = password
+        self.dsn = dsn
+        self.pool_min = pool_min
+        self.pool_max = pool_max
+        self.pool_increment = pool_increment
+        self.wait_timeout = wait_timeout
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._acquires = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    @property
+    def pool(self):
+        # A pool's connections can't be shared with a forked child, so each
+        # worker process creates its own
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = oracledb.create_pool(user=self.user, password=self.password,
+                                                      dsn=self.dsn, min=self.pool_min,
+                                                      max=self.pool_max,
+                                                      increment=self.pool_increment,
+                                                      getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                                                      wait_timeout=self.wait_timeout)
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def acquire(self):
+        start = time.perf_counter()
+        conn = self.pool.acquire()
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._acquires += 1
+            self._wait_time += waited
+            self._max_wait_time = max(self._max_wait_time, waited)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool (uncommitted work is rolled back)"""
+        self.pool.release(conn)
+
+    def stats(self):
+        if self._pool is None:
+            return {'backend': 'oracle', 'pool': 'not started'}
+
+        with self._lock:
+            acquires = self._acquires
+            wait_time = self._wait_time
+            max_wait_time = self._max_wait_time
+
+        return {
+            'backend': 'oracle',
+            'busy': self._pool.busy,
+            'open': self._pool.opened,
+            'min': self._pool.min,
+            'max': self._pool.max,
+            'acquires': acquires,
+            'avg_wait_ms': round(wait_time / acquires * 1000, 3) if acquires else 0,
+            'max_wait_ms': round(max_wait_time * 1000, 3)
+        }
+
+    def close(self):
+        # A pool inherited from the parent process is the parent's to close
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.close()
+            self._pool = None
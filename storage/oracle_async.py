@@ -0,0 +1,91 @@
+"""
+Asyncio Oracle backend for the ASGI server (asgi.py), built on python-oracledb's
+async API. It runs the same SQL as storage/oracle.py.
+
+Unlike the synchronous repositories, an AsyncOracleRepository is not tied to one
+connection: each query borrows its own connection from the pool, so independent
+queries of one request can be awaited together and run concurrently.
+"""
+
+import asyncio
+
+import oracledb
+
+from storage.base import DASHBOARD_FETCH_SIZE, budget_status_binds, budget_status_rows, dashboard_datasets
+from storage.oracle import OracleRepository
+
+
+class AsyncOracleRepository:
+    """Read-only async data access for the routes served by the ASGI app"""
+
+    SQL = OracleRepository.SQL
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def _fetchall(self, name, params, fetch_size=None):
+        async with self.pool.acquire() as conn:
+            cursor = conn.cursor()
+            if fetch_size:
+                cursor.arraysize = fetch_size
+                cursor.prefetchrows = fetch_size + 1
+            await cursor.execute(self.SQL[name], params)
+            return await cursor.fetchall()
+
+    async def dashboard(self, user_id, page_size, month_start, chart_start_month):
+        """See Repository.dashboard"""
+        rows = await self._fetchall('dashboard', {'user_id': user_id, 'page_size': page_size,
+                                                  'month_start': month_start,
+                                                  'chart_start_month': chart_start_month},
+                                    DASHBOARD_FETCH_SIZE)
+        return dashboard_datasets(rows)
+
+    async def expenses_page(self, user_id, limit, after=None):
+        """See Repository.expenses_page"""
+        if after is None:
+            return await self._fetchall('expenses_first_page', {'user_id': user_id, 'limit': limit})
+        after_date, after_id = after
+        return await self._fetchall('expenses_after', {'user_id': user_id, 'limit': limit,
+                                                       'after_date': after_date,
+                                                       'after_id': after_id})
+
+    async def monthly_totals(self, user_id, start_month):
+        return await self._fetchall('monthly_totals', {'user_id': user_id, 'start_month': start_month})
+
+    async def budget_status(self, user_id, today):
+        """See Repository.budget_status"""
+        rows = await self._fetchall('budget_status', budget_status_binds(user_id, today))
+        return budget_status_rows(rows, today)
+
+    async def budgets_page(self, user_id):
+        """Return (categories, budget_limits) for the budgets page, queried concurrently"""
+        return await asyncio.gather(
+            self._fetchall('categories', {'user_id': user_id}),
+            self._fetchall('budget_limits', {'user_id': user_id}))
+
+
+class AsyncOracleEngine:
+    """An oracledb asyncio pool; create it inside the event loop that will use it"""
+
+    def __init__(self, user, password, dsn, pool_min=2, pool_max=10, pool_increment=1,
+                 wait_timeout=5000):
+        self.pool = oracledb.create_pool_async(user=user, password=password, dsn=dsn,
+                                               min=pool_min, max=pool_max,
+                                               increment=pool_increment,
+                                               getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                                               wait_timeout=wait_timeout)
+
+    def repository(self):
+        return AsyncOracleRepository(self.pool)
+
+    def stats(self):
+        return {
+            'backend': 'oracle-async',
+            'busy': self.pool.busy,
+            'open': self.pool.opened,
+            'min': self.pool.min,
+            'max': self.pool.max
+        }
+
+    async def close(self):
+        await self.pool.close()
@@ -0,0 +1,612 @@
+"""
+Embedded SQLite backend for running and load-testing the application without
+an Oracle instance. The PL/SQL procedures from database.sql are ported to
+Python here, and Oracle-only SQL (NVL, TRUNC, sequences) is rewritten.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+
+from storage.base import Engine, Repository
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sqlite_schema.sql')
+
+# Change-tracking columns of the delta sync API (migration V005 on Oracle)
+VERSION_COLUMNS = (('Users', 'change_version'), ('Expenses', 'row_version'), ('Categories', 'row_version'),
+                   ('Expense_Limits', 'row_version'), ('Expense_Alerts', 'row_version'))
+
+# Dates are stored as ISO-8601 text and converted back on fetch
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+
+class SqliteRepository(Repository):
+    """Repository backed by a sqlite3 connection"""
+
+    SQL = {
+        'authenticate': '''
+            SELECT user_id, name FROM Users WHERE email = :email AND password = :password
+        ''',
+        'count_email': '''
+            SELECT COUNT(*) FROM Users WHERE email = :email
+        ''',
+        'insert_user': '''
+            INSERT INTO Users (name, email, password)
+            VALUES (:name, :email, :password)
+        ''',
+        'existing_emails': '''
+            SELECT email FROM Users
+            WHERE email IN (SELECT value FROM json_each(:emails))
+        ''',
+        'categories': '''
+            SELECT category_id, category_name FROM Categories WHERE user_id = :user_id
+        ''',
+        'category_details': '''
+            SELECT category_id, category_name, description
+            FROM Categories
+            WHERE user_id = :user_id
+            ORDER BY category_name
+        ''',
+        'insert_category': '''
+            INSERT INTO Categories (user_id, category_name, description)
+            VALUES (:user_id, :category_name, :description)
+        ''',
+        'expenses_first_page': '''
+            SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description
+            FROM Expenses e
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            ORDER BY e.expense_date DESC, e.expense_id DESC
+            LIMIT :limit
+        ''',
+        'expenses_after': '''
+            SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description
+            FROM Expenses e
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            AND e.expense_date <= :after_date
+            AND (e.expense_date < :after_date OR e.expense_id < :after_id)
+            ORDER BY e.expense_date DESC, e.expense_id DESC
+            LIMIT :limit
+        ''',
+        'open_ledger_periods': '''
+            INSERT OR IGNORE INTO Budget_Ledger (limit_id, period_start, period_end, user_id, spent)
+            SELECT p.limit_id, p.period_start, p.period_end, :user_id,
+                   (SELECT IFNULL(SUM(e.amount), 0)
+                    FROM Expenses e
+                    WHERE e.user_id = :user_id
+                    AND (p.category_id IS NULL OR e.category_id = p.category_id)
+                    AND e.expense_date >= p.period_start
+                    AND e.expense_date < p.period_end)
+            FROM (
+                SELECT limit_id, category_id, period_start,
+                       CASE period
+                           WHEN 'daily' THEN date(period_start, '+1 day')
+                           WHEN 'weekly' THEN date(period_start, '+7 days')
+                           ELSE date(period_start, '+1 month')
+                       END AS period_end
+                FROM (
+                    SELECT limit_id, category_id, IFNULL(period, 'monthly') AS period,
+                           CASE IFNULL(period, 'monthly')
+                               WHEN 'daily' THEN date(:expense_date)
+                               WHEN 'weekly' THEN date(:expense_date, '-6 days', 'weekday 1')
+                               ELSE date(:expense_date, 'start of month')
+                           END AS period_start
+                    FROM Expense_Limits
+                    WHERE user_id = :user_id
+                    AND (category_id = :category_id OR category_id IS NULL)
+                )
+            ) p
+            WHERE NOT EXISTS (
+                SELECT 1 FROM Budget_Ledger b
+                WHERE b.limit_id = p.limit_id AND b.period_start = p.period_start
+            )
+        ''',
+        'add_to_ledger': '''
+            UPDATE Budget_Ledger
+            SET spent = spent + :amount
+            WHERE user_id = :user_id
+            AND period_start <= :expense_date
+            AND period_end > :expense_date
+            AND limit_id IN (
+                SELECT limit_id FROM Expense_Limits
+                WHERE user_id = :user_id
+                AND (category_id = :category_id OR category_id IS NULL)
+            )
+        ''',
+        'exceeded_limit': '''
+            SELECT l.limit_amount
+            FROM Budget_Ledger b
+            JOIN Expense_Limits l ON l.limit_id = b.limit_id
+            WHERE b.user_id = :user_id
+            AND b.period_start <= :expense_date
+            AND b.period_end > :expense_date
+            AND (l.category_id = :category_id OR l.category_id IS NULL)
+            AND l.limit_amount > 0
+            AND ROUND(b.spent, 2) > l.limit_amount
+            ORDER BY CASE WHEN l.category_id IS NULL THEN 1 ELSE 0 END, l.limit_amount
+            LIMIT 1
+        ''',
+        'exceeded_periods': '''
+            SELECT l.category_id, b.period_start, b.period_end, l.limit_amount, b.spent
+            FROM Budget_Ledger b
+            JOIN Expense_Limits l ON l.limit_id = b.limit_id
+            WHERE b.user_id = :user_id
+            AND b.period_end > :first_date
+            AND b.period_start <= :last_date
+            AND l.limit_amount > 0
+            AND ROUND(b.spent, 2) > l.limit_amount
+        ''',
+        'search_expenses_first_page': '''
+            SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description, m.score
+            FROM (
+                SELECT rowid AS expense_id, -bm25(Expense_Search, 1.0, 0.0) AS score
+                FROM Expense_Search
+                WHERE Expense_Search MATCH :query
+            ) m
+            JOIN Expenses e ON e.expense_id = m.expense_id
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            AND e.expense_date >= :start_date
+            AND e.expense_date <= :end_date
+            AND (:category_id IS NULL OR e.category_id = :category_id)
+            ORDER BY m.score DESC, e.expense_id DESC
+            LIMIT :limit
+        ''',
+        'search_expenses_after': '''
+            SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description, m.score
+            FROM (
+                SELECT rowid AS expense_id, -bm25(Expense_Search, 1.0, 0.0) AS score
+                FROM Expense_Search
+                WHERE Expense_Search MATCH :query
+            ) m
+            JOIN Expenses e ON e.expense_id = m.expense_id
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            AND e.expense_date >= :start_date
+            AND e.expense_date <= :end_date
+            AND (:category_id IS NULL OR e.category_id = :category_id)
+            AND m.score <= :after_score
+            AND (m.score < :after_score OR e.expense_id < :after_id)
+            ORDER BY m.score DESC, e.expense_id DESC
+            LIMIT :limit
+        ''',
+        'export_expenses': '''
+            SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description
+            FROM Expenses e
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            AND e.expense_date >= :start_date
+            AND e.expense_date <= :end_date
+            AND (:category_id IS NULL OR e.category_id = :category_id)
+            ORDER BY e.expense_date, e.expense_id
+        ''',
+        'insert_expense': '''
+            INSERT INTO Expenses (user_id, category_id, amount, expense_date, description)
+            VALUES (:user_id, :category_id, :amount, :expense_date, :description)
+        ''',
+        'dashboard': '''
+            SELECT 1 AS dataset, p.expense_id AS id, p.expense_date, p.category_name AS label,
+                   p.amount, p.description
+            FROM (
+                SELECT e.expense_id, e.expense_date, c.category_name, e.amount, e.description
+                FROM Expenses e
+                JOIN Categories c ON e.category_id = c.category_id
+                WHERE e.user_id = :user_id
+                ORDER BY e.expense_date DESC, e.expense_id DESC
+                LIMIT :page_size
+            ) p
+            UNION ALL
+            SELECT 2,
+                   (SELECT unread_alerts FROM Users WHERE user_id = :user_id),
+                   NULL, NULL,
+                   (SELECT IFNULL(SUM(total_amount), 0) FROM Expense_Monthly_Rollup
+                    WHERE user_id = :user_id AND month_start = :month_start),
+                   NULL
+            UNION ALL
+            SELECT 3, NULL, NULL, c.category_name, IFNULL(SUM(r.total_amount), 0), NULL
+            FROM Categories c
+            LEFT JOIN Expense_Monthly_Rollup r ON c.category_id = r.category_id
+                                              AND r.user_id = :user_id
+                                              AND r.month_start = :month_start
+            WHERE c.user_id = :user_id
+            GROUP BY c.category_name
+            UNION ALL
+            SELECT 4, NULL, NULL, strftime('%Y-%m', month_start), SUM(total_amount), NULL
+            FROM Expense_Monthly_Rollup
+            WHERE user_id = :user_id AND month_start >= :chart_start_month
+            GROUP BY strftime('%Y-%m', month_start)
+        ''',
+        'budget_limits': '''
+            SELECT l.limit_id, l.category_id, c.category_name, l.limit_amount, l.period
+            FROM Expense_Limits l
+            LEFT JOIN Categories c ON l.category_id = c.category_id
+            WHERE l.user_id = :user_id
+        ''',
+        'budget_status': '''
+            WITH spent AS (
+                SELECT category_id,
+                       SUM(CASE WHEN expense_date >= :day_start AND expense_date < :day_end
+                                THEN amount ELSE 0 END) AS daily,
+                       SUM(CASE WHEN expense_date >= :week_start AND expense_date < :week_end
+                                THEN amount ELSE 0 END) AS weekly,
+                       SUM(CASE WHEN expense_date >= :month_start AND expense_date < :month_end
+                                THEN amount ELSE 0 END) AS monthly
+                FROM Expenses
+                WHERE user_id = :user_id
+                AND expense_date >= :scan_start
+                AND expense_date < :scan_end
+                GROUP BY category_id
+            )
+            SELECT l.limit_id, l.category_id, c.category_name, l.limit_amount,
+                   IFNULL(l.period, 'monthly') AS period,
+                   IFNULL(SUM(CASE IFNULL(l.period, 'monthly')
+                               WHEN 'daily' THEN s.daily
+                               WHEN 'weekly' THEN s.weekly
+                               ELSE s.monthly
+                           END), 0) AS spent
+            FROM Expense_Limits l
+            LEFT JOIN Categories c ON c.category_id = l.category_id
+            LEFT JOIN spent s ON l.category_id IS NULL OR s.category_id = l.category_id
+            WHERE l.user_id = :user_id
+            GROUP BY l.limit_id, l.category_id, c.category_name, l.limit_amount, l.period
+            ORDER BY CASE WHEN l.category_id IS NULL THEN 0 ELSE 1 END, c.category_name, l.limit_id
+        ''',
+        'changes_since': '''
+            SELECT kind, id, row_version, deleted, ref_id, amount, change_date, label, detail, flag
+            FROM (
+                SELECT * FROM (
+                    SELECT 1 AS kind, expense_id AS id, row_version, 0 AS deleted,
+                           category_id AS ref_id, amount,
+                           date(expense_date) AS change_date,
+                           description AS label, NULL AS detail, NULL AS flag
+                    FROM Expenses
+                    WHERE user_id = :user_id
+                    AND row_version >= :since_version
+                    AND (row_version > :since_version OR 1 > :since_kind
+                         OR (1 = :since_kind AND expense_id > :since_id))
+                    ORDER BY row_version, expense_id
+                    LIMIT :limit
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 2, category_id, row_version, 0, NULL, NULL, NULL, category_name, description, NULL
+                    FROM Categories
+                    WHERE user_id = :user_id
+                    AND row_version >= :since_version
+                    AND (row_version > :since_version OR 2 > :since_kind
+                         OR (2 = :since_kind AND category_id > :since_id))
+                    ORDER BY row_version, category_id
+                    LIMIT :limit
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 3, limit_id, row_version, 0, category_id, limit_amount, NULL, period, NULL, NULL
+                    FROM Expense_Limits
+                    WHERE user_id = :user_id
+                    AND row_version >= :since_version
+                    AND (row_version > :since_version OR 3 > :since_kind
+                         OR (3 = :since_kind AND limit_id > :since_id))
+                    ORDER BY row_version, limit_id
+                    LIMIT :limit
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 4, alert_id, row_version, 0, expense_id, limit_amount,
+                           strftime('%Y-%m-%dT%H:%M:%S', alert_date), NULL, NULL, is_read
+                    FROM Expense_Alerts
+                    WHERE user_id = :user_id
+                    AND row_version >= :since_version
+                    AND (row_version > :since_version OR 4 > :since_kind
+                         OR (4 = :since_kind AND alert_id > :since_id))
+                    ORDER BY row_version, alert_id
+                    LIMIT :limit
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT entity_kind, entity_id, row_version, 1, NULL, NULL, NULL, NULL, NULL, NULL
+                    FROM Sync_Deletions
+                    WHERE user_id = :user_id
+                    AND row_version >= :since_version
+                    AND (row_version > :since_version OR entity_kind > :since_kind
+                         OR (entity_kind = :since_kind AND entity_id > :since_id))
+                    ORDER BY row_version, entity_kind, entity_id
+                    LIMIT :limit
+                )
+            ) changes
+            ORDER BY row_version, kind, id
+            LIMIT :limit
+        ''',
+        'insert_limit': '''
+            INSERT INTO Expense_Limits (user_id, category_id, limit_amount, period)
+            VALUES (:user_id, :category_id, :limit_amount, :period)
+        ''',
+        'delete_limit': '''
+            DELETE FROM Expense_Limits
+            WHERE limit_id = :limit_id AND user_id = :user_id
+        ''',
+        'insert_alert': '''
+            INSERT INTO Expense_Alerts (user_id, expense_id, limit_amount)
+            VALUES (:user_id, :expense_id, :limit_amount)
+        ''',
+        'add_unread_alerts': '''
+            UPDATE Users
+            SET unread_alerts = unread_alerts + :delta
+            WHERE user_id = :user_id
+        ''',
+        'unread_alert_count': '''
+            SELECT unread_alerts FROM Users WHERE user_id = :user_id
+        ''',
+        'alerts_first_page': '''
+            SELECT a.alert_id, a.alert_date, e.amount, c.category_name, a.limit_amount, a.is_read
+            FROM Expense_Alerts a
+            JOIN Expenses e ON a.expense_id = e.expense_id
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE a.user_id = :user_id
+            ORDER BY a.alert_date DESC, a.alert_id DESC
+            LIMIT :limit
+        ''',
+        'alerts_after': '''
+            SELECT a.alert_id, a.alert_date, e.amount, c.category_name, a.limit_amount, a.is_read
+            FROM Expense_Alerts a
+            JOIN Expenses e ON a.expense_id = e.expense_id
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE a.user_id = :user_id
+            AND a.alert_date <= :after_date
+            AND (a.alert_date < :after_date OR a.alert_id < :after_id)
+            ORDER BY a.alert_date DESC, a.alert_id DESC
+            LIMIT :limit
+        ''',
+        'mark_alerts_read': '''
+            UPDATE Expense_Alerts
+            SET is_read = 1
+            WHERE user_id = :user_id AND is_read = 0
+            AND alert_id IN (
+                SELECT value FROM json_each(:alert_ids)
+            )
+        ''',
+        'period_comparison': '''
+            WITH scan AS (
+                SELECT category_id, amount, period,
+                       ROW_NUMBER() OVER (PARTITION BY category_id, period ORDER BY amount) AS position,
+                       COUNT(*) OVER (PARTITION BY category_id, period) AS period_count
+                FROM (
+                    SELECT category_id, amount,
+                           CASE WHEN expense_date >= :month_start THEN 0
+                                WHEN expense_date >= :previous_month_start THEN 1
+                                ELSE 2
+                           END AS period
+                    FROM Expenses
+                    WHERE user_id = :user_id
+                    AND ((expense_date >= :month_start AND expense_date < :month_end)
+                         OR (expense_date >= :previous_month_start AND expense_date < :previous_month_end)
+                         OR (expense_date >= :year_ago_month_start AND expense_date < :year_ago_month_end))
+                )
+            )
+            SELECT c.category_name,
+                   IFNULL(SUM(CASE WHEN s.period = 0 THEN s.amount END), 0) AS current_total,
+                   COUNT(CASE WHEN s.period = 0 THEN s.amount END) AS current_count,
+                   MIN(CASE WHEN s.period = 0 THEN s.amount END) AS current_min,
+                   MAX(CASE WHEN s.period = 0 THEN s.amount END) AS current_max,
+                   AVG(CASE WHEN s.period = 0 THEN s.amount END) AS current_avg,
+                   AVG(CASE WHEN s.period = 0 AND s.position IN ((s.period_count + 1) / 2, (s.period_count + 2) / 2)
+                            THEN s.amount END) AS current_median,
+                   IFNULL(SUM(CASE WHEN s.period = 1 THEN s.amount END), 0) AS previous_total,
+                   COUNT(CASE WHEN s.period = 1 THEN s.amount END) AS previous_count,
+                   MIN(CASE WHEN s.period = 1 THEN s.amount END) AS previous_min,
+                   MAX(CASE WHEN s.period = 1 THEN s.amount END) AS previous_max,
+                   AVG(CASE WHEN s.period = 1 THEN s.amount END) AS previous_avg,
+                   AVG(CASE WHEN s.period = 1 AND s.position IN ((s.period_count + 1) / 2, (s.period_count + 2) / 2)
+                            THEN s.amount END) AS previous_median,
+                   IFNULL(SUM(CASE WHEN s.period = 2 THEN s.amount END), 0) AS year_ago_total,
+                   COUNT(CASE WHEN s.period = 2 THEN s.amount END) AS year_ago_count,
+                   MIN(CASE WHEN s.period = 2 THEN s.amount END) AS year_ago_min,
+                   MAX(CASE WHEN s.period = 2 THEN s.amount END) AS year_ago_max,
+                   AVG(CASE WHEN s.period = 2 THEN s.amount END) AS year_ago_avg,
+                   AVG(CASE WHEN s.period = 2 AND s.position IN ((s.period_count + 1) / 2, (s.period_count + 2) / 2)
+                            THEN s.amount END) AS year_ago_median
+            FROM Categories c
+            LEFT JOIN scan s ON s.category_id = c.category_id
+            WHERE c.user_id = :user_id
+            GROUP BY c.category_id, c.category_name
+            ORDER BY current_total DESC, c.category_name
+        ''',
+        'category_trends_day': '''
+            SELECT date(e.expense_date) AS bucket_start, c.category_name, SUM(e.amount) AS total_amount
+            FROM Expenses e
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            AND e.expense_date >= :start_date
+            AND e.expense_date < :end_date
+            GROUP BY date(e.expense_date), c.category_name
+        ''',
+        'category_trends_week': '''
+            SELECT date(e.expense_date, '-6 days', 'weekday 1') AS bucket_start, c.category_name, SUM(e.amount) AS total_amount
+            FROM Expenses e
+            JOIN Categories c ON e.category_id = c.category_id
+            WHERE e.user_id = :user_id
+            AND e.expense_date >= :start_date
+            AND e.expense_date < :end_date
+            GROUP BY date(e.expense_date, '-6 days', 'weekday 1'), c.category_name
+        ''',
+        'category_trends_month': '''
+            SELECT date(r.month_start) AS bucket_start, c.category_name, SUM(r.total_amount) AS total_amount
+            FROM Expense_Monthly_Rollup r
+            JOIN Categories c ON r.category_id = c.category_id
+            WHERE r.user_id = :user_id
+            AND r.month_start >= :start_date
+            AND r.month_start < :end_date
+            GROUP BY date(r.month_start), c.category_name
+        ''',
+        'category_trends_year': '''
+            SELECT date(r.month_start, 'start of year') AS bucket_start, c.category_name, SUM(r.total_amount) AS total_amount
+            FROM Expense_Monthly_Rollup r
+            JOIN Categories c ON r.category_id = c.category_id
+            WHERE r.user_id = :user_id
+            AND r.month_start >= :start_date
+            AND r.month_start < :end_date
+            GROUP BY date(r.month_start, 'start of year'), c.category_name
+        ''',
+        'monthly_totals': '''
+            SELECT strftime('%Y-%m', month_start) as month, SUM(total_amount) as total
+            FROM Expense_Monthly_Rollup
+            WHERE user_id = :user_id AND month_start >= :start_month
+            GROUP BY strftime('%Y-%m', month_start)
+            ORDER BY month
+        ''',
+        'backfill_rollup': '''
+            INSERT OR IGNORE INTO Expense_Monthly_Rollup (user_id, category_id, month_start,
+                                                          total_amount, expense_count,
+                                                          min_amount, max_amount)
+            SELECT user_id, category_id, date(expense_date, 'start of month'),
+                   SUM(amount), COUNT(*), MIN(amount), MAX(amount)
+            FROM Expenses
+            GROUP BY user_id, category_id, date(expense_date, 'start of month')
+        ''',
+        'backfill_search': '''
+            INSERT INTO Expense_Search (rowid, description, owner)
+            SELECT expense_id, description, 'u' || user_id FROM Expenses
+        ''',
+        'backfill_unread_alerts': '''
+            UPDATE Users
+            SET unread_alerts = (
+                SELECT COUNT(*) FROM Expense_Alerts a
+                WHERE a.user_id = Users.user_id AND a.is_read = 0
+            )
+        ''',
+    }
+
+    def _search_query(self, user_id, terms):
+        # FTS5 query on Expense_Search: the owner token limits it to the user,
+        # and words of two or more characters are prefix matches
+        words = ' AND '.join(f'"{term}"*' if len(term) > 1 else f'"{term}"' for term in terms)
+        return f'owner : "u{user_id}" AND description : ({words})'
+
+    def add_expense(self, user_id, category_id, amount, expense_date, description):
+        params = {
+            'user_id': user_id,
+            'category_id': category_id,
+            'amount': amount,
+            'expense_date': expense_date,
+            'description': description
+        }
+        # Port of apply_expense_to_ledger and check_expense_limit: record the
+        # expense against its budget periods, then evaluate every limit at once
+        self._run('open_ledger_periods', params)
+        self._run('add_to_ledger', params)
+        exceeded = self._fetchone('exceeded_limit', params)
+
+        cursor = self._execute('insert_expense', params)
+        expense_id = cursor.lastrowid
+        cursor.close()
+        if exceeded:
+            return expense_id, True, exceeded[0]
+        return expense_id, False, 0
+
+    def _apply_to_ledger(self, seq_of_params):
+        self._run_many('open_ledger_periods', seq_of_params)
+        self._run_many('add_to_ledger', seq_of_params)
+
+    def _insert_returning(self, name, seq_of_params):
+        """Run an INSERT once per parameter set and return the new rowids (executemany can't)"""
+        generated_ids = []
+        cursor = self.conn.cursor()
+        for params in seq_of_params:
+            cursor.execute(self.SQL[name], params)
+            generated_ids.append(cursor.lastrowid)
+        cursor.close()
+        return generated_ids
+
+    def _insert_expenses(self, user_id, rows):
+        return self._insert_returning('insert_expense', [
+            {'user_id': user_id, 'category_id': category_id, 'amount': amount,
+             'expense_date': expense_date, 'description': description}
+            for category_id, amount, expense_date, description in rows
+        ])
+
+    def _insert_users(self, users):
+        return self._insert_returning('insert_user', [
+            {'name': name, 'email': email, 'password': password}
+            for name, email, password in users
+        ])
+
+    def create_limit_alert(self, user_id, expense_id, limit_amount):
+        self._run('insert_alert', {'user_id': user_id, 'expense_id': expense_id,
+                                   'limit_amount': limit_amount})
+        self._run('add_unread_alerts', {'user_id': user_id, 'delta': 1})
+
+
+class SqliteEngine(Engine):
+    """
+    Opens a connection per request against a database file, creating the
+    schema on first use. The path ':memory:' gives a private in-memory
+    database shared by all connections from this engine.
+    """
+
+    repository_class = SqliteRepository
+
+    def __init__(self, path):
+        self.path = path
+        self._memory = path == ':memory:'
+        self._database = f'file:expense_tracker_{id(self)}?mode=memory&cache=shared' if self._memory else path
+        self._keeper = None
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._acquires = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self._database, uri=self._memory, timeout=30,
+                               detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        conn.execute('PRAGMA foreign_keys = ON')
+        return conn
+
+    def _initialize(self):
+        conn = self._connect()
+        if not self._memory:
+            conn.execute('PRAGMA journal_mode = WAL')
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        has_rollup = 'Expense_Monthly_Rollup' in tables
+        for table, column in VERSION_COLUMNS:
+            # Older databases get the change-tracking columns before the schema script indexes them
+            if table in tables and column not in {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0')
+        with open(SCHEMA_PATH) as f:
+            conn.executescript(f.read())
+        if not has_rollup:
+            # Databases created before the rollup existed need it populated once
+            conn.execute(SqliteRepository.SQL['backfill_rollup'])
+        if 'Expense_Search' not in tables:
+            # and the search index filled with the expenses recorded before it
+            conn.execute(SqliteRepository.SQL['backfill_search'])
+        user_columns = {row[1] for row in conn.execute('PRAGMA table_info(Users)')}
+        if 'unread_alerts' not in user_columns:
+            # As do databases created before the unread alert counter
+            conn.execute('ALTER TABLE Users ADD COLUMN unread_alerts INTEGER NOT NULL DEFAULT 0')
+            conn.execute(SqliteRepository.SQL['backfill_unread_alerts'])
+        conn.commit()
+        if self._memory:
+            # The in-memory database lives as long as one connection to it is open
+            self._keeper = conn
+        else:
+            conn.close()
+        self._initialized = True
+
+    def acquire(self):
+        with self._lock:
+            if not self._initialized:
+                self._initialize()
+            self._acquires += 1
+        return self._connect()
+
+    def stats(self):
+        return {'backend': 'sqlite', 'path': self.path, 'acquires': self._acquires}
+
+    def close(self):
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+            self._initialized = False
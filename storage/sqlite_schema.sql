@@ -0,0 +1,318 @@
+-- Expense Tracker schema for the embedded SQLite backend.
+-- Mirrors the tables in database.sql; the PL/SQL procedures are ported to
+-- Python in storage/sqlite.py. Dates are stored as ISO-8601 text.
+
+CREATE TABLE IF NOT EXISTS Users (
+    user_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    unread_alerts INTEGER NOT NULL DEFAULT 0,
+    change_version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Categories (
+    category_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES Users(user_id),
+    category_name TEXT NOT NULL,
+    description TEXT,
+    row_version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Expenses (
+    expense_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES Users(user_id),
+    category_id INTEGER NOT NULL REFERENCES Categories(category_id),
+    amount REAL NOT NULL,
+    expense_date DATE NOT NULL,
+    description TEXT,
+    row_version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Expense_Limits (
+    limit_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES Users(user_id),
+    category_id INTEGER REFERENCES Categories(category_id),
+    limit_amount REAL NOT NULL,
+    period TEXT DEFAULT 'monthly',
+    row_version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Expense_Alerts (
+    alert_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES Users(user_id),
+    expense_id INTEGER NOT NULL REFERENCES Expenses(expense_id),
+    alert_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    limit_amount REAL NOT NULL,
+    is_read INTEGER DEFAULT 0,
+    row_version INTEGER NOT NULL DEFAULT 0
+);
+
+-- Per-user, per-category monthly aggregates read by the dashboard and reports
+CREATE TABLE IF NOT EXISTS Expense_Monthly_Rollup (
+    user_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    month_start DATE NOT NULL,
+    total_amount REAL NOT NULL DEFAULT 0,
+    expense_count INTEGER NOT NULL DEFAULT 0,
+    min_amount REAL,
+    max_amount REAL,
+    PRIMARY KEY (user_id, category_id, month_start)
+) WITHOUT ROWID;
+
+-- Inserts are applied incrementally; updates and deletes recompute the
+-- affected months because they may remove a month's MIN/MAX
+CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_insert
+AFTER INSERT ON Expenses
+BEGIN
+    INSERT INTO Expense_Monthly_Rollup (user_id, category_id, month_start, total_amount,
+                                        expense_count, min_amount, max_amount)
+    VALUES (NEW.user_id, NEW.category_id, date(NEW.expense_date, 'start of month'),
+            NEW.amount, 1, NEW.amount, NEW.amount)
+    ON CONFLICT (user_id, category_id, month_start) DO UPDATE SET
+        total_amount = total_amount + excluded.total_amount,
+        expense_count = expense_count + 1,
+        min_amount = MIN(min_amount, excluded.min_amount),
+        max_amount = MAX(max_amount, excluded.max_amount);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_delete
+AFTER DELETE ON Expenses
+BEGIN
+    DELETE FROM Expense_Monthly_Rollup
+    WHERE user_id = OLD.user_id
+    AND category_id = OLD.category_id
+    AND month_start = date(OLD.expense_date, 'start of month');
+
+    INSERT INTO Expense_Monthly_Rollup (user_id, category_id, month_start, total_amount,
+                                        expense_count, min_amount, max_amount)
+    SELECT OLD.user_id, OLD.category_id, date(OLD.expense_date, 'start of month'),
+           SUM(amount), COUNT(*), MIN(amount), MAX(amount)
+    FROM Expenses
+    WHERE user_id = OLD.user_id
+    AND category_id = OLD.category_id
+    AND expense_date >= date(OLD.expense_date, 'start of month')
+    AND expense_date < date(OLD.expense_date, 'start of month', '+1 month')
+    HAVING COUNT(*) > 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_update
+AFTER UPDATE OF user_id, category_id, amount, expense_date ON Expenses
+BEGIN
+    DELETE FROM Expense_Monthly_Rollup
+    WHERE (user_id = OLD.user_id
+           AND category_id = OLD.category_id
+           AND month_start = date(OLD.expense_date, 'start of month'))
+    OR (user_id = NEW.user_id
+        AND category_id = NEW.category_id
+        AND month_start = date(NEW.expense_date, 'start of month'));
+
+    INSERT OR IGNORE INTO Expense_Monthly_Rollup (user_id, category_id, month_start, total_amount,
+                                                  expense_count, min_amount, max_amount)
+    SELECT user_id, category_id, date(expense_date, 'start of month'),
+           SUM(amount), COUNT(*), MIN(amount), MAX(amount)
+    FROM Expenses
+    WHERE (user_id = OLD.user_id
+           AND category_id = OLD.category_id
+           AND expense_date >= date(OLD.expense_date, 'start of month')
+           AND expense_date < date(OLD.expense_date, 'start of month', '+1 month'))
+    OR (user_id = NEW.user_id
+        AND category_id = NEW.category_id
+        AND expense_date >= date(NEW.expense_date, 'start of month')
+        AND expense_date < date(NEW.expense_date, 'start of month', '+1 month'))
+    GROUP BY user_id, category_id, date(expense_date, 'start of month');
+END;
+
+-- Indexes matching migrations/V001__expense_indexes_and_partitioning.sql and V004
+CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON Expenses (user_id, expense_date, expense_id);
+CREATE INDEX IF NOT EXISTS idx_expenses_user_cat_date ON Expenses (user_id, category_id, expense_date, amount);
+CREATE INDEX IF NOT EXISTS idx_categories_user ON Categories (user_id, category_name);
+CREATE INDEX IF NOT EXISTS idx_limits_user_category ON Expense_Limits (user_id, category_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_user_read ON Expense_Alerts (user_id, is_read);
+DROP INDEX IF EXISTS idx_alerts_user_date;
+CREATE INDEX IF NOT EXISTS idx_alerts_user_date_id ON Expense_Alerts (user_id, alert_date, alert_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_expense ON Expense_Alerts (expense_id);
+
+-- Running total spent against each budget limit in each of its periods
+-- (period_end is exclusive); see Budget_Ledger in database.sql
+CREATE TABLE IF NOT EXISTS Budget_Ledger (
+    limit_id INTEGER NOT NULL REFERENCES Expense_Limits(limit_id) ON DELETE CASCADE,
+    period_start DATE NOT NULL,
+    period_end DATE NOT NULL,
+    user_id INTEGER NOT NULL,
+    spent REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (limit_id, period_start)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ledger_user_period ON Budget_Ledger (user_id, period_start, period_end);
+
+-- Changed or removed expenses invalidate the ledger periods they counted towards
+CREATE TRIGGER IF NOT EXISTS trg_expenses_ledger_delete
+AFTER DELETE ON Expenses
+BEGIN
+    DELETE FROM Budget_Ledger
+    WHERE user_id = OLD.user_id
+    AND period_start <= OLD.expense_date
+    AND period_end > OLD.expense_date;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_ledger_update
+AFTER UPDATE OF user_id, category_id, amount, expense_date ON Expenses
+BEGIN
+    DELETE FROM Budget_Ledger
+    WHERE (user_id = OLD.user_id AND period_start <= OLD.expense_date AND period_end > OLD.expense_date)
+    OR (user_id = NEW.user_id AND period_start <= NEW.expense_date AND period_end > NEW.expense_date);
+END;
+
+-- Change tracking for the delta sync API; see Sync_Deletions in database.sql.
+-- SQLite runs one writer at a time, so each changed row simply takes the
+-- user's next version. Entity kinds match the SYNC_* constants in storage/base.py.
+CREATE TABLE IF NOT EXISTS Sync_Deletions (
+    user_id INTEGER NOT NULL,
+    row_version INTEGER NOT NULL,
+    entity_kind INTEGER NOT NULL,
+    entity_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, row_version, entity_kind, entity_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_expenses_user_version ON Expenses (user_id, row_version, expense_id);
+CREATE INDEX IF NOT EXISTS idx_categories_user_version ON Categories (user_id, row_version, category_id);
+CREATE INDEX IF NOT EXISTS idx_limits_user_version ON Expense_Limits (user_id, row_version, limit_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_user_version ON Expense_Alerts (user_id, row_version, alert_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_sync_insert
+AFTER INSERT ON Expenses
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = NEW.user_id;
+    UPDATE Expenses
+    SET row_version = (SELECT change_version FROM Users WHERE user_id = NEW.user_id)
+    WHERE expense_id = NEW.expense_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_sync_update
+AFTER UPDATE OF user_id, category_id, amount, expense_date, description ON Expenses
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = NEW.user_id;
+    UPDATE Expenses
+    SET row_version = (SELECT change_version FROM Users WHERE user_id = NEW.user_id)
+    WHERE expense_id = NEW.expense_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_sync_delete
+AFTER DELETE ON Expenses
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = OLD.user_id;
+    INSERT INTO Sync_Deletions (user_id, row_version, entity_kind, entity_id)
+    SELECT user_id, change_version, 1, OLD.expense_id FROM Users WHERE user_id = OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_categories_sync_insert
+AFTER INSERT ON Categories
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = NEW.user_id;
+    UPDATE Categories
+    SET row_version = (SELECT change_version FROM Users WHERE user_id = NEW.user_id)
+    WHERE category_id = NEW.category_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_categories_sync_update
+AFTER UPDATE OF user_id, category_name, description ON Categories
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = NEW.user_id;
+    UPDATE Categories
+    SET row_version = (SELECT change_version FROM Users WHERE user_id = NEW.user_id)
+    WHERE category_id = NEW.category_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_categories_sync_delete
+AFTER DELETE ON Categories
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = OLD.user_id;
+    INSERT INTO Sync_Deletions (user_id, row_version, entity_kind, entity_id)
+    SELECT user_id, change_version, 2, OLD.category_id FROM Users WHERE user_id = OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_limits_sync_insert
+AFTER INSERT ON Expense_Limits
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = NEW.user_id;
+    UPDATE Expense_Limits
+    SET row_version = (SELECT change_version FROM Users WHERE user_id = NEW.user_id)
+    WHERE limit_id = NEW.limit_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_limits_sync_update
+AFTER UPDATE OF user_id, category_id, limit_amount, period ON Expense_Limits
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = NEW.user_id;
+    UPDATE Expense_Limits
+    SET row_version = (SELECT change_version FROM Users WHERE user_id = NEW.user_id)
+    WHERE limit_id = NEW.limit_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_limits_sync_delete
+AFTER DELETE ON Expense_Limits
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = OLD.user_id;
+    INSERT INTO Sync_Deletions (user_id, row_version, entity_kind, entity_id)
+    SELECT user_id, change_version, 3, OLD.limit_id FROM Users WHERE user_id = OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alerts_sync_insert
+AFTER INSERT ON Expense_Alerts
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = NEW.user_id;
+    UPDATE Expense_Alerts
+    SET row_version = (SELECT change_version FROM Users WHERE user_id = NEW.user_id)
+    WHERE alert_id = NEW.alert_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alerts_sync_update
+AFTER UPDATE OF user_id, expense_id, alert_date, limit_amount, is_read ON Expense_Alerts
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = NEW.user_id;
+    UPDATE Expense_Alerts
+    SET row_version = (SELECT change_version FROM Users WHERE user_id = NEW.user_id)
+    WHERE alert_id = NEW.alert_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_alerts_sync_delete
+AFTER DELETE ON Expense_Alerts
+BEGIN
+    UPDATE Users SET change_version = change_version + 1 WHERE user_id = OLD.user_id;
+    INSERT INTO Sync_Deletions (user_id, row_version, entity_kind, entity_id)
+    SELECT user_id, change_version, 4, OLD.alert_id FROM Users WHERE user_id = OLD.user_id;
+END;
+
+-- Full-text index of expense descriptions for /api/expenses/search (the
+-- Oracle Text index of migrations/V006). The table is contentless: it keeps
+-- only the index, keyed by expense_id, and the description is read from
+-- Expenses. owner holds 'u' || user_id so a search only matches the user's
+-- own expenses. Two- and three-character prefixes are indexed for
+-- search-as-you-type.
+CREATE VIRTUAL TABLE IF NOT EXISTS Expense_Search USING fts5(
+    description, owner, content = '', prefix = '2 3', tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_search_insert
+AFTER INSERT ON Expenses
+BEGIN
+    INSERT INTO Expense_Search (rowid, description, owner)
+    VALUES (NEW.expense_id, NEW.description, 'u' || NEW.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_search_update
+AFTER UPDATE OF description, user_id ON Expenses
+BEGIN
+    INSERT INTO Expense_Search (Expense_Search, rowid, description, owner)
+    VALUES ('delete', OLD.expense_id, OLD.description, 'u' || OLD.user_id);
+    INSERT INTO Expense_Search (rowid, description, owner)
+    VALUES (NEW.expense_id, NEW.description, 'u' || NEW.user_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_expenses_search_delete
+AFTER DELETE ON Expenses
+BEGIN
+    INSERT INTO Expense_Search (Expense_Search, rowid, description, owner)
+    VALUES ('delete', OLD.expense_id, OLD.description, 'u' || OLD.user_id);
+END;
@@ -0,0 +1,97 @@
+"""
+Trend engine for the expense trends report.
+
+Totals are aggregated per time bucket and category in the database (see
+Repository.category_trends), so at most one row per bucket and category comes
+back, fetched as columns. This module lays out the buckets for a date range
+and turns those columns into a dense category x bucket matrix with NumPy,
+without a Python loop over rows or buckets. Ranges that would need more than
+max_buckets buckets at the requested granularity fall back to a coarser one,
+which bounds both the query and the size of the chart payload.
+"""
+
+import numpy as np
+
+# Finest first
+GRANULARITIES = ('day', 'week', 'month', 'year')
+
+# Datetime64 unit and number of units per bucket
+BUCKET_STEPS = {'day': ('D', 1), 'week': ('D', 7), 'month': ('M', 1), 'year': ('Y', 1)}
+
+
+def _first_bucket(start_date, granularity):
+    """Start of the bucket containing start_date, in the granularity's datetime64 unit"""
+    unit, _ = BUCKET_STEPS[granularity]
+    first = np.datetime64(start_date, 'D').astype(f'datetime64[{unit}]')
+    if granularity == 'week':
+        # Weeks start on Monday; day 0 of datetime64 (1970-01-01) was a Thursday
+        first -= (first.astype(np.int64) + 3) % 7
+    return first
+
+
+def bucket_count(start_date, end_date, granularity):
+    """Number of buckets needed to cover start_date to end_date inclusive"""
+    unit, step = BUCKET_STEPS[granularity]
+    first = _first_bucket(start_date, granularity)
+    last = np.datetime64(end_date, 'D').astype(f'datetime64[{unit}]')
+    return int((last - first).astype(np.int64)) // step + 1
+
+
+def bucket_edges(start_date, end_date, granularity):
+    """
+    Return the n + 1 bucket boundaries (datetime64[D]) covering start_date to
+    end_date inclusive: bucket i runs from edges[i] up to but excluding edges[i + 1].
+    Weeks start on Monday; months and years on their first day.
+    """
+    _, step = BUCKET_STEPS[granularity]
+    first = _first_bucket(start_date, granularity)
+    count = bucket_count(start_date, end_date, granularity)
+    return (first + np.arange(count + 1) * step).astype('datetime64[D]')
+
+
+def choose_granularity(start_date, end_date, granularity, max_buckets):
+    """Return the requested granularity, or the finest coarser one that fits in max_buckets"""
+    for candidate in GRANULARITIES[GRANULARITIES.index(granularity):]:
+        if bucket_count(start_date, end_date, candidate) <= max_buckets:
+            return candidate
+    return GRANULARITIES[-1]
+
+
+def pivot(columns, edges):
+    """
+    Build the dense matrix from the bucket_start, category_name and
+    total_amount columns of Repository.category_trends, where bucket_start
+    holds dates or 'YYYY-MM-DD' strings. Returns (category names in
+    alphabetical order, float matrix of shape (categories, buckets)). Totals are
+    placed in the bucket containing their date; those outside the edges are ignored.
+    """
+    buckets = len(edges) - 1
+    if not len(columns['bucket_start']):
+        return [], np.zeros((0, buckets))
+
+    starts = np.asarray(columns['bucket_start'], dtype='datetime64[D]')
+    bucket_index = np.searchsorted(edges, starts, side='right') - 1
+    categories, category_index = np.unique(np.asarray(columns['category_name'], dtype=str),
+                                           return_inverse=True)
+
+    in_range = (bucket_index >= 0) & (bucket_index < buckets)
+    matrix = np.zeros((len(categories), buckets))
+    np.add.at(matrix, (category_index[in_range], bucket_index[in_range]),
+              np.asarray(columns['total_amount'], dtype=float)[in_range])
+    return categories.tolist(), matrix
+
+
+def labels(edges, granularity):
+    """Chart labels for the buckets: 'YYYY-MM-DD', 'YYYY-MM' or 'YYYY'"""
+    return np.datetime_as_string(edges[:-1], unit=BUCKET_STEPS[granularity][0]).tolist()
+
+
+def trend_chart(columns, edges, granularity):
+    """Build the Chart.js data for the trends report: one dataset per category, one point per bucket"""
+    categories, matrix = pivot(columns, edges)
+    return {
+        'granularity': granularity,
+        'labels': labels(edges, granularity),
+        'datasets': [{'label': category, 'data': data}
+                     for category, data in zip(categories, np.round(matrix, 2).tolist())]
+    }